@@ -0,0 +1,58 @@
+"""
+Revenue CSV ingestion: pandas `to_sql` + temp table UPSERT vs the native `executemany` bulk loader.
+
+Run from the project root:
+
+    python -m benchmarks.bulk_loader --rows 10000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlmodel import create_engine
+
+from benchmarks.generators import generate_revenues_csv
+from models.schemas.schema import meta_orms, stg_orms
+from models.schemas.stg.revenue_per_day import STGDayRevenue
+from pipeline.creation import create_from_orms
+from pipeline.ingestion import CSVIngesterDefinition, csv_ingester_revenues
+
+
+def _load(directory: str, name: str, csv_path: str, **definition_kwargs) -> float:
+    engine = create_engine(f"sqlite:///{os.path.join(directory, name)}.db", echo=False)
+    create_from_orms(models=stg_orms + meta_orms, engine=engine)
+    start = time.perf_counter()
+    csv_ingester_revenues(definition=CSVIngesterDefinition(filepath=csv_path, orm_class=STGDayRevenue,
+                                                           **definition_kwargs),
+                          engine=engine)
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='Chunk size for the pandas path (the whole file at once by default)')
+    parser.add_argument('--batch-size', type=int, default=100_000, help='Batch size for the native path')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'revenues_per_day.csv')
+        generate_revenues_csv(csv_path, rows_number=args.rows)
+
+        results = [
+            ('pandas to_sql', _load(directory, 'pandas', csv_path, chunksize=args.chunksize)),
+            ('native executemany', _load(directory, 'native', csv_path,
+                                         chunksize=args.batch_size, native_loader=True)),
+        ]
+
+    print(f"\n{'loader':>18} | {'seconds':>8} | {'rows/s':>10}")
+    for name, elapsed in results:
+        print(f"{name:>18} | {elapsed:>8.2f} | {args.rows / elapsed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
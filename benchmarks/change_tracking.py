@@ -0,0 +1,68 @@
+"""
+Revenue CSV UPSERT updating every row: `modified_date` triggers vs the change log.
+
+Run from the project root:
+
+    python -m benchmarks.change_tracking --rows 2000000
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from sqlmodel import create_engine
+
+from benchmarks.generators import generate_revenues_csv
+from models.definitions.objects import ChangeTracking
+from models.schemas.schema import meta_orms, stg_orms
+from models.schemas.stg.revenue_per_day import STGDayRevenue
+from pipeline.creation import create_from_orms
+from pipeline.ingestion import CSVIngesterDefinition, csv_ingester_revenues
+
+
+def _reload(directory: str, change_tracking: ChangeTracking, csv_path: str, changed_csv_path: str,
+            **definition_kwargs) -> float:
+    engine = create_engine(f"sqlite:///{os.path.join(directory, change_tracking.value.lower())}.db", echo=False)
+    create_from_orms(models=stg_orms, engine=engine, change_tracking=change_tracking)
+    create_from_orms(models=meta_orms, engine=engine)
+    csv_ingester_revenues(definition=CSVIngesterDefinition(filepath=csv_path, orm_class=STGDayRevenue,
+                                                           **definition_kwargs),
+                          engine=engine)
+    start = time.perf_counter()
+    csv_ingester_revenues(definition=CSVIngesterDefinition(filepath=changed_csv_path, orm_class=STGDayRevenue,
+                                                           **definition_kwargs),
+                          engine=engine)
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--batch-size', type=int, default=100_000, help='Batch size of the native loader')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'revenues_per_day.csv')
+        changed_csv_path = os.path.join(directory, 'revenues_per_day_changed.csv')
+        generate_revenues_csv(csv_path, rows_number=args.rows)
+        # every revenue changed, so every row is updated
+        with open(csv_path, 'r', newline='') as source, open(changed_csv_path, 'w', newline='') as target:
+            reader, writer = csv.reader(source), csv.writer(target)
+            writer.writerow(next(reader))
+            writer.writerows(row[:3] + [int(row[3]) + 1] + row[4:] for row in reader)
+
+        results = [(change_tracking.value.lower(),
+                    _reload(directory, change_tracking, csv_path, changed_csv_path,
+                            chunksize=args.batch_size, native_loader=True))
+                   for change_tracking in (ChangeTracking.TRIGGERS, ChangeTracking.CHANGELOG)]
+
+    print(f"\n{'change tracking':>15} | {'seconds':>8} | {'rows/s':>10}")
+    for name, elapsed in results:
+        print(f"{name:>15} | {elapsed:>8.2f} | {args.rows / elapsed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import csv
+import hashlib
+import random
+from datetime import date, timedelta
+
+DISTRIBUTORS = ('Walt Disney Studios Motion Pictures', 'Warner Bros.', 'Universal Pictures', 'Sony Pictures Releasing',
+                'Paramount Pictures', 'Lionsgate', 'Focus Features', 'Neon', '-')
+
+# rows and distinct titles of the revenues CSV per scale, 1x is about the size of the original file
+SCALES = {
+    1: dict(rows_number=50_000, titles_number=2_000),
+    10: dict(rows_number=500_000, titles_number=20_000),
+    100: dict(rows_number=5_000_000, titles_number=200_000),
+}
+
+
+def generate_revenues_csv(path: str,
+                          rows_number: int,
+                          titles_number: int = 5_000,
+                          titles_per_day: int = 50,
+                          start_date: date = date(2000, 1, 1),
+                          seed: int = 0) -> int:
+    """
+    Writes a deterministic `revenues_per_day.csv`-like file with `rows_number` rows.
+    Every day `titles_per_day` titles (out of `titles_number`) get a revenue entry.
+
+    :return: Number of written rows.
+    :rtype: int
+    """
+    rng = random.Random(seed)
+    titles = [f"Movie {no}" for no in range(titles_number)]
+
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(('id', 'date', 'title', 'revenue', 'theaters', 'distributor'))
+        written = 0
+        day = start_date
+        while written < rows_number:
+            day_str = day.isoformat()
+            for position, title in enumerate(rng.sample(titles, min(titles_per_day, titles_number)), start=1):
+                if written == rows_number:
+                    break
+                writer.writerow((f"{day_str}-{position}",
+                                 day_str,
+                                 title,
+                                 rng.randint(100, 5_000_000),
+                                 rng.randint(1, 4_500) if rng.random() > 0.05 else '-',
+                                 _distributor(title)))
+                written += 1
+            day += timedelta(days=1)
+
+    return written
+
+
+def generate_scaled_revenues_csv(path: str, scale: int, seed: int = 0) -> int:
+    """
+    Writes the revenues CSV of one of the `SCALES`. The OMDb payloads matching its titles are served
+    by `benchmarks.omdb_stub` (`fake_omdb_payload`).
+
+    :return: Number of written rows.
+    :rtype: int
+    """
+    return generate_revenues_csv(path, seed=seed, **SCALES[scale])
+
+
+def _distributor(title: str) -> str:
+    # `hash` of str is salted per process, md5 keeps the files the same between runs
+    return DISTRIBUTORS[int(hashlib.md5(title.encode()).hexdigest(), 16) % len(DISTRIBUTORS)]
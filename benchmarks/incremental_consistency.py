@@ -0,0 +1,275 @@
+"""
+Checks that the incremental flow ends with the same facts as a full rebuild, fully offline.
+
+Every scenario loads a small generated revenues CSV with the OMDb stub, changes the inputs the way a
+later run sees them (a title mapped by hand or to another movie, a title corrected in the CSV, dates in
+another format, the movies fetched again by imdbID) and runs the flow again. The movies, the facts and
+the per-movie revenue summaries, by their natural keys, are then compared with a full rebuild of a new
+database from the same final inputs. A failed flow fails its scenario as well.
+
+Run from the project root:
+
+    python -m benchmarks.incremental_consistency
+    python -m benchmarks.incremental_consistency --partitioned month
+"""
+import argparse
+import csv
+import io
+import os
+import tempfile
+import time
+from contextlib import redirect_stderr, redirect_stdout
+
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from benchmarks.generators import generate_revenues_csv
+from benchmarks.omdb_stub import OMDBStubServer, fake_omdb_payload
+from models.definitions.objects import TitleMatch
+from models.schemas.dwh.titles_map import DWHTitleMap
+from models.schemas.schema import dwh_orms
+from models.schemas.stg.revenue_per_day import STGDayRevenue
+from pipeline import State
+from pipeline.creation import create_from_orms
+from pipeline.dag import dag_state, run_dag
+from pipeline.flows import build_main_flow
+from pipeline.ingestion import CSVIngesterDefinition, OMDBAPIFetchDefinition
+from pipeline.sqlite_functions import normalize_title
+
+ROWS_NUMBER = 3_000
+TITLES_NUMBER = 200
+TITLES_PER_DAY = 20
+# an imdbID no title of the generated CSV is answered with
+UNFETCHED_IMDB_ID = 'tt999999999999'
+
+
+def _generate(directory: str) -> tuple[str, list[str]]:
+    csv_path = os.path.join(directory, 'revenues_per_day.csv')
+    generate_revenues_csv(csv_path, rows_number=ROWS_NUMBER, titles_number=TITLES_NUMBER,
+                          titles_per_day=TITLES_PER_DAY)
+    with open(csv_path, 'r', newline='') as file:
+        titles = sorted({row['title'] for row in csv.DictReader(file)})
+    return csv_path, titles
+
+
+def _engine(directory: str, name: str):
+    return create_engine(f"sqlite:///{os.path.join(directory, name)}.db", echo=False)
+
+
+def _rewrite_titles(csv_path: str, titles: dict[tuple[str, str], str]) -> None:
+    """
+    Renames the titles of the rows by their (date, title), e.g. a corrected title in a new CSV version.
+    """
+    with open(csv_path, 'r', newline='') as file:
+        rows = list(csv.reader(file))
+    for row in rows[1:]:
+        row[2] = titles.get((row[1], row[2]), row[2])
+    with open(csv_path, 'w', newline='') as file:
+        csv.writer(file).writerows(rows)
+
+
+def _dates(csv_path: str, title: str) -> list[str]:
+    with open(csv_path, 'r', newline='') as file:
+        return sorted(row['date'] for row in csv.DictReader(file) if row['title'] == title)
+
+
+def _run_flow(engine, csv_path: str, address: str, incremental: bool, partitioned: str | None,
+              refresh: bool = False, **fetch_kwargs) -> None:
+    tasks = build_main_flow(engine=engine,
+                            revenues_definition=CSVIngesterDefinition(filepath=csv_path, orm_class=STGDayRevenue),
+                            fetch_definition=OMDBAPIFetchDefinition(omdb_address=address,
+                                                                    allowed_failed_attempts=TITLES_NUMBER,
+                                                                    **fetch_kwargs),
+                            api_key='check',
+                            incremental=incremental,
+                            materialize=True,
+                            partitioned=partitioned,
+                            refresh=refresh)
+    # the progress bars and the logged tracebacks of the failed tasks
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+        results = run_dag(tasks, max_workers=1)
+    if dag_state(results) != State.SUCCESS:
+        errors = [f"{name}: {result.error!r}" for name, result in results.items() if result.error]
+        raise RuntimeError(f"Flow failed: {errors}")
+
+
+def _map_manually(engine, title: str, imdb_id: str) -> None:
+    with redirect_stdout(io.StringIO()):
+        create_from_orms(models=dwh_orms, engine=engine)
+    with Session(engine) as session:
+        session.execute(text(f"""
+            INSERT INTO {DWHTitleMap.__tablename__} (title, normalized_title, imdb_id, method)
+            VALUES (:title, :normalized_title, :imdb_id, '{TitleMatch.MANUAL.value}')
+            ON CONFLICT(title) DO UPDATE
+            SET imdb_id = excluded.imdb_id
+                ,method = excluded.method
+                ,similarity = NULL;
+        """), dict(title=title, normalized_title=normalize_title(title), imdb_id=imdb_id))
+        session.commit()
+
+
+def _star(engine) -> dict[str, list[tuple]]:
+    with Session(engine) as session:
+        movies = session.execute(text("""
+            SELECT imdb_id, title
+            FROM dwh_dim__movies;
+        """)).fetchall()
+        facts = session.execute(text("""
+            SELECT m.imdb_id, d.value, dist.name, f.revenue, f.theaters_number
+            FROM dwh_fact__revenues f
+            JOIN dwh_dim__movies m ON f.movie_id = m.id
+            JOIN dwh_dim__dates d ON f.date_id = d.id
+            LEFT JOIN dwh_dim__distributors dist ON f.distributor_id = dist.id;
+        """)).fetchall()
+        summaries = session.execute(text("""
+            SELECT m.imdb_id, s.total_revenue, s.revenue_days
+            FROM dwh_agg__movies_revenues s
+            JOIN dwh_dim__movies m ON s.movie_id = m.id;
+        """)).fetchall()
+    return dict(movies=sorted(movies, key=repr), facts=sorted(facts, key=repr),
+                summaries=sorted(summaries, key=repr))
+
+
+def _stars(engine, rebuilt) -> tuple[dict, dict]:
+    stars = _star(engine), _star(rebuilt)
+    engine.dispose()
+    rebuilt.dispose()
+    return stars
+
+
+def manual_unfetched(directory: str, partitioned: str | None) -> tuple[dict, dict]:
+    """
+    A title the API did not find is mapped by hand to a movie no fetched title returned: its revenues
+    are skipped, the rest is loaded.
+    """
+    csv_path, titles = _generate(directory)
+    title = next(title for title in titles if fake_omdb_payload(title)['Response'] == 'False')
+    with OMDBStubServer() as server:
+        engine = _engine(directory, 'incremental')
+        _run_flow(engine, csv_path, server.address, True, partitioned)
+        _map_manually(engine, title, UNFETCHED_IMDB_ID)
+        _run_flow(engine, csv_path, server.address, True, partitioned)
+
+        rebuilt = _engine(directory, 'rebuilt')
+        _map_manually(rebuilt, title, UNFETCHED_IMDB_ID)
+        _run_flow(rebuilt, csv_path, server.address, False, partitioned)
+    return _stars(engine, rebuilt)
+
+
+def remapped_title(directory: str, partitioned: str | None) -> tuple[dict, dict]:
+    """
+    A title the API did not find is mapped to a known movie by its normalized key, then the API finds
+    it: its facts move to the movie found.
+    """
+    csv_path, titles = _generate(directory)
+    # `The Movie N` is not found at first and has the normalized key of the found `Movie N`
+    title = next(title for title in titles
+                 if fake_omdb_payload(title)['Response'] == 'True'
+                 and fake_omdb_payload(f"The {title}")['Response'] == 'False')
+    _rewrite_titles(csv_path, {(date, title): f"The {title}" for date in _dates(csv_path, title)[::2]})
+
+    engine = _engine(directory, 'incremental')
+    with OMDBStubServer() as server:
+        _run_flow(engine, csv_path, server.address, True, partitioned)
+    # the checkpoints of the titles not found expire
+    time.sleep(1)
+    with OMDBStubServer(not_found_ratio=0) as server:
+        _run_flow(engine, csv_path, server.address, True, partitioned, negative_cache_ttl_s=0)
+        rebuilt = _engine(directory, 'rebuilt')
+        _run_flow(rebuilt, csv_path, server.address, False, partitioned)
+    return _stars(engine, rebuilt)
+
+
+def renamed_title(directory: str, partitioned: str | None) -> tuple[dict, dict]:
+    """
+    The title of some rows is corrected in a new version of the CSV (the same ids and dates): their
+    facts move to the movie of the new title.
+    """
+    csv_path, titles = _generate(directory)
+    title = next(title for title in titles if fake_omdb_payload(title)['Response'] == 'True')
+    with OMDBStubServer() as server:
+        engine = _engine(directory, 'incremental')
+        _run_flow(engine, csv_path, server.address, True, partitioned)
+        _rewrite_titles(csv_path, {(date, title): f"{title} (Director's Cut)" for date in _dates(csv_path, title)[::2]})
+        _run_flow(engine, csv_path, server.address, True, partitioned)
+
+        rebuilt = _engine(directory, 'rebuilt')
+        _run_flow(rebuilt, csv_path, server.address, False, partitioned)
+    return _stars(engine, rebuilt)
+
+
+def unparsed_dates(directory: str, partitioned: str | None) -> tuple[dict, dict]:
+    """
+    A new version of the CSV adds rows with dates not in the `YYYY-MM-DD` format (`2000-1-5`): they
+    are skipped, the rest is loaded.
+    """
+    csv_path, titles = _generate(directory)
+    with OMDBStubServer() as server:
+        engine = _engine(directory, 'incremental')
+        _run_flow(engine, csv_path, server.address, True, partitioned)
+        with open(csv_path, 'a', newline='') as file:
+            csv.writer(file).writerows((f"2000-1-{day}-x", f"2000-1-{day}", title, 1_000, 10, '-')
+                                       for day in range(1, 10) for title in titles[:3])
+        _run_flow(engine, csv_path, server.address, True, partitioned)
+
+        rebuilt = _engine(directory, 'rebuilt')
+        _run_flow(rebuilt, csv_path, server.address, False, partitioned)
+    return _stars(engine, rebuilt)
+
+
+def refreshed_movies(directory: str, partitioned: str | None) -> tuple[dict, dict]:
+    """
+    The known movies are fetched again by their imdbID (`refresh_movies_details`): they keep their
+    titles and facts.
+    """
+    csv_path, _ = _generate(directory)
+    with OMDBStubServer() as server:
+        engine = _engine(directory, 'incremental')
+        _run_flow(engine, csv_path, server.address, True, partitioned)
+        # the movies are due once they were checked a second ago
+        time.sleep(1)
+        _run_flow(engine, csv_path, server.address, True, partitioned, refresh=True, refresh_after_s=0)
+
+        rebuilt = _engine(directory, 'rebuilt')
+        _run_flow(rebuilt, csv_path, server.address, False, partitioned)
+    return _stars(engine, rebuilt)
+
+
+SCENARIOS = {
+    'manual_unfetched': manual_unfetched,
+    'remapped_title': remapped_title,
+    'renamed_title': renamed_title,
+    'unparsed_dates': unparsed_dates,
+    'refreshed_movies': refreshed_movies,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help='Scenario to check, all of them by default')
+    parser.add_argument('--partitioned', choices=('month', 'year'), default=None,
+                        help='Load the fact table by partitions')
+    args = parser.parse_args()
+
+    failed = []
+    for name in args.scenario or SCENARIOS:
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                incremental, rebuilt = SCENARIOS[name](directory, args.partitioned)
+            except RuntimeError as error:
+                failed.append(name)
+                print(f"{name:<20} | FAILED | {error}")
+                continue
+        differences = [f"{table}: {len(set(rows) - set(rebuilt[table]))} rows not in the rebuild, "
+                       f"{len(set(rebuilt[table]) - set(rows))} missing"
+                       for table, rows in incremental.items() if rows != rebuilt[table]]
+        if differences:
+            failed.append(name)
+        summary = '; '.join(differences) or f"{len(rebuilt['facts'])} facts"
+        print(f"{name:<20} | {'FAILED' if differences else 'OK'} | {summary}")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Ingestion of a directory of revenue CSV files: one `csv_ingester_revenues` call per file vs the
+directory ingestion parsing the files in worker processes for a single writer.
+
+Run from the project root:
+
+    python -m benchmarks.multi_file_ingestion --rows 2000000 --files 200 --workers 1 2 4 8
+"""
+import argparse
+import csv
+import glob
+import os
+import tempfile
+import time
+
+from sqlmodel import create_engine
+
+from benchmarks.generators import generate_revenues_csv
+from models.schemas.schema import meta_orms, stg_orms
+from models.schemas.stg.revenue_per_day import STGDayRevenue
+from pipeline.creation import create_from_orms
+from pipeline.ingestion import CSVIngesterDefinition, csv_ingester_revenues
+
+
+def split_csv(csv_path: str, directory: str, files_number: int):
+    # consecutive rows to a file, like the per day feeds
+    with open(csv_path, 'r', newline='') as source:
+        reader = csv.reader(source)
+        header = next(reader)
+        rows = list(reader)
+    os.makedirs(directory, exist_ok=True)
+    per_file = -(-len(rows) // files_number)
+    for file_no in range(files_number):
+        with open(os.path.join(directory, f'revenues_{file_no:05d}.csv'), 'w', newline='') as target:
+            writer = csv.writer(target)
+            writer.writerow(header)
+            writer.writerows(rows[file_no * per_file:(file_no + 1) * per_file])
+
+
+def _ingest(directory: str, name: str, filepaths: list[str], **definition_kwargs) -> float:
+    engine = create_engine(f"sqlite:///{os.path.join(directory, name)}.db", echo=False)
+    create_from_orms(models=stg_orms + meta_orms, engine=engine)
+    start = time.perf_counter()
+    for filepath in filepaths:
+        csv_ingester_revenues(definition=CSVIngesterDefinition(filepath=filepath, orm_class=STGDayRevenue,
+                                                               **definition_kwargs),
+                              engine=engine)
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Numbers of parsing processes')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'revenues_per_day.csv')
+        feed_directory = os.path.join(directory, 'feed')
+        generate_revenues_csv(csv_path, rows_number=args.rows)
+        split_csv(csv_path, feed_directory, args.files)
+
+        results = [('file by file', _ingest(directory, 'serial', sorted(glob.glob(f'{feed_directory}/*.csv')),
+                                            native_loader=True))]
+        results += [(f'workers={workers}', _ingest(directory, f'workers_{workers}', [feed_directory],
+                                                     max_workers=workers))
+                    for workers in args.workers]
+
+    print(f"\n{'ingestion':>14} | {'seconds':>8} | {'rows/s':>10}")
+    for name, elapsed in results:
+        print(f"{name:>14} | {elapsed:>8.2f} | {args.rows / elapsed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
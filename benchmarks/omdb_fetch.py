@@ -0,0 +1,61 @@
+"""
+Throughput of `fetch_movies_details` against a local OMDb stub at different concurrency levels.
+
+Run from the project root:
+
+    python -m benchmarks.omdb_fetch --titles 500 --latency 0.05 --levels 1 4 16 32
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from benchmarks.omdb_stub import OMDBStubServer
+from models.schemas.schema import meta_orms, stg_orms
+from pipeline.creation import create_from_orms
+from pipeline.ingestion import OMDBAPIFetchDefinition, fetch_movies_details
+
+
+def _prepare_db(path: str, titles_number: int):
+    engine = create_engine(f"sqlite:///{path}", echo=False)
+    create_from_orms(models=stg_orms + meta_orms, engine=engine)
+    with Session(engine) as session:
+        session.execute(text("""
+            INSERT INTO stg_revenues_per_day (id, "date", title, revenue, theaters, distributor)
+            VALUES (:id, '2024-01-01', :title, 1000, 10, 'Distributor')
+        """), [dict(id=str(i), title=f"Movie {i}") for i in range(titles_number)])
+        session.commit()
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--titles', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated API latency in seconds')
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 4, 16, 32])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory, OMDBStubServer(latency_s=args.latency) as server:
+        engine = _prepare_db(os.path.join(directory, 'bench.db'), args.titles)
+        results = []
+        for level in args.levels:
+            definition = OMDBAPIFetchDefinition(omdb_address=server.address,
+                                                allowed_failed_attempts=args.titles,
+                                                dry_run=True,
+                                                max_in_flight=level)
+            start = time.perf_counter()
+            fetch_movies_details(definition=definition, api_key='benchmark', engine=engine)
+            elapsed = time.perf_counter() - start
+            results.append((level, elapsed, args.titles / elapsed))
+        engine.dispose()
+
+    print(f"\n{'max_in_flight':>13} | {'seconds':>8} | {'titles/s':>9}")
+    for level, elapsed, throughput in results:
+        print(f"{level:>13} | {elapsed:>8.2f} | {throughput:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
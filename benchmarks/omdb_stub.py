@@ -0,0 +1,112 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def fake_omdb_payload(title: str, not_found_ratio: int = 10) -> dict:
+    """
+    Builds a deterministic OMDb-like response for a title. Roughly every `not_found_ratio`-th
+    title is answered with the `Movie not found!` error, the same way the real API does.
+    """
+    h = int(hashlib.md5(title.encode()).hexdigest(), 16)
+    if not_found_ratio and h % not_found_ratio == 0:
+        return {"Response": "False", "Error": "Movie not found!"}
+
+    year = 1990 + h % 30
+    return {
+        "Title": title,
+        "Year": str(year),
+        "Rated": ("PG-13", "R", "G", "PG")[h % 4],
+        "Released": f"{1 + h % 28:02d} {MONTHS[h % 12]} {year}",
+        "Runtime": f"{80 + h % 70} min",
+        "Genre": ("Action, Drama", "Comedy", "Horror, Thriller, Drama", "Animation, Family")[h % 4],
+        "Director": f"Director {h % 97}",
+        "Writer": ("N/A", f"Writer {h % 53}, Writer {h % 71}")[h % 2],
+        "Actors": f"Actor {h % 113}, Actor {h % 127}, Actor {h % 131}",
+        "Plot": f"Plot of {title}",
+        "Language": ("English", "English, Spanish", "Polish")[h % 3],
+        "Country": ("United States", "United Kingdom, United States", "Poland")[h % 3],
+        "Awards": "N/A",
+        "Poster": "N/A",
+        "Ratings": [{"Source": "Internet Movie Database", "Value": f"{h % 10}.{h % 7}/10"},
+                    {"Source": "Rotten Tomatoes", "Value": f"{h % 101}%"}],
+        "Metascore": str(h % 101),
+        "imdbRating": f"{h % 10}.{h % 7}",
+        "imdbVotes": f"{h % 1000},{h % 1000:03d}",
+        # 7 digits like the real ids would collide for a few titles of the 10x and 100x scales
+        "imdbID": f"tt{h % 10 ** 12:012d}",
+        "Type": "movie",
+        "DVD": ("N/A", f"{1 + h % 27:02d} {MONTHS[(h >> 3) % 12]} {year + 1}")[h % 2],
+        "BoxOffice": f"${h % 900 + 1},{h % 1000:03d},{h % 999:03d}",
+        "Production": "N/A",
+        "Website": "N/A",
+        "Response": "True",
+    }
+
+
+class _OMDBStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency_s: float = 0.0
+    not_found_ratio: int = 10
+    # the titles answered by the server by their imdbID, set per server
+    titles_by_imdb_id: dict[str, str]
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if 't' in query:
+            payload = fake_omdb_payload(query['t'][0], self.not_found_ratio)
+            if payload['Response'] == 'True':
+                self.titles_by_imdb_id[payload['imdbID']] = payload['Title']
+        else:
+            # an imdbID is answered with the payload of the title it was returned for
+            title = self.titles_by_imdb_id.get(query.get('i', [''])[0])
+            payload = fake_omdb_payload(title, self.not_found_ratio) if title is not None \
+                else {"Response": "False", "Error": "Incorrect IMDb ID."}
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class OMDBStubServer:
+    """
+    Local OMDb look-alike served from a background thread. Every request waits `latency_s`
+    seconds to simulate the network round trip of the real API.
+
+    A search by title (`t=`) is answered with `fake_omdb_payload`. A lookup by imdbID (`i=`) is answered
+    with the payload of the title the server returned this imdbID for, like the real API returns the
+    same movie, and an imdbID it never returned with the `Incorrect IMDb ID.` error.
+    """
+
+    def __init__(self, latency_s: float = 0.0, not_found_ratio: int = 10):
+        handler = type('Handler', (_OMDBStubHandler,), dict(latency_s=latency_s, not_found_ratio=not_found_ratio,
+                                                            titles_by_imdb_id={}))
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
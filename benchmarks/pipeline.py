@@ -0,0 +1,199 @@
+"""
+End-to-end pipeline benchmark on synthetic data, fully offline.
+
+The revenues CSV is generated at the given scale (see `benchmarks.generators.SCALES`) and the OMDb
+API is replaced by the local stub. The whole flow (creation, ingestion, fetch, every transformation
+SQL, every view, the materialized rankings, the Parquet export) runs task by task and then every
+dashboard query is read, from the views, the materialized rankings and the Parquet files.
+Timings of the stages are taken from the run report of `pipeline.instrumentation`.
+
+The timings and the checksums of the views results are compared to the stored baseline of the scale.
+Stages slower than the baseline by more than `--tolerance` are flagged as regressions, and changed
+results are flagged as well. The baseline of the scale 1 is stored in `benchmarks/baselines/`, a run
+without a baseline fails unless it is stored by `--save-baseline`.
+
+Run from the project root:
+
+    python -m benchmarks.pipeline --scale 1 --save-baseline
+    python -m benchmarks.pipeline --scale 1 --fail-on-regression
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from benchmarks.generators import SCALES, generate_scaled_revenues_csv
+from benchmarks.omdb_stub import OMDBStubServer
+from models.definitions.dashboard import columnar_plots_definitions, materialized_plots_definitions, \
+    most_successful_plots_definitions
+from models.schemas.stg.revenue_per_day import STGDayRevenue
+from pipeline import State
+from pipeline.dag import dag_state, run_dag
+from pipeline.dashboard.columnar import ParquetStarSchema
+from pipeline.flows import VIEWS_FILES, build_main_flow
+from pipeline.ingestion import CSVIngesterDefinition, OMDBAPIFetchDefinition
+from pipeline.instrumentation import RunReport, instrumented_run, step
+
+BASELINES_DIRECTORY = './benchmarks/baselines'
+
+
+def run_pipeline(directory: str, scale: int, latency_s: float, max_in_flight: int) -> dict:
+    """
+    Runs the pipeline once in `directory` and returns the stages timings, rows and results checksums.
+    """
+    csv_path = os.path.join(directory, 'revenues_per_day.csv')
+    generate_scaled_revenues_csv(csv_path, scale)
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'benchmark.db')}", echo=False)
+
+    with OMDBStubServer(latency_s=latency_s) as server, instrumented_run(explain=False) as report:
+        tasks = build_main_flow(engine=engine,
+                                revenues_definition=CSVIngesterDefinition(filepath=csv_path,
+                                                                          orm_class=STGDayRevenue,
+                                                                          chunksize=100_000),
+                                fetch_definition=OMDBAPIFetchDefinition(omdb_address=server.address,
+                                                                        allowed_failed_attempts=SCALES[scale][
+                                                                            'titles_number'],
+                                                                        max_in_flight=max_in_flight),
+                                api_key='benchmark',
+                                materialize=True,
+                                parquet_directory=os.path.join(directory, 'parquet'))
+        # one task at a time, so the stages don't share the CPU and the SQLite lock
+        results = run_dag(tasks, max_workers=1)
+        if dag_state(results) != State.SUCCESS:
+            raise RuntimeError(f"Pipeline failed: {[name for name, result in results.items() if result.error]}")
+
+        for name, definition in most_successful_plots_definitions.items():
+            with step(f"dashboard({name})"):
+                pd.read_sql_query(definition.query, engine)
+        for name, definition in materialized_plots_definitions.items():
+            with step(f"dashboard_materialized({name})"):
+                pd.read_sql_query(definition.query, engine)
+        star = ParquetStarSchema(os.path.join(directory, 'parquet'))
+        for name, definition in columnar_plots_definitions.items():
+            with step(f"dashboard_columnar({name})"):
+                star.read_ranking(definition.ranking, label=definition.x, limit=definition.limit)
+
+    checksums = _views_checksums(engine)
+    engine.dispose()
+    return dict(stages=_stages(report), checksums=checksums)
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_s: float) -> list[tuple]:
+    """
+    :return: Rows of (stage, baseline seconds, current seconds, ratio, flag) and (view, ..., flag) for
+     changed results. The flag is `REGRESSION`, `IMPROVED`, `NEW`, `RESULT CHANGED` or empty.
+    :rtype: list[tuple]
+    """
+    rows = []
+    for name, stage in current['stages'].items():
+        seconds = stage['wall_time_s']
+        base = baseline.get('stages', {}).get(name, {}).get('wall_time_s')
+        if base is None:
+            rows.append((name, None, seconds, None, 'NEW'))
+            continue
+        ratio = seconds / base if base else None
+        flag = ''
+        if seconds > base * (1 + tolerance) and seconds - base > min_delta_s:
+            flag = 'REGRESSION'
+        elif seconds < base * (1 - tolerance) and base - seconds > min_delta_s:
+            flag = 'IMPROVED'
+        rows.append((name, base, seconds, ratio, flag))
+
+    for view, checksum in current['checksums'].items():
+        if baseline.get('checksums', {}).get(view, checksum) != checksum:
+            rows.append((view, None, None, None, 'RESULT CHANGED'))
+    return rows
+
+
+def _stages(report: RunReport) -> dict:
+    stages: dict[str, dict] = {}
+    for metrics in report.steps:
+        stage = stages.setdefault(metrics.name, dict(wall_time_s=0.0, rows_read=None, rows_written=None))
+        stage['wall_time_s'] = round(stage['wall_time_s'] + metrics.wall_time_s, 6)
+        for key in ('rows_read', 'rows_written'):
+            if getattr(metrics, key) is not None:
+                stage[key] = (stage[key] or 0) + getattr(metrics, key)
+    return stages
+
+
+def _views_checksums(engine) -> dict[str, str]:
+    checksums = {}
+    with Session(engine) as session:
+        for filename in VIEWS_FILES:
+            with open(f'./pipeline/create_views/{filename}', 'r') as file:
+                # DROP VIEW IF EXISTS <name>; CREATE VIEW <name> AS ...
+                view = file.read().split(' AS', 1)[0].split()[-1]
+            rows = sorted(session.execute(text(f"SELECT * FROM {view}")).fetchall(), key=repr)
+            checksums[view] = f"{len(rows)}:{hashlib.sha1(repr(rows).encode()).hexdigest()}"
+    return checksums
+
+
+def _minimum(runs: list[dict]) -> dict:
+    # the fastest of the repeated runs is the least disturbed by the rest of the machine
+    best = runs[0]
+    for run in runs[1:]:
+        for name, stage in run['stages'].items():
+            if stage['wall_time_s'] < best['stages'][name]['wall_time_s']:
+                best['stages'][name] = stage
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, choices=sorted(SCALES), default=1)
+    parser.add_argument('--repeat', type=int, default=1, help='Runs of the pipeline, the fastest stage is kept')
+    parser.add_argument('--latency', type=float, default=0.0, help='Simulated OMDb API latency in seconds')
+    parser.add_argument('--max-in-flight', type=int, default=16)
+    parser.add_argument('--baseline', default=None, help='Baseline file (benchmarks/baselines/pipeline_<scale>x.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown of a stage')
+    parser.add_argument('--min-delta', type=float, default=0.05,
+                        help='Slowdowns below this many seconds are never flagged')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    baseline_path = args.baseline or os.path.join(BASELINES_DIRECTORY, f'pipeline_{args.scale}x.json')
+    if not args.save_baseline and not os.path.exists(baseline_path):
+        # nothing to compare with, the run would pass without checking anything
+        parser.error(f"No baseline in {baseline_path}, run with --save-baseline to store one")
+
+    runs = []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as directory:
+            runs.append(run_pipeline(directory, args.scale, args.latency, args.max_in_flight))
+    current = dict(scale=args.scale, **_minimum(runs))
+
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, 'r') as file:
+            baseline = json.load(file)
+    rows = compare(current, baseline, args.tolerance, args.min_delta)
+
+    print(f"\n{'stage':<55} | {'baseline':>9} | {'current':>9} | {'ratio':>6} | flag")
+    for name, base, seconds, ratio, flag in rows:
+        print(f"{name:<55} | {_format(base, '9.3f'):>9} | {_format(seconds, '9.3f'):>9} | "
+              f"{_format(ratio, '6.2f'):>6} | {flag}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, 'w') as file:
+            json.dump(current, file, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+
+    flagged = [row for row in rows if row[-1] in ('REGRESSION', 'RESULT CHANGED')]
+    if flagged:
+        print(f"{len(flagged)} regressions flagged")
+    raise SystemExit(1 if flagged and args.fail_on_regression else 0)
+
+
+def _format(value: float | None, spec: str) -> str:
+    return '-' if value is None else format(value, spec)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Cold start of the `python -m pipeline` stages, measured with `python -X importtime`.
+
+Every stage runs in a fresh interpreter on a small generated revenues CSV (the fetch against the local
+OMDb stub), as an orchestrator launches them. The import time is the sum of the top level imports
+reported by `-X importtime`, so it does not depend on the work done by the stage. The heavy optional
+dependencies (pandas, requests, pyarrow, plotly, ...) imported by a stage are listed as well.
+
+The import times are compared to the stored baseline. A stage slower than the baseline by more than
+`--tolerance`, or importing a heavy dependency the baseline did not, is flagged as a regression.
+
+Run from the project root:
+
+    python -m benchmarks.startup --save-baseline
+    python -m benchmarks.startup --fail-on-regression
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generators import generate_revenues_csv
+from benchmarks.omdb_stub import OMDBStubServer
+
+BASELINE_PATH = './benchmarks/baselines/startup.json'
+
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'requests', 'furl', 'tqdm', 'plotly', 'ipywidgets')
+
+
+def measure(directory: str, omdb_address: str) -> dict[str, dict]:
+    """
+    Runs every command once and returns its import time, wall time and heavy modules by the command name.
+    """
+    csv_path = os.path.join(directory, 'revenues_per_day.csv')
+    if not os.path.exists(csv_path):
+        generate_revenues_csv(csv_path, rows_number=2_000, titles_number=100)
+    db = ['--db', f"sqlite:///{os.path.join(directory, 'startup.db')}"]
+    commands = {
+        'help': ['-m', 'pipeline', '--help'],
+        'create': ['-m', 'pipeline', 'create'] + db,
+        'ingest': ['-m', 'pipeline', 'ingest', '--csv', csv_path] + db,
+        'fetch': ['-m', 'pipeline', 'fetch', '--omdb-address', omdb_address] + db,
+        'transform': ['-m', 'pipeline', 'transform'] + db,
+        'views': ['-m', 'pipeline', 'views'] + db,
+        'import models.definitions.ingestion': ['-c', 'import models.definitions.ingestion'],
+        'import models.definitions.dashboard': ['-c', 'import models.definitions.dashboard'],
+    }
+
+    results = {}
+    for name, command in commands.items():
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, '-X', 'importtime'] + command, capture_output=True, text=True,
+                                 env=dict(os.environ, OMDB_API_KEY='benchmark'))
+        wall_time_s = time.perf_counter() - start
+        if process.returncode:
+            raise RuntimeError(f"'{name}' failed:\n{process.stdout[-2000:]}\n{process.stderr[-2000:]}")
+        import_time_s, modules = _parse_importtime(process.stderr)
+        results[name] = dict(import_time_s=round(import_time_s, 6),
+                             wall_time_s=round(wall_time_s, 6),
+                             heavy_modules=sorted(modules.intersection(HEAVY_MODULES)))
+    return results
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_s: float) -> list[tuple]:
+    """
+    :return: Rows of (command, baseline seconds, current seconds, ratio, flag). The flag is `REGRESSION`,
+     `NEW HEAVY IMPORT`, `IMPROVED`, `NEW` or empty.
+    :rtype: list[tuple]
+    """
+    rows = []
+    for name, command in current.items():
+        seconds = command['import_time_s']
+        base = baseline.get(name)
+        if base is None:
+            rows.append((name, None, seconds, None, 'NEW'))
+            continue
+        ratio = seconds / base['import_time_s'] if base['import_time_s'] else None
+        flag = ''
+        if set(command['heavy_modules']) - set(base['heavy_modules']):
+            flag = 'NEW HEAVY IMPORT'
+        elif seconds > base['import_time_s'] * (1 + tolerance) and seconds - base['import_time_s'] > min_delta_s:
+            flag = 'REGRESSION'
+        elif seconds < base['import_time_s'] * (1 - tolerance) and base['import_time_s'] - seconds > min_delta_s:
+            flag = 'IMPROVED'
+        rows.append((name, base['import_time_s'], seconds, ratio, flag))
+    return rows
+
+
+def _parse_importtime(stderr: str) -> tuple[float, set[str]]:
+    # import time: self [us] | cumulative | imported package
+    # the nested imports are indented under their importer, the top level ones are not
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, package = line[len('import time:'):].split('|')
+        if not package.startswith('  '):
+            total_us += int(cumulative)
+        modules.add(package.strip().split('.')[0])
+    return total_us / 1_000_000, modules
+
+
+def _minimum(runs: list[dict]) -> dict:
+    # the fastest of the repeated runs is the least disturbed by the rest of the machine (and the disk cache)
+    return {name: min((run[name] for run in runs), key=lambda command: command['import_time_s'])
+            for name in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of every command, the fastest is kept')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown of an import')
+    parser.add_argument('--min-delta', type=float, default=0.05,
+                        help='Smaller differences in seconds are never flagged (noise)')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory, OMDBStubServer() as server:
+        runs = []
+        for _ in range(args.repeat):
+            # every run from an empty database, so the stages do the same work
+            for filename in os.listdir(directory):
+                if filename.startswith('startup.db'):
+                    os.remove(os.path.join(directory, filename))
+            runs.append(measure(directory, server.address))
+    current = _minimum(runs)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+    rows = compare(current, baseline, args.tolerance, args.min_delta)
+
+    print(f"\n{'command':<38} | {'baseline':>9} | {'imports':>9} | {'ratio':>6} | {'wall':>6} | heavy modules")
+    for name, base, seconds, ratio, flag in rows:
+        print(f"{name:<38} | {_format(base, '>9.3f')} | {seconds:>9.3f} | {_format(ratio, '>6.2f')} | "
+              f"{current[name]['wall_time_s']:>6.2f} | {', '.join(current[name]['heavy_modules']) or '-'}"
+              f"{'  ' + flag if flag else ''}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as file:
+            json.dump(current, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif not baseline:
+        print(f"No baseline in {args.baseline}, run with --save-baseline to store one")
+
+    flagged = [row for row in rows if row[-1] in ('REGRESSION', 'NEW HEAVY IMPORT')]
+    if flagged:
+        print(f"{len(flagged)} regressions flagged")
+    raise SystemExit(1 if flagged and args.fail_on_regression else 0)
+
+
+def _format(value: float | None, spec: str) -> str:
+    return format('-', spec.split('.')[0]) if value is None else format(value, spec)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
-from ipywidgets.widgets import Dropdown
+from dataclasses import replace
+
 from pipeline.dashboard.successful import MostSuccessfulPlotDetails
 
 most_successful_plots_definitions = dict(
@@ -76,18 +77,44 @@ most_successful_plots_definitions = dict(
     ),
 )
 
-dropdown = Dropdown(
-    options=[
-        ('Month', 'per_month'),
-        ('Genres', 'genres'),
-        ('Actors', 'actors'),
-        ('Countries', 'countries'),
-        ('Directors', 'directors'),
-        ('Titles', 'movies'),
-        ('Age Rating', 'rating'),
-        ('Year', 'per_year'),
-        ('Writers', 'writers'),
-    ],
-    value="genres",  # Default view
-    description='Select',
-)
+# The same plots read from the tables refreshed by `pipeline.materialization.materialize_rankings`
+rankings_limits = dict(per_month=None, genres=30, actors=30, countries=30, directors=30, movies=30, rating=None,
+                       per_year=None, writers=30)
+materialized_plots_definitions = {
+    name: replace(definition,
+                  query=f"SELECT label AS {definition.x}, total_revenue FROM dwh_agg__rankings "
+                        f"WHERE ranking = '{name}' ORDER BY total_revenue DESC"
+                        + (f" LIMIT {rankings_limits[name]}" if rankings_limits[name] else ""))
+    for name, definition in most_successful_plots_definitions.items()
+}
+
+# The same plots computed by `pipeline.dashboard.columnar.ParquetStarSchema` from the Parquet export
+columnar_plots_definitions = {
+    name: replace(definition, ranking=name, limit=rankings_limits[name])
+    for name, definition in most_successful_plots_definitions.items()
+}
+
+
+def __getattr__(name: str):
+    # the `dropdown` widget is created on its first import, so headless runs reading the definitions
+    # do not load ipywidgets
+    if name == 'dropdown':
+        from ipywidgets.widgets import Dropdown
+
+        globals()[name] = Dropdown(
+            options=[
+                ('Month', 'per_month'),
+                ('Genres', 'genres'),
+                ('Actors', 'actors'),
+                ('Countries', 'countries'),
+                ('Directors', 'directors'),
+                ('Titles', 'movies'),
+                ('Age Rating', 'rating'),
+                ('Year', 'per_year'),
+                ('Writers', 'writers'),
+            ],
+            value="genres",  # Default view
+            description='Select',
+        )
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -6,11 +6,16 @@ revenues_per_day_definition = \
         filepath='./data_to_ingest/revenues_per_day.csv',
         orm_class=STGDayRevenue,
         separator=',',
-        is_header=True
+        is_header=True,
+        chunksize=100_000
     )
 
 movies_details_api_fetch_definition = \
     OMDBAPIFetchDefinition(
         omdb_address='http://www.omdbapi.com',
         allowed_failed_attempts=10,
-        dry_run=False)
+        dry_run=False,
+        max_in_flight=4,
+        requests_per_second=10,
+        daily_quota=1000,  # OMDb free key quota
+        cache_path='./db/omdb_cache.db')
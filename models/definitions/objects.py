@@ -84,3 +84,21 @@ class Company(str):
 class Score(int):
     pass
 
+
+class PersonRole(_Enum):
+    DIRECTOR = "DIRECTOR"
+    WRITER = "WRITER"
+    ACTOR = "ACTOR"
+
+
+class TitleMatch(_Enum):
+    EXACT = "EXACT"
+    API = "API"
+    NORMALIZED = "NORMALIZED"
+    FUZZY = "FUZZY"
+    MANUAL = "MANUAL"
+
+
+class ChangeTracking(_Enum):
+    TRIGGERS = "TRIGGERS"
+    CHANGELOG = "CHANGELOG"
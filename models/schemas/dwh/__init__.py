@@ -12,7 +12,8 @@ class DWHSQLModel(SQLModel):
 
     id: Optional[IdInt] = Field(default=None, primary_key=True)
     created_date: DateValue = Field(sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP"), })
-    modified_date: DateValue = Field(sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP"), })
+    modified_date: DateValue = Field(sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP"),
+                                                       "onupdate": text("CURRENT_TIMESTAMP"), })
 
     @classmethod
     def get_trigger_name(cls):
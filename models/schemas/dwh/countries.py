@@ -0,0 +1,10 @@
+from sqlmodel import Field
+
+from models.definitions.objects import Country
+from models.schemas.dwh import DWHSQLModel
+
+
+class DWHCountry(DWHSQLModel, table=True):
+    __tablename__ = "dwh_dim__countries"
+
+    name: Country = Field(index=True, unique=True, nullable=False)
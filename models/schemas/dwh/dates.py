@@ -7,4 +7,14 @@ from models.schemas.dwh import DWHSQLModel
 class DWHDate(DWHSQLModel, table=True):
     __tablename__ = "dwh_dim__dates"
 
+    # the calendar of whole years over the range of the STG dates (`dwh_dim__dates.sql`), the `id` is
+    # the YYYYMMDD number of the date, so the dates are looked up by the integer primary key
     value: DateValue = Field(index=True, unique=True, nullable=False)
+    year: int = Field(nullable=False, index=True)
+    quarter: int = Field(nullable=False, index=True)
+    month: int = Field(nullable=False, index=True)
+    iso_year: int = Field(nullable=False)
+    iso_week: int = Field(nullable=False, index=True)
+    weekday: int = Field(nullable=False, index=True)  # ISO, 1 is Monday
+    is_weekend: bool = Field(nullable=False, index=True)
+    is_holiday: bool = Field(nullable=False, index=True)
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import Field
 
 from models.definitions.objects import IdInt, DollarsFull
@@ -16,4 +16,6 @@ class DWHDayRevenue(DWHSQLModel, table=True):
     revenue: DollarsFull = Field(nullable=False)
     theaters_number: Optional[int] = Field(nullable=True)
 
-    __table_args__ = (UniqueConstraint('movie_id', 'date_id', name='uix_movie_id_date_id'),)
+    __table_args__ = (UniqueConstraint('movie_id', 'date_id', name='uix_movie_id_date_id'),
+                      Index('ix_dwh_fact__revenues_modified_date', 'modified_date'),
+                      Index('ix_dwh_fact__revenues_movie_id_revenue', 'movie_id', 'revenue'),)
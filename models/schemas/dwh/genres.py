@@ -0,0 +1,10 @@
+from sqlmodel import Field
+
+from models.definitions.objects import Genre
+from models.schemas.dwh import DWHSQLModel
+
+
+class DWHGenre(DWHSQLModel, table=True):
+    __tablename__ = "dwh_dim__genres"
+
+    name: Genre = Field(index=True, unique=True, nullable=False)
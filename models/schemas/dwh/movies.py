@@ -1,6 +1,6 @@
 from typing import Optional
 
-from sqlalchemy import Column, JSON, String
+from sqlalchemy import Column, Index, JSON, String
 from sqlmodel import Field
 
 from models.definitions.objects import Title, AgeRating, Genre, FullName, Description, Language, Country, \
@@ -14,7 +14,7 @@ class DWHMovie(DWHSQLModel, table=True):
     title: Title = Field(nullable=False, index=True)
     start_year_date_id: Optional[IdInt] = Field(nullable=True, foreign_key="dwh_dim__dates.id", index=True)
     end_year_date_id: Optional[IdInt] = Field(nullable=True, foreign_key="dwh_dim__dates.id", index=True)
-    rated: Optional[AgeRating]
+    rated: Optional[AgeRating] = Field(nullable=True, index=True)
     release_date_id: Optional[IdInt] = Field(nullable=True, foreign_key="dwh_dim__dates.id", index=True)
     length_min: Optional[int]
     genre: Optional[list[Genre]] = Field(sa_column=Column(JSON))
@@ -33,3 +33,4 @@ class DWHMovie(DWHSQLModel, table=True):
     boxoffice: Optional[DollarsFull]
     production: Optional[list[Company]] = Field(sa_column=Column(JSON))
 
+    __table_args__ = (Index('ix_dwh_dim__movies_modified_date', 'modified_date'),)
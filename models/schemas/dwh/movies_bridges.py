@@ -0,0 +1,36 @@
+from sqlalchemy import Index, UniqueConstraint
+from sqlmodel import Field
+
+from models.definitions.objects import IdInt, PersonRole
+from models.schemas.dwh import DWHSQLModel
+
+
+class DWHMoviePerson(DWHSQLModel, table=True):
+    __tablename__ = "dwh_bridge__movies_people"
+
+    movie_id: IdInt = Field(nullable=False, foreign_key="dwh_dim__movies.id")
+    person_id: IdInt = Field(nullable=False, foreign_key="dwh_dim__people.id")
+    role: PersonRole = Field(nullable=False)
+
+    __table_args__ = (UniqueConstraint('movie_id', 'person_id', 'role', name='uix_movie_id_person_id_role'),
+                      Index('ix_dwh_bridge__movies_people_role_person_id', 'role', 'person_id', 'movie_id'),)
+
+
+class DWHMovieGenre(DWHSQLModel, table=True):
+    __tablename__ = "dwh_bridge__movies_genres"
+
+    movie_id: IdInt = Field(nullable=False, foreign_key="dwh_dim__movies.id")
+    genre_id: IdInt = Field(nullable=False, foreign_key="dwh_dim__genres.id")
+
+    __table_args__ = (UniqueConstraint('movie_id', 'genre_id', name='uix_movie_id_genre_id'),
+                      Index('ix_dwh_bridge__movies_genres_genre_id', 'genre_id', 'movie_id'),)
+
+
+class DWHMovieCountry(DWHSQLModel, table=True):
+    __tablename__ = "dwh_bridge__movies_countries"
+
+    movie_id: IdInt = Field(nullable=False, foreign_key="dwh_dim__movies.id")
+    country_id: IdInt = Field(nullable=False, foreign_key="dwh_dim__countries.id")
+
+    __table_args__ = (UniqueConstraint('movie_id', 'country_id', name='uix_movie_id_country_id'),
+                      Index('ix_dwh_bridge__movies_countries_country_id', 'country_id', 'movie_id'),)
@@ -0,0 +1,12 @@
+from sqlmodel import Field
+
+from models.definitions.objects import DollarsFull, IdInt
+from models.schemas.dwh import DWHSQLModel
+
+
+class DWHMovieRevenueSummary(DWHSQLModel, table=True):
+    __tablename__ = "dwh_agg__movies_revenues"
+
+    movie_id: IdInt = Field(nullable=False, foreign_key="dwh_dim__movies.id", index=True, unique=True)
+    total_revenue: DollarsFull = Field(nullable=False)
+    revenue_days: int = Field(nullable=False)
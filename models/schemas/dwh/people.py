@@ -0,0 +1,10 @@
+from sqlmodel import Field
+
+from models.definitions.objects import FullName
+from models.schemas.dwh import DWHSQLModel
+
+
+class DWHPerson(DWHSQLModel, table=True):
+    __tablename__ = "dwh_dim__people"
+
+    name: FullName = Field(index=True, unique=True, nullable=False)
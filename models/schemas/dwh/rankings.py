@@ -0,0 +1,18 @@
+from typing import Optional
+
+from sqlalchemy import Index, UniqueConstraint
+from sqlmodel import Field
+
+from models.definitions.objects import DollarsFull
+from models.schemas.dwh import DWHSQLModel
+
+
+class DWHRanking(DWHSQLModel, table=True):
+    __tablename__ = "dwh_agg__rankings"
+
+    ranking: str = Field(nullable=False)
+    label: Optional[str] = Field(nullable=True)
+    total_revenue: DollarsFull = Field(nullable=False)
+
+    __table_args__ = (UniqueConstraint('ranking', 'label', name='uix_ranking_label'),
+                      Index('ix_dwh_agg__rankings_ranking_total_revenue', 'ranking', 'total_revenue'),)
@@ -0,0 +1,16 @@
+from typing import Optional
+
+from sqlmodel import Field
+
+from models.definitions.objects import IMDbId, Title, TitleMatch
+from models.schemas.dwh import DWHSQLModel
+
+
+class DWHTitleMap(DWHSQLModel, table=True):
+    __tablename__ = "dwh_map__titles"
+
+    title: Title = Field(index=True, unique=True, nullable=False)
+    normalized_title: str = Field(index=True, nullable=False)
+    imdb_id: IMDbId = Field(index=True, nullable=False)
+    method: TitleMatch = Field(nullable=False)
+    similarity: Optional[float] = Field(nullable=True)
@@ -0,0 +1,15 @@
+from pydantic import ConfigDict
+from sqlmodel import Field, SQLModel
+
+from models.definitions.objects import DateValue
+
+
+class METAChange(SQLModel, table=True):
+    __tablename__ = "meta_changelog"
+    __table_args__ = {"sqlite_with_rowid": False}
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    table_name: str = Field(primary_key=True)
+    changed_date: DateValue = Field(primary_key=True)
+    # the primary key of the changed row, a JSON array of the values if the key has several columns
+    row_key: str = Field(primary_key=True)
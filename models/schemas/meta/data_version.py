@@ -0,0 +1,15 @@
+from pydantic import ConfigDict
+from sqlalchemy import text
+from sqlmodel import Field, SQLModel
+
+from models.definitions.objects import DateValue
+
+
+class METADataVersion(SQLModel, table=True):
+    __tablename__ = "meta_data_version"
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # a single row, increased in the transaction of every step changing the DWH data
+    id: int = Field(primary_key=True)
+    version: int = Field(nullable=False)
+    modified_date: DateValue = Field(sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP"), })
@@ -0,0 +1,18 @@
+from typing import Optional
+
+from pydantic import ConfigDict
+from sqlalchemy import text
+from sqlmodel import Field, SQLModel
+
+from models.definitions.objects import DateValue, Title
+
+
+class METAFetchCheckpoint(SQLModel, table=True):
+    __tablename__ = "meta_fetch_checkpoints"
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    title: Title = Field(primary_key=True)
+    state: str = Field(nullable=False, index=True)
+    message: Optional[str] = Field(nullable=True)
+    attempts: int = Field(nullable=False, sa_column_kwargs={"server_default": text("1"), })
+    modified_date: DateValue = Field(sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP"), })
@@ -0,0 +1,29 @@
+from pydantic import ConfigDict
+from sqlalchemy import text
+from sqlmodel import Field, SQLModel
+
+from models.definitions.objects import DateValue
+
+
+class METAIngestedFile(SQLModel, table=True):
+    __tablename__ = "meta_ingested_files"
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    table_name: str = Field(primary_key=True)
+    filepath: str = Field(primary_key=True)
+    size: int = Field(nullable=False)
+    mtime_ns: int = Field(nullable=False)
+    file_hash: str = Field(nullable=False)
+    ingestion_no: int = Field(nullable=False, index=True)
+    modified_date: DateValue = Field(sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP"), })
+
+
+class METAIngestedPartition(SQLModel, table=True):
+    __tablename__ = "meta_ingested_partitions"
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    table_name: str = Field(primary_key=True)
+    partition_key: str = Field(primary_key=True)
+    content_hash: str = Field(nullable=False)
+    rows_number: int = Field(nullable=False)
+    modified_date: DateValue = Field(sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP"), })
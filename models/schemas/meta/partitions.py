@@ -0,0 +1,20 @@
+from typing import Optional
+
+from pydantic import ConfigDict
+from sqlalchemy import text
+from sqlmodel import Field, SQLModel
+
+from models.definitions.objects import DateValue
+
+
+class METAPartition(SQLModel, table=True):
+    __tablename__ = "meta_partitions"
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    target: str = Field(primary_key=True)
+    partition_key: str = Field(primary_key=True)
+    since: str = Field(nullable=False)
+    run_start: str = Field(nullable=False)
+    state: str = Field(nullable=False)
+    rows_number: Optional[int] = Field(nullable=True)
+    modified_date: DateValue = Field(sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP"), })
@@ -0,0 +1,14 @@
+from pydantic import ConfigDict
+from sqlalchemy import text
+from sqlmodel import Field, SQLModel
+
+from models.definitions.objects import DateValue
+
+
+class METAWatermark(SQLModel, table=True):
+    __tablename__ = "meta_watermarks"
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    target: str = Field(primary_key=True)
+    value: str = Field(nullable=False)
+    modified_date: DateValue = Field(sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP"), })
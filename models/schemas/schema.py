@@ -4,9 +4,26 @@ from models.schemas.dwh.movies import DWHMovie
 from models.schemas.dwh.distributors import DWHDistributor
 from models.schemas.dwh.movies_reviewers import DWHMovieReviewer
 from models.schemas.dwh.reviews_results import DWHReviewResult
+from models.schemas.dwh.people import DWHPerson
+from models.schemas.dwh.genres import DWHGenre
+from models.schemas.dwh.countries import DWHCountry
+from models.schemas.dwh.movies_bridges import DWHMoviePerson, DWHMovieGenre, DWHMovieCountry
+from models.schemas.dwh.movies_revenues import DWHMovieRevenueSummary
+from models.schemas.dwh.rankings import DWHRanking
+from models.schemas.dwh.titles_map import DWHTitleMap
 from models.schemas.stg.revenue_per_day import STGDayRevenue
 from models.schemas.stg.movies_details import STGMovie
+from models.schemas.meta.watermarks import METAWatermark
+from models.schemas.meta.partitions import METAPartition
+from models.schemas.meta.fetch_checkpoints import METAFetchCheckpoint
+from models.schemas.meta.changelog import METAChange
+from models.schemas.meta.ingestion_manifest import METAIngestedFile, METAIngestedPartition
+from models.schemas.meta.data_version import METADataVersion
 
 stg_orms = [STGDayRevenue, STGMovie,]
-dwh_orms = [DWHMovieReviewer, DWHMovie, DWHReviewResult, DWHDistributor, DWHDate, DWHDayRevenue,]
+dwh_orms = [DWHMovieReviewer, DWHMovie, DWHReviewResult, DWHDistributor, DWHDate, DWHDayRevenue,
+            DWHPerson, DWHGenre, DWHCountry, DWHMoviePerson, DWHMovieGenre, DWHMovieCountry, DWHTitleMap,]
+agg_orms = [DWHMovieRevenueSummary, DWHRanking,]
+meta_orms = [METAWatermark, METAPartition, METAFetchCheckpoint, METAChange, METAIngestedFile, METAIngestedPartition,
+             METADataVersion,]
 
@@ -11,7 +11,8 @@ class STGSQLModel(SQLModel, ABC):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     created_date: DateValue = Field(sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP"), })
-    modified_date: DateValue = Field(sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP"), })
+    modified_date: DateValue = Field(index=True, sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP"),
+                                                                   "onupdate": text("CURRENT_TIMESTAMP"), })
 
     @classmethod
     @abstractmethod
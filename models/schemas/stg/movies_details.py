@@ -1,16 +1,50 @@
-from sqlalchemy import Column, JSON
+from typing import Optional
+
+from sqlalchemy import Column, Computed, JSON, String
 from sqlmodel import Field
 
 from models.definitions.objects import Title, JSONDict
 from models.schemas.stg import STGSQLModel
 
 
+def _response_field(json_key: str, index: bool = False):
+    """
+    Column materialized from the OMDb JSON response at write time (STORED generated column),
+    so the transformations don't have to parse the JSON again.
+    """
+    return Field(default=None,
+                 sa_column=Column(String, Computed(f"json_extract(response, '$.{json_key}')", persisted=True),
+                                  index=index))
+
+
 class STGMovie(STGSQLModel, table=True):
     __tablename__ = "stg_movies_details"
 
     title: Title = Field(primary_key=True)
     response: JSONDict = Field(sa_column=Column(JSON, nullable=False))
 
+    omdb_title: Optional[str] = _response_field('Title', index=True)
+    imdb_id: Optional[str] = _response_field('imdbID', index=True)
+    year: Optional[str] = _response_field('Year')
+    rated: Optional[str] = _response_field('Rated')
+    released: Optional[str] = _response_field('Released')
+    runtime: Optional[str] = _response_field('Runtime')
+    genre: Optional[str] = _response_field('Genre')
+    director: Optional[str] = _response_field('Director')
+    writer: Optional[str] = _response_field('Writer')
+    actors: Optional[str] = _response_field('Actors')
+    plot: Optional[str] = _response_field('Plot')
+    language: Optional[str] = _response_field('Language')
+    country: Optional[str] = _response_field('Country')
+    awards: Optional[str] = _response_field('Awards')
+    poster: Optional[str] = _response_field('Poster')
+    imdb_rating: Optional[str] = _response_field('imdbRating')
+    imdb_votes: Optional[str] = _response_field('imdbVotes')
+    type: Optional[str] = _response_field('Type')
+    dvd: Optional[str] = _response_field('DVD')
+    box_office: Optional[str] = _response_field('BoxOffice')
+    production: Optional[str] = _response_field('Production')
+
     @classmethod
     def get_trigger_name(cls) -> str:
         return f'trigger_update_modified_date_{cls.__tablename__}'
@@ -12,7 +12,7 @@ class STGDayRevenue(STGSQLModel, table=True):
 
     id: Optional[str]
     date: str = Field(primary_key=True)
-    title: str = Field(primary_key=True)
+    title: str = Field(primary_key=True, index=True)
     revenue: Optional[int] 
     theaters: Optional[int]
     distributor: Optional[str]
@@ -4,6 +4,7 @@ from enum import Enum
 class State(Enum):
     FAIL = 'FAIL'
     SUCCESS = 'SUCCESS'
+    SKIPPED = 'SKIPPED'
 
     def __str__(self):
         return str(self.value)
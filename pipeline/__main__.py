@@ -0,0 +1,110 @@
+"""
+Runs one stage of the main flow (`pipeline.flows`), for orchestrators launching the steps one by one.
+
+Run from the project root:
+
+    python -m pipeline create --db sqlite:///./db/task.db
+    python -m pipeline ingest --csv ./data_to_ingest/revenues_per_day.csv
+    OMDB_API_KEY=... python -m pipeline fetch --limit-calls 1000
+    python -m pipeline transform --incremental
+    python -m pipeline views
+
+A stage runs the tasks of the flow it consists of, in parallel where they are independent, and
+expects the previous stages to have succeeded. Only argparse is imported to parse the arguments,
+the pipeline modules are imported by the stage, and pandas, requests, pyarrow or plotly only by the
+functions which use them (`python -m benchmarks.startup` measures the import time of every stage).
+"""
+import argparse
+import os
+
+from pipeline import State
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default='sqlite:///./db/task.db', help='SQLAlchemy database URL')
+    common.add_argument('--max-workers', type=int, default=4, help='Maximum number of concurrent tasks')
+    common.add_argument('--busy-timeout', type=float, default=600,
+                        help='Seconds a task waits for another task holding the SQLite write lock')
+    common.add_argument('--report', default=None, help='Path of the JSON run report (timings, rows, query plans)')
+    common.add_argument('--profile-dir', default=None, help='Directory for per-step cProfile dumps')
+
+    parser = argparse.ArgumentParser(prog='python -m pipeline', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    stages = parser.add_subparsers(dest='stage', required=True, metavar='stage')
+
+    create = stages.add_parser('create', parents=[common], help='Create the STG, DWH, aggregates and META tables')
+    create.add_argument('--change-tracking', choices=('changelog', 'triggers'), default='changelog',
+                        help='Track the changed rows by the change log or by the modified_date triggers')
+
+    ingest = stages.add_parser('ingest', parents=[common], help='Ingest the revenues per day CSV file')
+    ingest.add_argument('--csv', default=None,
+                        help='Revenues per day CSV file, or a directory or glob pattern of files '
+                             '(the one of `revenues_per_day_definition` by default)')
+
+    fetch = stages.add_parser('fetch', parents=[common], help='Fetch the movies details from the OMDb API')
+    fetch.add_argument('--omdb-address', default=None)
+    fetch.add_argument('--limit-calls', type=int, default=None, help='Limit of OMDb entries to fetch')
+    fetch.add_argument('--refresh', action='store_true',
+                       help='Fetch again by imdbID the known movies not checked for a week (changed ones only merged)')
+    fetch.add_argument('--incremental', action='store_true', help='Map the titles of the new revenues only')
+
+    transform = stages.add_parser('transform', parents=[common], help='Populate the DWH tables')
+    transform.add_argument('--incremental', action='store_true', help='Incremental transformations')
+    transform.add_argument('--materialize', action='store_true', help='Refresh the materialized dashboard rankings')
+    transform.add_argument('--partitioned', choices=('month', 'year'), default=None,
+                           help='Load the fact table by partitions of the date in parallel processes (resumable)')
+    transform.add_argument('--parquet-dir', default=None,
+                           help='Export the star schema to Parquet files in this directory (columnar dashboard)')
+
+    stages.add_parser('views', parents=[common], help='Create the dashboard views')
+    return parser.parse_args(argv)
+
+
+def run(args: argparse.Namespace) -> State:
+    """
+    Runs the tasks of the `args.stage` stage of `build_main_flow`, see `pipeline.flows.STAGES`.
+
+    :return: Returns `State.SUCCESS` if all the tasks of the stage succeeded.
+    :rtype: State
+    """
+    from dataclasses import replace
+
+    from sqlmodel import create_engine
+
+    from models.definitions.ingestion import movies_details_api_fetch_definition, revenues_per_day_definition
+    from models.definitions.objects import ChangeTracking
+    from pipeline.dag import dag_state, run_dag, subgraph
+    from pipeline.flows import STAGES, build_main_flow, print_results
+    from pipeline.instrumentation import instrumented_run
+
+    engine = create_engine(args.db, echo=False, connect_args=dict(timeout=args.busy_timeout))
+    tasks = build_main_flow(engine=engine,
+                            revenues_definition=replace(revenues_per_day_definition,
+                                                        filepath=getattr(args, 'csv', None)
+                                                        or revenues_per_day_definition.filepath),
+                            fetch_definition=replace(movies_details_api_fetch_definition,
+                                                     omdb_address=getattr(args, 'omdb_address', None)
+                                                     or movies_details_api_fetch_definition.omdb_address),
+                            api_key=os.environ.get('OMDB_API_KEY'),
+                            limit_calls=getattr(args, 'limit_calls', None),
+                            incremental=getattr(args, 'incremental', False),
+                            materialize=getattr(args, 'materialize', False),
+                            partitioned=getattr(args, 'partitioned', None),
+                            parquet_directory=getattr(args, 'parquet_dir', None),
+                            refresh=getattr(args, 'refresh', False),
+                            change_tracking=ChangeTracking(getattr(args, 'change_tracking', 'changelog').upper()))
+    tasks = subgraph(tasks, {task.name for task in tasks if STAGES[args.stage](task.name)})
+
+    with instrumented_run(report_path=args.report, profile_dir=args.profile_dir):
+        results = run_dag(tasks, max_workers=args.max_workers)
+    print_results(results)
+    return dag_state(results)
+
+
+def main(argv: list[str] | None = None):
+    raise SystemExit(0 if run(_parse_args(argv)) == State.SUCCESS else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from models.schemas.meta.changelog import METAChange
+from models.schemas.meta.watermarks import METAWatermark
+from pipeline.watermarks import INITIAL_WATERMARK
+
+
+def is_change_logged(connection) -> bool:
+    """
+    Checks whether the change log exists (it is created with the META tables).
+
+    :param connection: A DBAPI connection or cursor of the SQLite database.
+    """
+    return bool(connection.execute(f"""
+        SELECT EXISTS (
+                SELECT 1
+                FROM sqlite_master
+                WHERE type = 'table'
+                    AND name = '{METAChange.__tablename__}'
+                );
+    """).fetchone()[0])
+
+
+def get_row_key_sql(connection, table_name: str) -> str:
+    """
+    Returns the SQL expression of the key of a row of the table in the change log: the primary key
+    column, or a `json_array` of the primary key columns in their order, e.g. `json_array(date, title)`
+    for `stg_revenues_per_day`. The `rowid` is used only for a table without a primary key.
+
+    :param connection: A DBAPI connection or cursor of the SQLite database.
+    """
+    columns = [row[1] for row in sorted(connection.execute(f"PRAGMA table_info({table_name});").fetchall(),
+                                        key=lambda row: row[5])
+               if row[5]]
+    if not columns:
+        return 'rowid'
+    if len(columns) == 1:
+        return columns[0]
+    return f"json_array({', '.join(columns)})"
+
+
+def log_changes(connection, table_name: str, since: str) -> int:
+    """
+    Appends the keys of the rows of the table changed since `since` to the change log.
+
+    The UPSERTs set `modified_date` themselves, so the rows inserted or updated by a transaction are
+    the ones with `modified_date >= since`, where `since` is the `CURRENT_TIMESTAMP` read at its start.
+    They are appended by one `INSERT ... SELECT` (on the `modified_date` index of the big tables) in the
+    same transaction, instead of a trigger executed for every updated row. The key is the primary key
+    of the row (see `get_row_key_sql`), which, unlike the `rowid` of a table with a text primary key,
+    is not changed by a `VACUUM`.
+
+    The incremental statements read the log instead of the `modified_date` of their sources, e.g.
+    `WHERE :full_refresh OR title IN (SELECT row_key FROM meta_changelog WHERE table_name =
+    'stg_movies_details' AND changed_date >= :since)` (see `get_changes_params`). The deleted rows are
+    not in the table anymore: `dwh_fact__revenues.sql` logs the movies of the facts it deletes itself,
+    under `dwh_fact__revenues:deleted`, for the revenue summaries.
+
+    :param connection: A DBAPI connection or cursor of the SQLite database, in the writing transaction.
+    :param table_name: The name of the changed table.
+    :type table_name: str
+    :param since: The timestamp from which the changes are logged.
+    :type since: str
+
+    :return: The number of logged keys.
+    :rtype: int
+    """
+    if not is_change_logged(connection):
+        return 0
+    return connection.execute(f"""
+        INSERT OR IGNORE INTO {METAChange.__tablename__} (table_name, changed_date, row_key)
+        SELECT :table_name
+            ,modified_date
+            ,{get_row_key_sql(connection, table_name)}
+        FROM {table_name}
+        WHERE modified_date >= :since;
+    """, {"table_name": table_name, "since": since}).rowcount
+
+
+def get_changes_params(since: str) -> dict:
+    """
+    Returns the parameters of the incremental statements: `:since` and `:full_refresh`, which is true
+    when all the rows are processed (`since` is `INITIAL_WATERMARK`, a full refresh or the first run of
+    the target). The change log is read only when it is false, as its older entries are pruned.
+    """
+    return {"since": since, "full_refresh": since == INITIAL_WATERMARK}
+
+
+def prune_changelog(session: Session) -> int:
+    """
+    Deletes the change log entries older than the oldest high-water mark of the incremental targets,
+    which no target reads anymore. It is executed in the transaction setting the high-water mark of
+    a target, so the log keeps only the changes since the oldest run of its consumers.
+
+    :return: The number of deleted entries.
+    :rtype: int
+    """
+    return session.execute(text(f"""
+        DELETE FROM {METAChange.__tablename__}
+        WHERE changed_date < (
+                SELECT MIN(value)
+                FROM {METAWatermark.__tablename__}
+                );
+    """)).rowcount
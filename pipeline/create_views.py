@@ -1,7 +1,12 @@
+import re
+
 from sqlalchemy import text, Engine
 from sqlalchemy.orm import Session
 
 from pipeline import State
+from pipeline.data_version import bump_data_version
+from pipeline.instrumentation import explain_query_plan, step
+from pipeline.transformation import _split_statements
 
 
 class SQLFilename(str):
@@ -14,8 +19,11 @@ def create_using_sql(filename: SQLFilename, engine: Engine) -> State:
 
     This function reads an SQL query from a file located in the
     `./pipeline/create_views/` directory, executes the query within a session
-    using the provided SQLAlchemy engine. If the query is successful, it commits
+    using the provided SQLAlchemy engine. A view file drops the view before creating it, so the view of
+    an existing database is replaced by the current definition. If the query is successful, it commits
     the transaction, otherwise it rolls back any changes and raises the exception.
+    The data version is bumped in the same transaction, which invalidates the cached dashboard results.
+    The run is measured as a step of the active run report with the query plan of the created view.
 
     :param filename: The name of the SQL file (excluding the path) that contains the SQL query.
     :type filename: SQLFilename
@@ -37,9 +45,14 @@ def create_using_sql(filename: SQLFilename, engine: Engine) -> State:
     except FileNotFoundError:
         raise
 
-    with Session(engine) as session:
+    with step(f"create_using_sql({filename})"), Session(engine) as session:
         try:
-            session.execute(text(sql_query))
+            for statement in _split_statements(sql_query):
+                session.execute(text(statement))
+            view = re.search(r'CREATE\s+VIEW\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', sql_query, re.IGNORECASE)
+            if view:
+                explain_query_plan(session, view.group(1), f"SELECT * FROM {view.group(1)}")
+            bump_data_version(session)
             session.commit()
         except Exception:
             session.rollback()
@@ -1,22 +1,25 @@
-CREATE VIEW IF NOT EXISTS actors_revenues AS
+DROP VIEW IF EXISTS actors_revenues;
+
+CREATE VIEW actors_revenues AS
 WITH actor_data AS (
     SELECT
-        m.id,
-        json_each.value AS actor,
-        r.revenue
+        mp.person_id,
+        SUM(r.revenue) AS total_revenue
     FROM
-        dwh_dim__movies m
-        ,json_each(m.actors)
+        dwh_bridge__movies_people mp
     JOIN
-        dwh_fact__revenues r ON m.id = r.movie_id
+        dwh_fact__revenues r ON mp.movie_id = r.movie_id
+    WHERE
+        mp.role = 'ACTOR'
+    GROUP BY
+        mp.person_id
 )
 SELECT
-    actor,
-    SUM(revenue) AS total_revenue
+    p.name AS actor,
+    d.total_revenue
 FROM
-    actor_data
-GROUP BY
-    actor
+    actor_data d
+JOIN
+    dwh_dim__people p ON d.person_id = p.id
 ORDER BY
 	total_revenue DESC;
-
@@ -1,21 +1,23 @@
-CREATE VIEW IF NOT EXISTS country_revenue AS
+DROP VIEW IF EXISTS country_revenue;
+
+CREATE VIEW country_revenue AS
 WITH country_data AS (
     SELECT
-        m.id,
-        json_each.value AS country,
-        r.revenue
+        b.country_id,
+        SUM(r.revenue) AS total_revenue
     FROM
-        dwh_dim__movies m
-        ,json_each(m.countries)
+        dwh_bridge__movies_countries b
     JOIN
-        dwh_fact__revenues r ON m.id = r.movie_id
+        dwh_fact__revenues r ON b.movie_id = r.movie_id
+    GROUP BY
+        b.country_id
 )
 SELECT
-    country,
-    SUM(revenue) AS total_revenue
+    x.name AS country,
+    d.total_revenue
 FROM
-    country_data
-GROUP BY
-    country
+    country_data d
+JOIN
+    dwh_dim__countries x ON d.country_id = x.id
 ORDER BY
 	total_revenue DESC;
\ No newline at end of file
@@ -1,21 +1,25 @@
-CREATE VIEW IF NOT EXISTS directors_revenues AS
+DROP VIEW IF EXISTS directors_revenues;
+
+CREATE VIEW directors_revenues AS
 WITH director_data AS (
     SELECT
-        m.id,
-        json_each.value AS director,
-        r.revenue
+        mp.person_id,
+        SUM(r.revenue) AS total_revenue
     FROM
-        dwh_dim__movies m
-        ,json_each(m.directors)
+        dwh_bridge__movies_people mp
     JOIN
-        dwh_fact__revenues r ON m.id = r.movie_id
+        dwh_fact__revenues r ON mp.movie_id = r.movie_id
+    WHERE
+        mp.role = 'DIRECTOR'
+    GROUP BY
+        mp.person_id
 )
 SELECT
-    director,
-    SUM(revenue) AS total_revenue
+    p.name AS director,
+    d.total_revenue
 FROM
-    director_data
-GROUP BY
-    director
+    director_data d
+JOIN
+    dwh_dim__people p ON d.person_id = p.id
 ORDER BY
 	total_revenue DESC;
\ No newline at end of file
@@ -1,4 +1,6 @@
-CREATE VIEW IF NOT EXISTS movies_revenues AS
+DROP VIEW IF EXISTS movies_revenues;
+
+CREATE VIEW movies_revenues AS
 SELECT
     m.title,
     SUM(r.revenue) AS total_revenue
@@ -1,21 +1,23 @@
-CREATE VIEW IF NOT EXISTS genre_revenues AS
+DROP VIEW IF EXISTS genre_revenues;
+
+CREATE VIEW genre_revenues AS
 WITH genre_data AS (
     SELECT
-        m.id,
-        json_each.value AS genre,
-        r.revenue
+        b.genre_id,
+        SUM(r.revenue) AS total_revenue
     FROM
-        dwh_dim__movies m
-        ,json_each(m.genre)
+        dwh_bridge__movies_genres b
     JOIN
-        dwh_fact__revenues r ON m.id = r.movie_id
+        dwh_fact__revenues r ON b.movie_id = r.movie_id
+    GROUP BY
+        b.genre_id
 )
 SELECT
-    genre,
-    SUM(revenue) AS total_revenue
+    x.name AS genre,
+    d.total_revenue
 FROM
-    genre_data
-GROUP BY
-    genre
+    genre_data d
+JOIN
+    dwh_dim__genres x ON d.genre_id = x.id
 ORDER BY
 	total_revenue DESC;
\ No newline at end of file
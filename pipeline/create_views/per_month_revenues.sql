@@ -1,6 +1,8 @@
-CREATE VIEW IF NOT EXISTS per_month_revenues AS
+DROP VIEW IF EXISTS per_month_revenues;
+
+CREATE VIEW per_month_revenues AS
 SELECT
-    strftime('%m', d.value) AS release_month,
+    printf('%02d', d.month) AS release_month,
     CAST(AVG(r.revenue) AS INT) AS total_revenue
 FROM
     dwh_dim__movies m
@@ -9,6 +11,6 @@ JOIN
 JOIN
     dwh_dim__dates d ON m.release_date_id = d.id
 GROUP BY
-    release_month
+    d.month
 ORDER BY
     total_revenue DESC;
\ No newline at end of file
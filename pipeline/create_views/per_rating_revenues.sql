@@ -1,4 +1,6 @@
-CREATE VIEW IF NOT EXISTS per_rating_revenues AS
+DROP VIEW IF EXISTS per_rating_revenues;
+
+CREATE VIEW per_rating_revenues AS
 SELECT
     m.rated AS rating,
     SUM(r.revenue) AS total_revenue
@@ -1,6 +1,8 @@
-CREATE VIEW IF NOT EXISTS per_year_revenues AS
+DROP VIEW IF EXISTS per_year_revenues;
+
+CREATE VIEW per_year_revenues AS
 SELECT
-    strftime('%Y', d.value) AS release_year,
+    printf('%04d', d.year) AS release_year,
     CAST(AVG(r.revenue) AS INT) AS total_revenue
 FROM
     dwh_dim__movies m
@@ -9,6 +11,6 @@ JOIN
 JOIN
     dwh_dim__dates d ON m.release_date_id = d.id
 GROUP BY
-    release_year
+    d.year
 ORDER BY
 	total_revenue DESC;
\ No newline at end of file
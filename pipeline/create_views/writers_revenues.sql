@@ -1,22 +1,25 @@
-CREATE VIEW IF NOT EXISTS writers_revenues AS
+DROP VIEW IF EXISTS writers_revenues;
+
+CREATE VIEW writers_revenues AS
 WITH writer_data AS (
     SELECT
-        m.id,
-        json_each.value AS writer,
-        r.revenue
+        mp.person_id,
+        SUM(r.revenue) AS total_revenue
     FROM
-        dwh_dim__movies m
-        ,json_each(m.writers)
+        dwh_bridge__movies_people mp
     JOIN
-        dwh_fact__revenues r ON m.id = r.movie_id
-
+        dwh_fact__revenues r ON mp.movie_id = r.movie_id
+    WHERE
+        mp.role = 'WRITER'
+    GROUP BY
+        mp.person_id
 )
 SELECT
-    writer,
-    SUM(revenue) AS total_revenue
+    p.name AS writer,
+    d.total_revenue
 FROM
-    writer_data
-GROUP BY
-    writer
+    writer_data d
+JOIN
+    dwh_dim__people p ON d.person_id = p.id
 ORDER BY
 	total_revenue DESC;
\ No newline at end of file
@@ -1,19 +1,64 @@
+from dataclasses import dataclass
+
 from sqlalchemy import Engine, text
+from sqlalchemy.schema import CreateTable
 from sqlmodel import Session, SQLModel
 
+from models.definitions.objects import ChangeTracking
 from models.schemas.dwh import DWHSQLModel
+from models.schemas.dwh.dates import DWHDate
+from models.schemas.dwh.fact_revenue import DWHDayRevenue
+from models.schemas.dwh.movies import DWHMovie
+from models.schemas.meta.changelog import METAChange
+from models.schemas.meta.watermarks import METAWatermark
 from models.schemas.stg import STGSQLModel
 from pipeline import State
+from pipeline.change_tracking import get_changes_params
+from pipeline.instrumentation import instrumented
+from pipeline.sqlite_functions import register_sqlite_functions
+from pipeline.transformation import _split_statements
+from pipeline.watermarks import INITIAL_WATERMARK
+
+
+@dataclass(frozen=True)
+class IndexDefinition:
+    table_name: str
+    columns: tuple[str, ...]
 
+    @property
+    def name(self) -> str:
+        return f"ix_{self.table_name}_{'_'.join(self.columns)}"
 
-def create_from_orms(models: list[DWHSQLModel | STGSQLModel | SQLModel], engine: Engine):
+    def get_create_sql(self) -> str:
+        return f"CREATE INDEX IF NOT EXISTS {self.name} ON {self.table_name} ({', '.join(self.columns)});"
+
+
+@instrumented
+def create_from_orms(models: list[DWHSQLModel | STGSQLModel | SQLModel],
+                     engine: Engine,
+                     indexes: list[IndexDefinition] | None = None,
+                     change_tracking: ChangeTracking = ChangeTracking.CHANGELOG):
     """
-    Creates database tables for a list of ORM models and optionally sets up triggers.
+    Creates database tables for a list of ORM models and sets up the tracking of their changes.
+
+    The STG and DWH models get a `modified_date` column, which is set by the UPSERTs, and the keys of
+    the changed rows are appended to `meta_changelog` by the writing steps
+    (`pipeline.change_tracking.log_changes`), which the incremental steps read. With
+    `ChangeTracking.CHANGELOG` the log is created and the triggers of an older database are dropped.
+    With `ChangeTracking.TRIGGERS` an `AFTER UPDATE` trigger sets `modified_date` again for every
+    updated row as well, which doubles the writes of big UPSERTs.
+    Additional indexes (e.g. the ones proposed by `pipeline.index_advisor`) are created for the tables
+    of the models as well, the indexes of other tables are ignored. A change log or a dates dimension
+    created by an older version is migrated first (see `migrate_changelog` and `migrate_dates_dimension`).
 
     :param models: A list of ORM models (subclasses of `SQLModel`) for which to create tables.
     :type models: list[DWHSQLModel | STGSQLModel | SQLModel]
     :param engine: A SQLAlchemy engine used to connect to the database.
     :type engine: Engine
+    :param indexes: Additional indexes to create if they don't exist.
+    :type indexes: list[IndexDefinition] | None
+    :param change_tracking: How the changes of the STG and DWH tables are tracked.
+    :type change_tracking: ChangeTracking
 
     :return: Returns `State.SUCCESS` if all tables and triggers are created successfully.
     :rtype: State
@@ -21,11 +66,14 @@ def create_from_orms(models: list[DWHSQLModel | STGSQLModel | SQLModel], engine:
     :raises SQLAlchemyError: If there is an error creating the tables or triggers in the database.
     """
 
+    migrate_changelog(engine)
     for model in models:
+        if model is DWHDate:
+            migrate_dates_dimension(engine)
         model.__table__.create(engine, checkfirst=True)
         msg: str = f"If not existed, table '{model.__tablename__}' created"
 
-        if hasattr(model, 'get_trigger_name'):
+        if hasattr(model, 'get_trigger_name') and change_tracking == ChangeTracking.TRIGGERS:
             with Session(engine) as session:
                 result = session.execute(text("""
                     SELECT name FROM sqlite_master WHERE type='trigger' AND name=:trigger_name;
@@ -34,6 +82,117 @@ def create_from_orms(models: list[DWHSQLModel | STGSQLModel | SQLModel], engine:
                     session.execute(text(model.get_trigger_sql()))
                     session.commit()
                 msg = msg + " + modified_date trigger"
+        elif hasattr(model, 'get_trigger_name'):
+            with Session(engine) as session:
+                # IF NOT EXISTS, the STG and DWH tables are created by parallel tasks
+                session.execute(CreateTable(METAChange.__table__, if_not_exists=True))
+                session.execute(text(f"DROP TRIGGER IF EXISTS {model.get_trigger_name()};"))
+                session.commit()
+                msg = msg + " + change log"
+
+        for index in indexes or ():
+            if index.table_name != model.__tablename__:
+                continue
+            with Session(engine) as session:
+                session.execute(text(index.get_create_sql()))
+                session.commit()
+            msg = msg + f" + index {index.name}"
         print(msg)
 
     return State.SUCCESS
+
+
+def migrate_changelog(engine: Engine) -> bool:
+    """
+    Replaces a change log created by an older version (keyed by the `row_id` of the changed rows instead
+    of their `row_key`), which the incremental steps cannot read, and deletes the high-water marks in
+    the same transaction: every target is refreshed fully by its next run.
+
+    :return: Returns `True` if the log was replaced, `False` if it is missing or already keyed by `row_key`.
+    :rtype: bool
+    """
+    def is_older(session: Session) -> bool:
+        columns = [row[1] for row in session.execute(text(f"PRAGMA table_info({METAChange.__tablename__});"))]
+        return bool(columns) and 'row_key' not in columns
+
+    with Session(engine) as session:
+        if not is_older(session):
+            return False
+        try:
+            # the tables are created by parallel tasks: the log is checked again holding the write lock,
+            # so only the first one replaces it
+            session.execute(text("BEGIN IMMEDIATE;"))
+            if not is_older(session):
+                session.rollback()
+                return False
+            session.execute(text(f"DROP TABLE {METAChange.__tablename__};"))
+            session.execute(CreateTable(METAChange.__table__))
+            session.execute(text(f"DELETE FROM {METAWatermark.__tablename__};"))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    print(f"Table '{METAChange.__tablename__}' of an older version replaced, the next runs refresh fully")
+    return True
+
+
+def migrate_dates_dimension(engine: Engine) -> bool:
+    """
+    Migrates a `dwh_dim__dates` table created before the calendar (an autoincrement `id` and the
+    `value` only) in one transaction: the `date_id` of the facts and the date ids of the movies are
+    re-keyed to the `YYYYMMDD` numbers of their dates, the table is created again with the calendar
+    columns and filled by `./pipeline/transformation/dwh_dim__dates.sql` over all the staged dates.
+    The facts of the dates SQLite does not parse are deleted, like the fact load skips them.
+
+    :return: Returns `True` if the table was migrated, `False` if it is missing or already a calendar.
+    :rtype: bool
+
+    :raises SQLAlchemyError: If there is an error executing the SQL queries. Nothing is changed then.
+    """
+    with Session(engine) as session:
+        columns = [row[1] for row in session.execute(text(f"PRAGMA table_info({DWHDate.__tablename__});"))]
+        if not columns or 'year' in columns:
+            return False
+
+        with open('./pipeline/transformation/dwh_dim__dates.sql', 'r') as file:
+            calendar_query = file.read()
+        new_id = "(SELECT CAST(strftime('%Y%m%d', value) AS INTEGER) FROM {table} WHERE id = {column})"
+        try:
+            register_sqlite_functions(session.connection().connection.dbapi_connection)
+            facts_number = session.execute(text(f"""
+                DELETE FROM {DWHDayRevenue.__tablename__}
+                WHERE date_id IN (
+                        SELECT id
+                        FROM {DWHDate.__tablename__}
+                        WHERE strftime('%Y%m%d', value) IS NULL
+                        );
+            """)).rowcount
+            facts_number += session.execute(text(f"""
+                UPDATE {DWHDayRevenue.__tablename__}
+                SET date_id = {new_id.format(table=DWHDate.__tablename__, column='date_id')};
+            """)).rowcount
+            movies_number = session.execute(text(f"""
+                UPDATE {DWHMovie.__tablename__}
+                SET {', '.join(f"{column} = {new_id.format(table=DWHDate.__tablename__, column=column)}"
+                               for column in ('release_date_id', 'dvd_release_date_id', 'start_year_date_id',
+                                              'end_year_date_id'))};
+            """)).rowcount
+            session.execute(text(f"DROP TABLE {DWHDate.__tablename__};"))
+            DWHDate.__table__.create(session.connection())
+            # the calendar statements read the change log
+            session.execute(CreateTable(METAChange.__table__, if_not_exists=True))
+            for statement in _split_statements(calendar_query):
+                session.execute(text(statement), get_changes_params(INITIAL_WATERMARK))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    print(f"Table '{DWHDate.__tablename__}' migrated to the calendar, {facts_number} facts and "
+          f"{movies_number} movies re-keyed")
+    return True
@@ -0,0 +1,129 @@
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from typing import Callable
+
+from pipeline import State
+
+
+@dataclass
+class Task:
+    name: str
+    callable: Callable[..., State]
+    kwargs: dict = field(default_factory=dict)
+    upstream: tuple[str, ...] = ()
+
+
+@dataclass
+class TaskResult:
+    name: str
+    state: State
+    duration_s: float = 0.0
+    error: BaseException | None = None
+
+
+def run_dag(tasks: list[Task], max_workers: int = 4, fail_fast: bool = True) -> dict[str, TaskResult]:
+    """
+    Runs the tasks respecting their dependencies. Every task whose upstream tasks all succeeded
+    is started right away, so independent tasks run concurrently in a thread pool.
+
+    A task fails if it raises or returns anything else than `State.SUCCESS`. Its downstream tasks
+    are `State.SKIPPED`. With `fail_fast` no new task is started after the first failure and all
+    the not started tasks are skipped.
+
+    :param tasks: Tasks of the graph. Names must be unique and upstream names must exist.
+    :type tasks: list[Task]
+    :param max_workers: The maximum number of concurrently running tasks.
+    :type max_workers: int
+    :param fail_fast: Stop starting new tasks after the first failure.
+    :type fail_fast: bool
+
+    :return: Results of all the tasks by the task name, in the order of completion.
+    :rtype: dict[str, TaskResult]
+
+    :raises ValueError: If names are duplicated, an upstream task doesn't exist or the graph has a cycle.
+    """
+    by_name: dict[str, Task] = {task.name: task for task in tasks}
+    _validate(tasks, by_name)
+
+    results: dict[str, TaskResult] = {}
+    running: dict[Future, tuple[Task, float]] = {}
+    started: set[str] = set()
+    failed: bool = False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            for task in tasks:
+                if task.name in results or task.name in started:
+                    continue
+                upstream_states = [results[name].state for name in task.upstream if name in results]
+                if any(state != State.SUCCESS for state in upstream_states) or (failed and fail_fast):
+                    results[task.name] = TaskResult(name=task.name, state=State.SKIPPED)
+                    print(f"[{task.name}] {State.SKIPPED}")
+                elif len(upstream_states) == len(task.upstream):
+                    print(f"[{task.name}] started")
+                    started.add(task.name)
+                    running[executor.submit(task.callable, **task.kwargs)] = (task, time.perf_counter())
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task, start = running.pop(future)
+                duration_s = time.perf_counter() - start
+                try:
+                    state = future.result()
+                    error = None
+                except Exception as e:
+                    state = State.FAIL
+                    error = e
+                    traceback.print_exception(e)
+                if state != State.SUCCESS:
+                    state = State.FAIL
+                    failed = True
+                results[task.name] = TaskResult(name=task.name, state=state, duration_s=duration_s, error=error)
+                print(f"[{task.name}] {state} in {duration_s:.2f}s")
+
+    return results
+
+
+def dag_state(results: dict[str, TaskResult]) -> State:
+    return State.SUCCESS if all(result.state == State.SUCCESS for result in results.values()) else State.FAIL
+
+
+def subgraph(tasks: list[Task], names: set[str]) -> list[Task]:
+    """
+    Returns the named tasks of the graph without their dependencies on the other tasks, to run a part
+    of the graph on its own (e.g. one stage of the flow by `python -m pipeline`). The tasks left out
+    are expected to have succeeded before.
+    """
+    return [replace(task, upstream=tuple(name for name in task.upstream if name in names))
+            for task in tasks if task.name in names]
+
+
+def _validate(tasks: list[Task], by_name: dict[str, Task]):
+    if len(by_name) != len(tasks):
+        raise ValueError("Task names must be unique")
+    for task in tasks:
+        for name in task.upstream:
+            if name not in by_name:
+                raise ValueError(f"Task '{task.name}' depends on unknown task '{name}'")
+
+    visited: set[str] = set()
+    in_progress: set[str] = set()
+
+    def visit(name: str):
+        if name in in_progress:
+            raise ValueError(f"Dependency cycle detected at task '{name}'")
+        if name in visited:
+            return
+        in_progress.add(name)
+        for upstream in by_name[name].upstream:
+            visit(upstream)
+        in_progress.remove(name)
+        visited.add(name)
+
+    for task in tasks:
+        visit(task.name)
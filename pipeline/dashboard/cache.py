@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from sqlalchemy import Engine
+
+from pipeline.data_version import get_data_version
+
+# pandas is imported by the first query read, so importing the plots definitions does not load it
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class QueryResultCache:
+    """
+    Bounded LRU cache of dashboard query results (pandas DataFrames).
+
+    Entries are keyed by the query and the database URL. The cache remembers the data version
+    (`pipeline.data_version`) of every database its entries were read at. The version is read from the
+    database on every lookup, so once a transformation or views creation commits new data, in this or
+    any other process, the entries of the database are dropped. Over `max_entries` the least recently
+    used entry is evicted.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], 'pd.DataFrame'] = OrderedDict()
+        self._data_versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def read_sql_query(self, query: str, engine: Engine) -> 'pd.DataFrame':
+        """
+        Returns the result of `query`, read with `pd.read_sql_query` only if it is not cached.
+
+        The returned DataFrame is shared with the cache and must not be modified.
+
+        :param query: SQL query to execute.
+        :type query: str
+        :param engine: A SQLAlchemy engine used to connect to the database.
+        :type engine: Engine
+
+        :return: The query result.
+        :rtype: pd.DataFrame
+        """
+        key = (str(engine.url), query)
+        data_version = get_data_version(engine)
+        with self._lock:
+            self._check_data_version(key[0], data_version)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        import pandas as pd
+
+        df = pd.read_sql_query(query, engine)
+
+        with self._lock:
+            self._entries[key] = df
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(hits=self.hits,
+                        misses=self.misses,
+                        entries=len(self._entries),
+                        max_entries=self.max_entries,
+                        data_versions=dict(self._data_versions))
+
+    def _check_data_version(self, url: str, data_version: int):
+        if self._data_versions.get(url, data_version) != data_version:
+            for key in [key for key in self._entries if key[0] == url]:
+                del self._entries[key]
+        self._data_versions[url] = data_version
+
+
+dashboard_query_cache = QueryResultCache()
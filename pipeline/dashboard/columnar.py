@@ -0,0 +1,146 @@
+import os
+import threading
+
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from models.definitions.objects import PersonRole
+from pipeline.parquet_export import FACT_TABLE, MANIFEST_FILENAME, PARQUET_DIRECTORY
+
+
+class ParquetStarSchema:
+    """
+    Dashboard engine reading the star schema exported by `pipeline.parquet_export.export_parquet`.
+
+    The rankings are computed with pyarrow and pandas instead of SQLite. Only the `movie_id` and
+    `revenue` columns of the fact dataset are read and aggregated per movie once, every ranking is then
+    computed from that summary and the dimension files. The loaded data is kept until the export is
+    replaced (its `export.json` changes).
+
+    Pass it as the `engine` of `get_most_successful_graph` with the `columnar_plots_definitions`.
+    """
+
+    def __init__(self, directory: str = PARQUET_DIRECTORY):
+        self.directory = directory
+        self._tables: dict[str, pd.DataFrame] = {}
+        self._movies_revenues: pd.DataFrame | None = None
+        self._export_mtime: int | None = None
+        self._lock = threading.Lock()
+
+    def read_ranking(self, ranking: str, label: str, limit: int | None = None) -> pd.DataFrame:
+        """
+        Computes a ranking like the view of the same dashboard plot.
+
+        :param ranking: One of `pipeline.materialization.RANKINGS`.
+        :type ranking: str
+        :param label: The name of the ranked column, e.g. `actor`.
+        :type label: str
+        :param limit: Number of the top rows to return, all if not set.
+        :type limit: int | None
+
+        :return: DataFrame with `label` and `total_revenue` columns ordered by `total_revenue` descending.
+        :rtype: pd.DataFrame
+
+        :raises FileNotFoundError: If there is no export in the directory.
+        :raises KeyError: If the ranking is not known.
+        """
+        with self._lock:
+            self._check_export()
+            df = _RANKINGS[ranking](self)
+        df = df.rename(columns={'label': label}).sort_values('total_revenue', ascending=False, kind='stable')
+        df = df.head(limit) if limit else df
+        return df.reset_index(drop=True)
+
+    def reload(self):
+        with self._lock:
+            self._tables.clear()
+            self._movies_revenues = None
+
+    def _check_export(self):
+        export_mtime = os.stat(os.path.join(self.directory, MANIFEST_FILENAME)).st_mtime_ns
+        if export_mtime != self._export_mtime:
+            self._tables.clear()
+            self._movies_revenues = None
+            self._export_mtime = export_mtime
+
+    def table(self, table_name: str) -> pd.DataFrame:
+        if table_name not in self._tables:
+            self._tables[table_name] = pq.read_table(os.path.join(self.directory, f"{table_name}.parquet")).to_pandas()
+        return self._tables[table_name]
+
+    def movies_revenues(self) -> pd.DataFrame:
+        """
+        Revenue total and number of revenue days per movie (`movie_id`, `total_revenue`, `revenue_days`).
+        """
+        if self._movies_revenues is None:
+            facts = ds.dataset(os.path.join(self.directory, FACT_TABLE), format='parquet', partitioning='hive')
+            summary = facts.to_table(columns=['movie_id', 'revenue']) \
+                .group_by('movie_id') \
+                .aggregate([('revenue', 'sum'), ('revenue', 'count', pc.CountOptions(mode='all'))])
+            self._movies_revenues = summary.rename_columns(
+                {'revenue_sum': 'total_revenue', 'revenue_count': 'revenue_days'}).to_pandas() \
+                if summary.num_rows else pd.DataFrame(columns=['movie_id', 'total_revenue', 'revenue_days'])
+        return self._movies_revenues
+
+
+def _per_person(role: PersonRole):
+    def ranking(star: ParquetStarSchema) -> pd.DataFrame:
+        bridge = star.table('dwh_bridge__movies_people')
+        bridge = bridge[bridge['role'] == role.value]
+        return _per_bridge(star, bridge, 'person_id', 'dwh_dim__people')
+    return ranking
+
+
+def _per_dimension(bridge_table: str, key: str, dimension_table: str):
+    def ranking(star: ParquetStarSchema) -> pd.DataFrame:
+        return _per_bridge(star, star.table(bridge_table), key, dimension_table)
+    return ranking
+
+
+def _per_bridge(star: ParquetStarSchema, bridge: pd.DataFrame, key: str, dimension_table: str) -> pd.DataFrame:
+    totals = bridge[['movie_id', key]] \
+        .merge(star.movies_revenues(), on='movie_id') \
+        .groupby(key, as_index=False)['total_revenue'].sum()
+    return totals.merge(star.table(dimension_table)[['id', 'name']], left_on=key, right_on='id') \
+        .rename(columns={'name': 'label'})[['label', 'total_revenue']]
+
+
+def _per_movie_column(column: str):
+    def ranking(star: ParquetStarSchema) -> pd.DataFrame:
+        movies = star.table('dwh_dim__movies')[['id', column]]
+        df = movies.merge(star.movies_revenues(), left_on='id', right_on='movie_id') \
+            .groupby(column, as_index=False, dropna=False)['total_revenue'].sum() \
+            .rename(columns={column: 'label'})
+        df['label'] = df['label'].astype(object).where(df['label'].notna(), None)
+        return df
+    return ranking
+
+
+def _per_release_date_part(column: str, width: int):
+    def ranking(star: ParquetStarSchema) -> pd.DataFrame:
+        movies = star.table('dwh_dim__movies')[['id', 'release_date_id']]
+        dates = star.table('dwh_dim__dates')[['id', column]].rename(columns={'id': 'date_id'})
+        df = movies.merge(star.movies_revenues(), left_on='id', right_on='movie_id') \
+            .merge(dates, left_on='release_date_id', right_on='date_id')
+        df = df.groupby(column, as_index=False)[['total_revenue', 'revenue_days']].sum()
+        # zero padded like the labels of the views
+        df['label'] = df[column].map(lambda value: f"{value:0{width}d}")
+        # the average revenue per day, truncated like CAST(AVG(revenue) AS INT)
+        df['total_revenue'] = (df['total_revenue'] / df['revenue_days']).astype('int64')
+        return df[['label', 'total_revenue']]
+    return ranking
+
+
+_RANKINGS = dict(
+    per_month=_per_release_date_part('month', 2),
+    genres=_per_dimension('dwh_bridge__movies_genres', 'genre_id', 'dwh_dim__genres'),
+    actors=_per_person(PersonRole.ACTOR),
+    countries=_per_dimension('dwh_bridge__movies_countries', 'country_id', 'dwh_dim__countries'),
+    directors=_per_person(PersonRole.DIRECTOR),
+    movies=_per_movie_column('title'),
+    rating=_per_movie_column('rated'),
+    per_year=_per_release_date_part('year', 4),
+    writers=_per_person(PersonRole.WRITER),
+)
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
-import pandas as pd
-import plotly.express as px
+
+from pipeline.dashboard.cache import QueryResultCache, dashboard_query_cache
 
 
 @dataclass
@@ -11,12 +11,22 @@ class MostSuccessfulPlotDetails:
     labels: dict
     title: str
     text: str
+    ranking: str | None = None
+    limit: int | None = None
+
 
+def get_most_successful_graph(selected, engine, definition, cache: QueryResultCache | None = dashboard_query_cache):
+    # pandas, plotly and pyarrow are loaded by the first graph, not by importing the plots definitions
+    import pandas as pd
+    import plotly.express as px
+    from pipeline.dashboard.columnar import ParquetStarSchema
 
-def get_most_successful_graph(selected, engine, definition):
     d = definition[selected]
 
-    df = pd.read_sql_query(d.query, engine)
+    if isinstance(engine, ParquetStarSchema):
+        df = engine.read_ranking(d.ranking, label=d.x, limit=d.limit)
+    else:
+        df = cache.read_sql_query(d.query, engine) if cache else pd.read_sql_query(d.query, engine)
 
     fig = px.bar(df,
                  x=d.x,
@@ -0,0 +1,39 @@
+from sqlalchemy import Engine, text
+from sqlalchemy.orm import Session
+
+from models.schemas.meta.data_version import METADataVersion
+
+
+def get_data_version(engine: Engine) -> int:
+    """
+    Returns the version of the DWH data in the database, increased by every step that changes it in any
+    process (e.g. a `python -m pipeline transform` run while a notebook shows the dashboard). It is 0
+    before any change, also in a database created before the version table (it is created with the META
+    tables).
+    """
+    with Session(engine) as session:
+        if not session.execute(text(f"""
+            SELECT EXISTS (
+                    SELECT 1
+                    FROM sqlite_master
+                    WHERE type = 'table'
+                        AND name = '{METADataVersion.__tablename__}'
+                    );
+        """)).scalar_one():
+            return 0
+        return session.execute(text(f"""
+            SELECT version FROM {METADataVersion.__tablename__} WHERE id = 1;
+        """)).scalar_one_or_none() or 0
+
+
+def bump_data_version(session: Session):
+    """
+    Marks the DWH data as changed, e.g. by a transformation or views creation, in the transaction of the
+    session writing the changes: the new version is visible to the readers together with the data.
+    """
+    session.execute(text(f"""
+        INSERT INTO {METADataVersion.__tablename__} (id, version)
+        VALUES (1, 1)
+        ON CONFLICT(id) DO UPDATE SET version = version + 1
+            ,modified_date = CURRENT_TIMESTAMP;
+    """))
@@ -0,0 +1,215 @@
+"""
+The main pipeline flow from `diagrams/flows.dbml` declared as a task graph.
+
+Run from the project root:
+
+    python -m pipeline.flows --db sqlite:///./db/task.db --limit-calls 1000
+"""
+import argparse
+import os
+from dataclasses import replace
+
+from sqlalchemy import Engine
+from sqlmodel import create_engine
+
+from models.definitions.objects import ChangeTracking
+from models.schemas.schema import agg_orms, dwh_orms, meta_orms, stg_orms
+from pipeline import State
+from pipeline.create_views import create_using_sql
+from pipeline.creation import create_from_orms
+from pipeline.dag import Task, TaskResult, dag_state, run_dag
+from pipeline.ingestion import CSVIngesterDefinition, OMDBAPIFetchDefinition, csv_ingester_revenues, \
+    fetch_movies_details, refresh_movies_details
+from pipeline.instrumentation import instrumented_run
+from pipeline.materialization import materialize_rankings
+from pipeline.partitioned_load import populate_partitioned
+from pipeline.title_matching import resolve_titles
+from pipeline.transformation import populate_using_sql
+
+VIEWS_FILES = (
+    "actors_revenues.sql",
+    "countries_revenues.sql",
+    "directors_revenues.sql",
+    "movies_revenues.sql",
+    "per_genre_revenues.sql",
+    "per_month_revenues.sql",
+    "per_rating_revenues.sql",
+    "per_year_revenues.sql",
+    "writers_revenues.sql",
+)
+
+BRIDGES_TASKS = (
+    "populate_bridge__movies_people",
+    "populate_bridge__movies_genres",
+    "populate_bridge__movies_countries",
+)
+
+# the stages of `python -m pipeline`, by the names of their tasks in `build_main_flow`
+STAGES = {
+    "create": lambda name: name.startswith("create_") and not name.startswith("create_view_"),
+    "ingest": lambda name: name == "ingest_revenues",
+    "fetch": lambda name: name in ("fetch_and_ingest_movie_details", "refresh_movie_details"),
+    "transform": lambda name: name.startswith("populate_") or name in ("resolve_titles", "materialize_rankings",
+                                                                       "export_parquet"),
+    "views": lambda name: name.startswith("create_view_"),
+}
+
+
+def build_main_flow(engine: Engine,
+                    revenues_definition: CSVIngesterDefinition,
+                    fetch_definition: OMDBAPIFetchDefinition,
+                    api_key: str,
+                    limit_calls: int | None = None,
+                    incremental: bool = False,
+                    materialize: bool = False,
+                    partitioned: str | None = None,
+                    parquet_directory: str | None = None,
+                    refresh: bool = False,
+                    change_tracking: ChangeTracking = ChangeTracking.CHANGELOG) -> list[Task]:
+    """
+    Declares the creation, ingestion, transformation and views tasks with their dependencies.
+
+    The revenues titles are mapped to the movies after the fetch, the ones the API did not find by
+    their normalized key or similarity. With `refresh` the movies already in the DWH are fetched again
+    by imdbID after the new titles, and the changed ones are transformed again. The DWH dimensions
+    without dependencies (dates, distributors, reviewers) run together, then the movies dimension, then reviews results, the fact table and the
+    people, genres and countries dimensions with their bridge tables, and the views at the end.
+    With `materialize` the dashboard rankings tables are refreshed after the fact table as well.
+    With `partitioned` (`month` or `year`) the fact table is loaded by `populate_partitioned`.
+    With `parquet_directory` the star schema is exported to Parquet files there at the end.
+    `change_tracking` is passed to the tables creation (see `create_from_orms`).
+    """
+    def populate(name: str, *upstream: str) -> Task:
+        return Task(name=f"populate_{name}",
+                    callable=populate_using_sql,
+                    kwargs=dict(filename=f"dwh_{name}.sql", engine=engine, incremental=incremental),
+                    upstream=upstream)
+
+    tasks = [
+        Task(name="create_stg", callable=create_from_orms,
+             kwargs=dict(models=stg_orms, engine=engine, change_tracking=change_tracking)),
+        Task(name="create_dwh", callable=create_from_orms,
+             kwargs=dict(models=dwh_orms, engine=engine, change_tracking=change_tracking)),
+        Task(name="create_agg", callable=create_from_orms,
+             kwargs=dict(models=agg_orms, engine=engine, change_tracking=change_tracking),
+             upstream=("create_dwh",)),
+        Task(name="create_meta", callable=create_from_orms, kwargs=dict(models=meta_orms, engine=engine)),
+        Task(name="ingest_revenues",
+             callable=csv_ingester_revenues,
+             kwargs=dict(definition=revenues_definition, engine=engine),
+             upstream=("create_stg", "create_meta")),
+        Task(name="fetch_and_ingest_movie_details",
+             callable=fetch_movies_details,
+             kwargs=dict(definition=fetch_definition, api_key=api_key, engine=engine, limit_calls=limit_calls),
+             upstream=("ingest_revenues", "create_dwh", "create_meta")),
+    ]
+    if refresh:
+        tasks.append(Task(name="refresh_movie_details",
+                          callable=refresh_movies_details,
+                          kwargs=dict(definition=fetch_definition, api_key=api_key, engine=engine,
+                                      limit_calls=limit_calls),
+                          upstream=("fetch_and_ingest_movie_details",)))
+    transformation_start = ("refresh_movie_details" if refresh else "fetch_and_ingest_movie_details",
+                            "create_dwh", "create_meta")
+    tasks += [
+        Task(name="resolve_titles",
+             callable=resolve_titles,
+             kwargs=dict(engine=engine, incremental=incremental),
+             upstream=transformation_start),
+        populate("dim__dates", *transformation_start),
+        populate("dim__distributors", *transformation_start),
+        populate("dim__movies_reviewers", *transformation_start),
+        populate("dim__movies", "populate_dim__dates"),
+        populate("dim__reviews_results", "populate_dim__movies", "populate_dim__movies_reviewers"),
+        populate("fact__revenues", "populate_dim__movies", "populate_dim__distributors", "resolve_titles")
+        if not partitioned else
+        Task(name="populate_fact__revenues",
+             callable=populate_partitioned,
+             kwargs=dict(target="dwh_fact__revenues", engine=engine, incremental=incremental,
+                         granularity=partitioned),
+             upstream=("populate_dim__movies", "populate_dim__distributors", "resolve_titles", "create_meta")),
+        populate("dim__people", "populate_dim__movies"),
+        populate("dim__genres", "populate_dim__movies"),
+        populate("dim__countries", "populate_dim__movies"),
+        populate("bridge__movies_people", "populate_dim__people"),
+        populate("bridge__movies_genres", "populate_dim__genres"),
+        populate("bridge__movies_countries", "populate_dim__countries"),
+    ]
+    tasks += [
+        Task(name=f"create_view_{filename.removesuffix('.sql')}",
+             callable=create_using_sql,
+             kwargs=dict(filename=filename, engine=engine),
+             upstream=("populate_fact__revenues", "populate_dim__reviews_results") + BRIDGES_TASKS)
+        for filename in VIEWS_FILES
+    ]
+    if materialize:
+        tasks.append(Task(name="materialize_rankings",
+                          callable=materialize_rankings,
+                          kwargs=dict(engine=engine, incremental=incremental),
+                          upstream=("populate_fact__revenues", "create_agg") + BRIDGES_TASKS))
+    if parquet_directory:
+        # pandas and pyarrow are loaded only by the flows exporting to Parquet
+        from pipeline.parquet_export import export_parquet
+
+        tasks.append(Task(name="export_parquet",
+                          callable=export_parquet,
+                          kwargs=dict(engine=engine, directory=parquet_directory),
+                          upstream=("populate_fact__revenues", "populate_dim__distributors") + BRIDGES_TASKS))
+    return tasks
+
+
+def print_results(results: dict[str, TaskResult]):
+    print(f"\n{'task':<40} | {'state':<7} | {'seconds':>8}")
+    for result in results.values():
+        print(f"{result.name:<40} | {str(result.state):<7} | {result.duration_s:>8.2f}")
+
+
+def main():
+    from models.definitions.ingestion import movies_details_api_fetch_definition, revenues_per_day_definition
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='sqlite:///./db/task.db', help='SQLAlchemy database URL')
+    parser.add_argument('--csv', default=revenues_per_day_definition.filepath,
+                        help='Revenues per day CSV file, or a directory or glob pattern of files')
+    parser.add_argument('--omdb-address', default=movies_details_api_fetch_definition.omdb_address)
+    parser.add_argument('--limit-calls', type=int, default=None, help='Limit of OMDb entries to fetch')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Fetch again by imdbID the known movies not checked for a week (changed ones only merged)')
+    parser.add_argument('--change-tracking', choices=('changelog', 'triggers'), default='changelog',
+                        help='Track the changed rows by the change log or by the modified_date triggers')
+    parser.add_argument('--incremental', action='store_true', help='Incremental transformations')
+    parser.add_argument('--materialize', action='store_true', help='Refresh the materialized dashboard rankings')
+    parser.add_argument('--partitioned', choices=('month', 'year'), default=None,
+                        help='Load the fact table by partitions of the date in parallel processes (resumable)')
+    parser.add_argument('--parquet-dir', default=None,
+                        help='Export the star schema to Parquet files in this directory (columnar dashboard)')
+    parser.add_argument('--max-workers', type=int, default=4, help='Maximum number of concurrent tasks')
+    parser.add_argument('--busy-timeout', type=float, default=600,
+                        help='Seconds a task waits for another task holding the SQLite write lock')
+    parser.add_argument('--report', default=None, help='Path of the JSON run report (timings, rows, query plans)')
+    parser.add_argument('--profile-dir', default=None, help='Directory for per-step cProfile dumps')
+    args = parser.parse_args()
+
+    engine = create_engine(args.db, echo=False, connect_args=dict(timeout=args.busy_timeout))
+    tasks = build_main_flow(engine=engine,
+                            revenues_definition=replace(revenues_per_day_definition, filepath=args.csv),
+                            fetch_definition=replace(movies_details_api_fetch_definition,
+                                                     omdb_address=args.omdb_address),
+                            api_key=os.environ.get('OMDB_API_KEY'),
+                            limit_calls=args.limit_calls,
+                            incremental=args.incremental,
+                            materialize=args.materialize,
+                            partitioned=args.partitioned,
+                            parquet_directory=args.parquet_dir,
+                            refresh=args.refresh,
+                            change_tracking=ChangeTracking(args.change_tracking.upper()))
+    with instrumented_run(report_path=args.report, profile_dir=args.profile_dir):
+        results = run_dag(tasks, max_workers=args.max_workers)
+
+    print_results(results)
+
+    raise SystemExit(0 if dag_state(results) == State.SUCCESS else 1)
+
+
+if __name__ == '__main__':
+    main()
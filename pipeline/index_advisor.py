@@ -0,0 +1,284 @@
+"""
+Index advisor for the pipeline SQL.
+
+Every statement of the transformation, views and materialization SQL files (and the titles lookup
+of the ingestion) is explained with SQLite `EXPLAIN QUERY PLAN`. Full table scans, automatic
+(per query) indexes and temp B-trees are reported. For the tables behind them composite and covering
+index candidates are built from the join, filter and `GROUP BY` columns of the statement. Every
+candidate is created inside a savepoint that is rolled back right after the statement is explained
+again ("what-if"), and only the candidates that make the plan cheaper are proposed.
+
+The proposed indexes can be created with `create_from_orms(..., indexes=...)`.
+
+Run from the project root (on an empty in-memory schema by default):
+
+    python -m pipeline.index_advisor
+    python -m pipeline.index_advisor --db sqlite:///./db/task.db --apply
+"""
+import argparse
+import glob
+import re
+import sqlite3
+from dataclasses import dataclass, field
+
+from sqlalchemy import Engine
+from sqlalchemy.dialects import sqlite
+from sqlmodel import create_engine
+
+from pipeline.creation import IndexDefinition, create_from_orms
+from pipeline.sqlite_functions import register_sqlite_functions
+from pipeline.transformation import _split_statements
+from pipeline.watermarks import INITIAL_WATERMARK
+
+SQL_FILES_PATTERNS = (
+    './pipeline/transformation/*.sql',
+    './pipeline/create_views/*.sql',
+    './pipeline/materialization/*.sql',
+    './pipeline/materialization/rankings/*.sql',
+)
+# the incremental plans, which read the change log
+PARAMS = {"since": INITIAL_WATERMARK, "full_refresh": False, "ranking": "advisor"}
+MAX_INDEX_COLUMNS = 6
+# JSON documents are too wide to be copied into an index
+NOT_INDEXED_TYPES = frozenset({'JSON'})
+
+KEYWORDS = frozenset({'WHERE', 'ON', 'JOIN', 'LEFT', 'INNER', 'CROSS', 'OUTER', 'GROUP', 'ORDER', 'LIMIT', 'UNION',
+                      'SELECT', 'AS', 'USING', 'SET', 'VALUES', 'HAVING', 'WINDOW'})
+
+
+@dataclass
+class StatementAdvice:
+    source: str
+    statement: str
+    plan: list[str]
+    issues: list[str]
+    suggestions: list[IndexDefinition] = field(default_factory=list)
+    plans_with_suggestions: dict[str, list[str]] = field(default_factory=dict)
+
+
+def plan_cost(plan: list[str]) -> int:
+    """
+    Rough cost of a query plan: full scans and temp B-trees are the expensive parts.
+    """
+    cost = 0
+    for line in plan:
+        if line.startswith('SCAN') and 'COVERING INDEX' in line:
+            cost += 2
+        elif line.startswith('SCAN'):
+            cost += 3
+        elif 'AUTOMATIC' in line:
+            cost += 2
+        elif line.startswith('SEARCH') and not ('COVERING INDEX' in line or 'PRIMARY KEY' in line):
+            cost += 1
+        elif 'TEMP B-TREE' in line:
+            cost += 2
+    return cost
+
+
+def plan_issues(plan: list[str], tables: set[str]) -> list[str]:
+    """
+    Full scans of the `tables` (aliases included, scans of subqueries and CTEs are not issues),
+    automatic indexes and temp B-trees of the plan.
+    """
+    return [line for line in plan
+            if (re.match(r'SCAN (\w+)$', line) and line.split()[1] in tables)
+            or 'AUTOMATIC' in line
+            or 'TEMP B-TREE' in line]
+
+
+def advise(engine: Engine) -> list[StatementAdvice]:
+    """
+    Explains all the pipeline statements and proposes indexes for them.
+
+    :param engine: A SQLAlchemy engine connected to a SQLite database with the pipeline schema.
+    :type engine: Engine
+
+    :return: Advice for every statement, in the order of the files.
+    :rtype: list[StatementAdvice]
+    """
+    connection = engine.raw_connection()
+    try:
+        dbapi_connection = connection.dbapi_connection
+        register_sqlite_functions(dbapi_connection)
+        columns = _tables_columns(dbapi_connection)
+
+        advices = []
+        for source, statement in _statements():
+            plan = _explain(dbapi_connection, statement)
+            tables = set(_aliases(statement, columns)) | set(columns)
+            advice = StatementAdvice(source=source, statement=statement, plan=plan, issues=plan_issues(plan, tables))
+            if advice.issues:
+                _what_if(dbapi_connection, advice, columns)
+            advices.append(advice)
+    finally:
+        connection.close()
+    return advices
+
+
+def suggested_indexes(advices: list[StatementAdvice]) -> list[IndexDefinition]:
+    """
+    Distinct suggestions of all the statements. An index whose columns are a prefix of another
+    suggested index of the same table is left out, the longer one serves both.
+    """
+    suggestions = list(dict.fromkeys(index for advice in advices for index in advice.suggestions))
+    return [index for index in suggestions
+            if not any(other is not index
+                       and other.table_name == index.table_name
+                       and other.columns[:len(index.columns)] == index.columns
+                       and len(other.columns) > len(index.columns)
+                       for other in suggestions)]
+
+
+def _statements() -> list[tuple[str, str]]:
+    from pipeline.ingestion import OMDBAPIFetchDefinition, get_not_present_titles_statement
+
+    statements = []
+    for pattern in SQL_FILES_PATTERNS:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, 'r') as file:
+                sql_query = file.read()
+            for statement_no, statement in enumerate(_split_statements(sql_query), start=1):
+                # a view is explained by its SELECT
+                statement = re.sub(r'^\s*CREATE\s+VIEW\s+(IF\s+NOT\s+EXISTS\s+)?\w+\s+AS\s+', '', statement,
+                                   flags=re.IGNORECASE)
+                statements.append((f"{path}#{statement_no}", statement))
+
+    titles_statement = get_not_present_titles_statement(
+        not_found_after_s=OMDBAPIFetchDefinition.negative_cache_ttl_s
+    ).compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    statements.append(("pipeline.ingestion.get_not_present_titles_statement", str(titles_statement)))
+    return statements
+
+
+def _explain(dbapi_connection: sqlite3.Connection, statement: str) -> list[str]:
+    return [row[-1] for row in dbapi_connection.execute(f"EXPLAIN QUERY PLAN {statement}", PARAMS).fetchall()]
+
+
+def _tables_columns(dbapi_connection: sqlite3.Connection) -> dict[str, list[str]]:
+    tables = [row[0] for row in dbapi_connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%';")]
+    return {table: [row[1] for row in dbapi_connection.execute(f"PRAGMA table_xinfo({table});")
+                    if row[2].upper() not in NOT_INDEXED_TYPES]
+            for table in tables}
+
+
+def _what_if(dbapi_connection: sqlite3.Connection, advice: StatementAdvice, columns: dict[str, list[str]]):
+    for candidates in _candidates(advice.statement, columns).values():
+        best_cost, best_index, best_plan = plan_cost(advice.plan), None, None
+        for index in candidates:
+            dbapi_connection.execute("SAVEPOINT index_advisor;")
+            try:
+                dbapi_connection.execute(index.get_create_sql())
+                plan = _explain(dbapi_connection, advice.statement)
+            finally:
+                dbapi_connection.execute("ROLLBACK TO index_advisor;")
+                dbapi_connection.execute("RELEASE index_advisor;")
+            if plan_cost(plan) < best_cost and any(index.name in line for line in plan):
+                best_cost, best_index, best_plan = plan_cost(plan), index, plan
+        if best_index:
+            advice.suggestions.append(best_index)
+            advice.plans_with_suggestions[best_index.name] = best_plan
+
+
+def _candidates(statement: str, columns: dict[str, list[str]]) -> dict[str, list[IndexDefinition]]:
+    """
+    Builds the index candidates of every table of the statement from its column references:
+    equality and join columns first, then range columns, `GROUP BY` columns and (for covering
+    indexes) the other referenced columns.
+    """
+    aliases = _aliases(statement, columns)
+    candidates: dict[str, list[IndexDefinition]] = {}
+
+    for alias, table in aliases.items():
+        table_columns = columns[table]
+        if len([t for t in aliases.values() if t == table]) == 1 and len(set(aliases.values())) == 1:
+            # a single table statement may use unqualified columns
+            prefix = rf'(?:\b{alias}\.)?'
+        else:
+            prefix = rf'\b{alias}\.'
+
+        def find(pattern: str) -> list[str]:
+            found = []
+            for match in re.finditer(pattern.format(prefix=prefix), statement, re.IGNORECASE):
+                column = match.group('column')
+                if column in table_columns and column not in found:
+                    found.append(column)
+            return found
+
+        equality = find(r'{prefix}(?P<column>\w+)\s*(?:=|\bIN\s*\(|\bIS\b)') + \
+            find(r'=\s*{prefix}(?P<column>\w+)\b')
+        ranges = find(r'{prefix}(?P<column>\w+)\s*(?:>=|<=|>|<|\bBETWEEN\b)')
+        group_by = [column
+                    for clause in re.findall(r'GROUP\s+BY\s+(.+?)(?:\bORDER\b|\bLIMIT\b|\bHAVING\b|\)|;|$)',
+                                             statement, re.IGNORECASE | re.DOTALL)
+                    for column in re.findall(rf'{prefix}(\w+)', clause)
+                    if column in table_columns]
+        referenced = find(r'{prefix}(?P<column>\w+)\b')
+
+        equality = list(dict.fromkeys(equality))
+        ranges = [column for column in ranges if column not in equality]
+        group_by = [column for column in dict.fromkeys(group_by) if column not in equality]
+        keys = equality + ranges[:1]
+
+        table_candidates = candidates.setdefault(table, [])
+        for columns_ in (keys,
+                         equality + group_by,
+                         list(dict.fromkeys(keys + group_by + referenced))):
+            columns_ = tuple(column for column in columns_ if column != 'id')[:MAX_INDEX_COLUMNS]
+            index = IndexDefinition(table_name=table, columns=columns_)
+            if columns_ and index not in table_candidates:
+                table_candidates.append(index)
+    return candidates
+
+
+def _aliases(statement: str, columns: dict[str, list[str]]) -> dict[str, str]:
+    aliases = {}
+    for match in re.finditer(r'(?:\bFROM|\bJOIN|,|\bINTO|\bUPDATE)\s+"?(\w+)"?(?!\s*\()(?:\s+(?:AS\s+)?(\w+))?',
+                             statement, re.IGNORECASE):
+        table, alias = match.group(1), match.group(2)
+        if table not in columns:
+            continue
+        if not alias or alias.upper() in KEYWORDS:
+            alias = table
+        aliases[alias] = table
+    return aliases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='sqlite://', help='SQLAlchemy database URL (an in-memory schema by default)')
+    parser.add_argument('--apply', action='store_true', help='Create the proposed indexes')
+    parser.add_argument('--verbose', action='store_true', help='Print the plans of all statements')
+    args = parser.parse_args()
+
+    from models.schemas.schema import agg_orms, dwh_orms, meta_orms, stg_orms
+    models = stg_orms + dwh_orms + agg_orms + meta_orms
+
+    engine = create_engine(args.db, echo=False)
+    if args.db == 'sqlite://':
+        create_from_orms(models=models, engine=engine)
+
+    advices = advise(engine)
+    for advice in advices:
+        if not (advice.issues or args.verbose):
+            continue
+        print(f"\n{advice.source}")
+        for line in advice.plan:
+            print(f"    {'!' if line in advice.issues else ' '} {line}")
+        for index in advice.suggestions:
+            print(f"    + {index.get_create_sql()}")
+            for line in advice.plans_with_suggestions[index.name]:
+                print(f"          {line}")
+
+    indexes = suggested_indexes(advices)
+    print(f"\n{sum(bool(advice.issues) for advice in advices)} of {len(advices)} statements with full scans "
+          f"or temp B-trees, {len(indexes)} indexes proposed:")
+    for index in indexes:
+        print(f"    {index.get_create_sql()}")
+
+    if args.apply and indexes:
+        create_from_orms(models=models, engine=engine, indexes=indexes)
+
+
+if __name__ == '__main__':
+    main()
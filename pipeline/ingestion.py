@@ -1,23 +1,44 @@
+import csv
+import hashlib
+import io
 import json
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from typing import Type
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Hashable, Iterable, Iterator, Mapping, Type
 
-import requests
-import pandas as pd
-from furl import furl
-from requests import Response
-
-from sqlalchemy import Engine, select, text
+from sqlalchemy import Engine, Select, func, or_, select, text
 from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy.sql.operators import is_
 from sqlmodel import SQLModel
-from tqdm import tqdm
 
-from models.definitions.objects import Title
+from models.definitions.objects import IMDbId, Title, TitleMatch
+from models.schemas.dwh.dates import DWHDate
+from models.schemas.dwh.fact_revenue import DWHDayRevenue
+from models.schemas.dwh.movies import DWHMovie
+from models.schemas.dwh.titles_map import DWHTitleMap
+from models.schemas.meta.changelog import METAChange
+from models.schemas.meta.fetch_checkpoints import METAFetchCheckpoint
 from models.schemas.stg.movies_details import STGMovie
 from models.schemas.stg.revenue_per_day import STGDayRevenue
 from pipeline import State
+from pipeline.change_tracking import is_change_logged, log_changes
+from pipeline.ingestion_manifest import FileFingerprint, forget_partitions, get_changed_partitions, \
+    hash_partitions, is_file_unchanged, record_ingestion
+from pipeline.instrumentation import count_rows, instrumented
+from pipeline.watermarks import get_current_timestamp
+
+# pandas, tqdm and the OMDb client (requests) are imported by the functions using them, so importing the
+# definitions and the native loader (e.g. by `python -m pipeline ingest`) does not load them
+if TYPE_CHECKING:
+    from pipeline.omdb import OMDBClient
+
+# states of the titles in `meta_fetch_checkpoints`
+FETCHED = 'FETCHED'
+NOT_FOUND = 'NOT_FOUND'
+FAILED = 'FAILED'
 
 
 @dataclass
@@ -26,6 +47,10 @@ class CSVIngesterDefinition:
     orm_class: declarative_base
     separator: str = ','
     is_header: bool = True
+    chunksize: int | None = None
+    native_loader: bool = False
+    skip_unchanged: bool = True
+    max_workers: int = 4
 
 
 @dataclass
@@ -34,8 +59,23 @@ class OMDBAPIFetchDefinition:
     api_key: str = os.environ.get('OMDB_API_KEY')
     allowed_failed_attempts: int = 3
     dry_run: bool = False
-
-
+    max_in_flight: int = 1
+    requests_per_second: float | None = None
+    daily_quota: int | None = None
+    max_retries: int = 3
+    backoff_base_s: float = 0.5
+    timeout_s: float = 10.0
+    cache_path: str | None = None
+    cache_ttl_s: float = 30 * 24 * 3600
+    negative_cache_ttl_s: float = 7 * 24 * 3600
+    cache_max_entries: int | None = 100_000
+    native_loader: bool = False
+    flush_every: int = 500
+    retry_failed: bool = False
+    refresh_after_s: float = 7 * 24 * 3600
+
+
+@instrumented
 def csv_ingester_any_orm(definition: CSVIngesterDefinition,
                          engine: Engine):
     """
@@ -53,6 +93,9 @@ def csv_ingester_any_orm(definition: CSVIngesterDefinition,
     :raises ValueError: If the CSV file format is invalid or if the ORM class instantiation fails.
     :raises SQLAlchemyError: If there is an error merging the data into the database.
     """
+    import pandas as pd
+    from tqdm import tqdm
+
     df = pd.read_csv(filepath_or_buffer=definition.filepath,
                      sep=definition.separator,
                      header=0 if definition.is_header else None,
@@ -61,15 +104,20 @@ def csv_ingester_any_orm(definition: CSVIngesterDefinition,
                      parse_dates=False)
 
     print("CSV loaded to memory. Starting db merge")
+    count_rows(read=len(df))
 
     with Session(engine) as session:
+        run_start = get_current_timestamp(session)
         for index, row in tqdm(df.iterrows()):
             session.merge(definition.orm_class(**row))
+        session.flush()
+        log_changes(session.connection().connection.dbapi_connection, definition.orm_class.__tablename__, run_start)
         session.commit()
 
     return State.SUCCESS
 
 
+@instrumented
 def fetch_movies_details(definition: OMDBAPIFetchDefinition,
                          api_key: str,
                          engine: Engine,
@@ -79,10 +127,29 @@ def fetch_movies_details(definition: OMDBAPIFetchDefinition,
 
     This function retrieves a list of distinct movie titles from the database, queries the OMDB API for
     details. Data is merged into the proper table
+    Up to `definition.max_in_flight` API calls are kept in flight at once using a thread pool.
+    The failed attempts budget and `limit_calls` are checked as the responses arrive, so no new
+    calls are started once either of them is reached.
+    Calls go through a pooled `OMDBClient` which paces them and retries transient errors. Only calls
+    which failed after all retries count as failed attempts. When the daily quota is reached no new
+    calls are started and the entries fetched so far are still merged.
+    With `definition.cache_path` set, responses (including `Movie not found!`) are cached on disk and
+    repeated lookups within the TTL are served without calling the API.
+    With `definition.native_loader` the results are UPSERTed by `executemany` without the temp table.
+
+    The results are merged every `definition.flush_every` attempted titles, together with a checkpoint
+    of every attempted title (fetched, not found or failed) in `meta_fetch_checkpoints`, in one
+    transaction. The buffered results are flushed also when the fetch is interrupted, so the memory
+    usage stays bounded and a restarted run continues with the titles not attempted yet. Titles which
+    failed are attempted again only with `definition.retry_failed`, titles not found once their
+    checkpoint is older than `definition.negative_cache_ttl_s`.
+    With `definition.dry_run` all the titles are searched again. The movies already known are refreshed
+    more cheaply by their imdbID with `refresh_movies_details`.
 
     :param limit_calls: To limit artificially the execution.
     :param definition: Configuration for the OMDB API fetch process,
-     including API address, allowed failed attempts, and dry run option.
+     including API address, allowed failed attempts, dry run option, the in-flight calls limit,
+     rate limits, retry, cache and flush settings.
     :type definition: OMDBAPIFetchDefinition
     :param api_key: The API key used to authenticate with the OMDB API.
     :type api_key: str
@@ -104,75 +171,218 @@ def fetch_movies_details(definition: OMDBAPIFetchDefinition,
     _check_attribute(model=STGDayRevenue, attr_name='title')
 
     if not definition.dry_run:
-        titles: tuple[Title, ...] = _get_distinct_not_present_titles(engine)
+        titles: tuple[Title, ...] = _get_distinct_not_present_titles(engine, definition.retry_failed,
+                                                                     definition.negative_cache_ttl_s)
     else:
         titles: tuple[Title, ...] = _get_distinct_titles(engine)
+    count_rows(read=len(titles))
 
-    movie_details: list[dict] = []
-    faulty_counter: int = 0
-    msgs: list[str] = []
+    fetched_number, msgs = _fetch_to_stg(definition=definition,
+                                         api_key=api_key,
+                                         engine=engine,
+                                         lookups={title: (title,) for title in titles},
+                                         call=lambda client, title: client.get_by_title(title),
+                                         process=_process_title_response,
+                                         limit_calls=limit_calls)
 
-    for title in tqdm(titles):
-        if faulty_counter > definition.allowed_failed_attempts:
-            msgs.append(f"The number of faulty API responses exceeded the allowance. Finishing calling API")
-            break
-        try:
-            omdb_response: Response | None = _get_omdb_data(definition.omdb_address, api_key, title)
-            if not isinstance(omdb_response, Response):
-                faulty_counter += 1
-                msgs.append(f"Faulty API response for {title}.")
-                continue
-            else:
-                response_json = omdb_response.json()
-                if not eval(response_json.get('Response', 'None')):
-                    if not response_json.get('Error', '') == 'Movie not found!':
-                        faulty_counter += 1
-                    msgs.append(f"Faulty API response for {title}. {response_json.get('Error', 'Error not known')}")
-                    continue
+    for msg in msgs:
+        print(msg)
+    print(f"API calls finished. Fetched {fetched_number} entries.")
+
+    return State.SUCCESS
+
+
+@instrumented
+def refresh_movies_details(definition: OMDBAPIFetchDefinition,
+                           api_key: str,
+                           engine: Engine,
+                           limit_calls: int | None = None):
+    """
+    Fetches again the details of the movies already in `dwh_dim__movies`, by their imdbID (`i=`)
+    instead of the title search used by `fetch_movies_details`.
+
+    Only the movies whose details were fetched or checked more than `definition.refresh_after_s`
+    seconds ago are called. The movies with the most recent revenues are called first, then the ones
+    checked the longest time ago, so a quota or `limit_calls` is spent on the running movies. The cache
+    is not read, the fresh responses are cached.
+    A response is compared with the stored one by the hash of the JSON payload and the UPSERT is
+    skipped if it has not changed, so only the changed movies get a new `modified_date` and are picked
+    up by the next incremental transformation. Every checked title gets a checkpoint in
+    `meta_fetch_checkpoints`, which is when it is due again.
 
-            movie_details.append(dict(title=title, response=json.dumps(response_json)))
+    :param limit_calls: To limit artificially the execution.
+    :param definition: Configuration for the OMDB API fetch process, see `fetch_movies_details`.
+    :type definition: OMDBAPIFetchDefinition
+    :param api_key: The API key used to authenticate with the OMDB API.
+    :type api_key: str
+    :param engine: A SQLAlchemy engine used to connect to the database.
+    :type engine: Engine
 
-            no = len(movie_details)
-            if limit_calls and no >= limit_calls:
-                break
+    :return: Returns `State.SUCCESS` if the API fetch and database merge are successful.
+    :rtype: State
 
-        except Exception as e:
-            msgs.append(f"Error processing title {title}: {e}")
+    :raises ValueError: If the API key is not provided.
+    :raises SQLAlchemyError: If there is an error executing the SQL operations.
+    """
+    if not api_key:
+        raise ValueError('API key not defined')
+
+    stored_hashes = _get_movies_due_for_refresh(engine, definition.refresh_after_s)
+    count_rows(read=len(stored_hashes))
+    changed_number: int = 0
+
+    def process(imdb_id: IMDbId, response_json: dict | None) -> tuple[list[dict] | None, bool, str | None]:
+        nonlocal changed_number
+        details, is_faulty, msg = _process_omdb_response(imdb_id, response_json)
+        if details is None:
+            return None, is_faulty, msg
+        payload_hash = _payload_hash(response_json)
+        changed = [dict(title=title, response=details['response'])
+                   for title, stored_hash in stored_hashes[imdb_id].items() if stored_hash != payload_hash]
+        changed_number += len(changed)
+        return changed, False, None
+
+    fetched_number, msgs = _fetch_to_stg(definition=definition,
+                                         api_key=api_key,
+                                         engine=engine,
+                                         lookups=stored_hashes,
+                                         call=lambda client, imdb_id: client.get_by_imdb_id(imdb_id, read_cache=False),
+                                         process=process,
+                                         limit_calls=limit_calls)
 
     for msg in msgs:
         print(msg)
-    no = len(movie_details)
-    if no:
-        print(f"API calls finished. Fetched {no} entries. The db merge starts.")
+    print(f"Refresh finished. Fetched {fetched_number} of {len(stored_hashes)} due movies, "
+          f"{changed_number} changed entries merged.")
+
+    return State.SUCCESS
+
+
+@instrumented
+def csv_ingester_revenues(definition: CSVIngesterDefinition,
+                          engine: Engine):
+    """
+    Reads a CSV file and ingests its data into a database only for STGDayRevenues ORM.
+    Prepared for faster ingestion than csv_ingester_any_orm
+
+    When `definition.chunksize` is set the file is streamed in chunks of that many rows. Every chunk
+    is staged in the temp table and UPSERTed on its own, so the memory usage is bounded by the chunk
+    size instead of the file size. Progress and timing are printed per chunk.
+    With `definition.native_loader` pandas and the temp table are skipped. The file is parsed with the
+    `csv` module and UPSERTed straight into the staging table by `bulk_upsert_sqlite`.
+
+    The file and its date partitions are fingerprinted in the `meta_ingested_files` and
+    `meta_ingested_partitions` manifest (`pipeline.ingestion_manifest`). With
+    `definition.skip_unchanged` a file with the same content as the last ingested one is skipped
+    without parsing it, and otherwise only the dates whose rows content hash differs from the one of
+    their last ingestion are staged and UPSERTed. Their hashes are deleted before the load and written
+    after the rows are committed, so an interrupted load is repeated. The file itself is hashed in the
+    same pass as its dates, and again by the load, so it is read once when no date changed and twice
+    otherwise, without keeping its rows in memory. Without `skip_unchanged` the file is parsed only once,
+    all its rows are UPSERTed and the date hashes of the table are deleted.
+
+    A `definition.filepath` which is a directory or a glob pattern (e.g. `./feeds/*.csv`) is ingested by
+    `pipeline.multi_file_ingestion.ingest_revenues_files`: the files are parsed by
+    `definition.max_workers` processes and UPSERTed one by one by this process, and the task fails if
+    any of them failed.
+
+    :param definition: An object containing the CSV file path (or directory, or glob pattern), separator,
+                       header information, optional chunk size, loader choice and STGDayRevenues ORM.
+    :type definition: CSVIngesterDefinition for STGDayRevenues ORM
+    :param engine: A SQLAlchemy engine used to connect to the database.
+    :type engine: Engine
+
+    :return: Returns `State.SUCCESS` if the CSV ingestion and database commit are successful.
+    :rtype: State
+
+    :raises ValueError: If the CSV file format is invalid or if the ORM class instantiation fails.
+    :raises SQLAlchemyError: If there is an error merging the data into the database.
+    """
+    if is_files_pattern(definition.filepath):
+        # imported here, the module uses the parser and the UPSERT statement of this one
+        from pipeline.multi_file_ingestion import ingest_revenues_files
+
+        since = _get_database_timestamp(engine)
+        results = ingest_revenues_files(definition, engine)
+        report_unparsed_dates(engine, definition.orm_class.__tablename__, since)
+        return State.FAIL if any(result.state == State.FAIL for result in results) else State.SUCCESS
+
+    table_name = definition.orm_class.__tablename__
+    since = _get_database_timestamp(engine)
+    fingerprint = FileFingerprint.of(definition.filepath)
+    if definition.skip_unchanged and is_file_unchanged(engine, table_name, fingerprint):
+        record_ingestion(engine, table_name, fingerprint, {})
+        print(f"{definition.filepath} has the same content as the last ingested file. Skipping")
+        return State.SUCCESS
+
+    if definition.skip_unchanged:
+        # the file is hashed in the same pass as its dates, the rows are not kept in memory for the load
+        hashes = hash_partitions(read_revenues_rows(definition, fingerprint), partition_position=1)
+        changed = get_changed_partitions(engine, table_name, hashes)
+        print(f"{len(changed)} of {len(hashes)} date partitions are new or changed")
+        if not changed:
+            record_ingestion(engine, table_name, fingerprint, {})
+            return State.SUCCESS
+        forget_partitions(engine, table_name, changed)
     else:
-        print(f"API calls finished. 0 entries fetched")
+        # the file is parsed once and all its rows are loaded, the hashes of the table are dropped
+        hashes, changed = None, None
+        forget_partitions(engine, table_name)
+
+    if definition.native_loader:
+        rows_number = bulk_upsert_sqlite(engine=engine,
+                                         statement=revenues_upsert_sql(table_name,
+                                                                       "VALUES (?, ?, ?, CAST(? AS INT), CAST(? AS INT), ?)"),
+                                         rows=(row for row in read_revenues_rows(definition, fingerprint)
+                                               if changed is None or (row[1] or '') in changed),
+                                         batch_size=definition.chunksize or 100_000,
+                                         changes_table=table_name)
+        count_rows(read=rows_number)
+        record_ingestion(engine, table_name, fingerprint, {key: hashes[key] for key in changed or ()})
+        report_unparsed_dates(engine, table_name, since)
         return State.SUCCESS
 
-    tmp_name = f"tmp_{STGMovie.__tablename__}"
-    try:
-        df = pd.DataFrame.from_dict(movie_details)
-        df.to_sql(tmp_name, engine, schema=None, if_exists='replace', index=False, index_label=None, chunksize=None,
-                  dtype=None, method=None)
-    except Exception:
-        raise
+    import pandas as pd
+
+    tmp_name = f"tmp_{definition.orm_class.__tablename__}"
+
+    rows_number: int = 0
+    # the file is hashed while pandas reads it, `record_ingestion` does not read it again
+    with fingerprint.open() as file:
+        chunks = pd.read_csv(filepath_or_buffer=file,
+                             sep=definition.separator,
+                             header=0 if definition.is_header else None,
+                             skipinitialspace=True,
+                             skip_blank_lines=True,
+                             parse_dates=False,
+                             chunksize=definition.chunksize)
+
+        if definition.chunksize:
+            print(f"Streaming CSV in chunks of {definition.chunksize} rows. Starting db merge")
+        else:
+            chunks = [chunks]
+            print("CSV loaded to memory. Starting db merge")
+
+        for chunk_no, df in enumerate(chunks, start=1):
+            chunk_start = time.perf_counter()
+            if changed is not None and len(changed) < len(hashes):
+                df = df[df['date'].isin(changed)]
+                if df.empty:
+                    continue
+
+            df.to_sql(tmp_name, engine, schema=None, if_exists='replace', index=False, index_label=None,
+                      chunksize=None, dtype=None, method=None)
+            _merge_revenues_from_tmp(definition.orm_class.__tablename__, tmp_name, engine)
+
+            rows_number += len(df)
+            count_rows(read=len(df))
+            if definition.chunksize:
+                print(f"Chunk {chunk_no}: {len(df)} rows merged in {time.perf_counter() - chunk_start:.2f}s "
+                      f"({rows_number} rows in total)")
 
     with Session(engine) as session:
         try:
-            session.execute(text(f"""
-                INSERT INTO {STGMovie.__tablename__} (
-                    title
-                    ,response
-                    )
-                SELECT * 
-                FROM (
-                    SELECT title
-                        ,response
-                    FROM {tmp_name}
-                    ) a
-                WHERE 1 ON CONFLICT(title)
-                DO UPDATE SET response = excluded.response
-                WHERE response != excluded.response;
-            """))
+            session.execute(text(f"DROP TABLE IF EXISTS {tmp_name}"))
             session.commit()
         except Exception:
             session.rollback()
@@ -180,62 +390,191 @@ def fetch_movies_details(definition: OMDBAPIFetchDefinition,
         finally:
             session.close()
 
+    record_ingestion(engine, table_name, fingerprint, {key: hashes[key] for key in changed or ()})
+    report_unparsed_dates(engine, table_name, since)
+    return State.SUCCESS
+
+
+def report_unparsed_dates(engine: Engine, table_name: str, since: str) -> int:
+    """
+    Prints the rows staged since `since` (read from the change log) with a date SQLite does not parse,
+    e.g. `2020-1-5` instead of `2020-01-05`. They are kept in the staging table, but they have no
+    `dwh_dim__dates` row and the fact table load skips them.
+
+    :return: The number of these rows.
+    :rtype: int
+    """
     with Session(engine) as session:
+        if not is_change_logged(session.connection().connection.dbapi_connection):
+            return 0
+        dates = session.execute(text(f"""
+            SELECT json_extract(row_key, '$[0]') AS value
+                ,COUNT(*) AS rows_number
+            FROM {METAChange.__tablename__}
+            WHERE table_name = :table_name
+                AND changed_date >= :since
+                AND date(json_extract(row_key, '$[0]')) IS NULL
+            GROUP BY value
+            ORDER BY value;
+        """), {"table_name": table_name, "since": since}).fetchall()
+    rows_number = sum(row.rows_number for row in dates)
+    if rows_number:
+        print(f"{rows_number} rows with a date not in the YYYY-MM-DD format are not loaded into the facts "
+              f"(e.g. {', '.join(repr(row.value) for row in dates[:5])})")
+    return rows_number
+
+
+def _get_database_timestamp(engine: Engine) -> str:
+    with Session(engine) as session:
+        return get_current_timestamp(session)
+
+
+def bulk_upsert_sqlite(engine: Engine,
+                       statement: str,
+                       rows: Iterable[tuple],
+                       batch_size: int = 100_000,
+                       changes_table: str | None = None,
+                       cache_size_mb: int = 256) -> int:
+    """
+    Bulk loads rows into SQLite using `executemany` on the raw DBAPI connection.
+
+    The connection is tuned for bulk writes (WAL journal, `synchronous = NORMAL`, bigger page cache,
+    in-memory temp store) and all the batches are written inside a single transaction. Rows are
+    consumed lazily in batches of `batch_size`, so a generator keeps the memory usage bounded.
+
+    :param engine: A SQLAlchemy engine connected to a SQLite database.
+    :type engine: Engine
+    :param statement: INSERT or UPSERT statement with `?` placeholders.
+    :type statement: str
+    :param rows: Parameters tuples for the statement.
+    :type rows: Iterable[tuple]
+    :param batch_size: Number of rows passed to a single `executemany` call.
+    :type batch_size: int
+    :param changes_table: The table written by the statement, its changed rows are appended to the change log.
+    :type changes_table: str | None
+    :param cache_size_mb: SQLite page cache size used for the load.
+    :type cache_size_mb: int
+
+    :return: Number of rows passed to the statement.
+    :rtype: int
+
+    :raises sqlite3.Error: If there is an error executing the statement. The whole load is rolled back.
+    """
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        tune_for_bulk_writes(cursor, cache_size_mb)
+
+        rows_iter = iter(rows)
+        rows_number: int = 0
         try:
-            session.execute(text(f"DROP TABLE {tmp_name}"))
-            session.commit()
+            cursor.execute("BEGIN;")
+            run_start = cursor.execute("SELECT CURRENT_TIMESTAMP;").fetchone()[0]
+            for batch_no, batch in enumerate(iter(lambda: list(islice(rows_iter, batch_size)), []), start=1):
+                batch_start = time.perf_counter()
+                cursor.executemany(statement, batch)
+                rows_number += len(batch)
+                count_rows(written=cursor.rowcount)
+                print(f"Batch {batch_no}: {len(batch)} rows loaded in {time.perf_counter() - batch_start:.2f}s "
+                      f"({rows_number} rows in total)")
+            if changes_table:
+                log_changes(cursor, changes_table, run_start)
+            connection.commit()
         except Exception:
-            session.rollback()
+            connection.rollback()
             raise
         finally:
-            session.close()
+            cursor.close()
+    finally:
+        connection.close()
 
-    return State.SUCCESS
+    return rows_number
 
 
-def csv_ingester_revenues(definition: CSVIngesterDefinition,
-                          engine: Engine):
+def tune_for_bulk_writes(cursor, cache_size_mb: int = 256):
     """
-    Reads a CSV file and ingests its data into a database only for STGDayRevenues ORM.
-    Prepared for faster ingestion than csv_ingester_any_orm
+    Sets the connection of the DBAPI cursor for bulk writes: WAL journal, `synchronous = NORMAL`,
+    bigger page cache and in-memory temp store.
+    """
+    cursor.execute("PRAGMA journal_mode = WAL;")
+    cursor.execute("PRAGMA synchronous = NORMAL;")
+    cursor.execute(f"PRAGMA cache_size = {-cache_size_mb * 1024};")
+    cursor.execute("PRAGMA temp_store = MEMORY;")
 
-    :param definition: An object containing the CSV file path, separator, header
-                       information, and STGDayRevenues ORM.
-    :type definition: CSVIngesterDefinition for STGDayRevenues ORM
-    :param engine: A SQLAlchemy engine used to connect to the database.
-    :type engine: Engine
 
-    :return: Returns `State.SUCCESS` if the CSV ingestion and database commit are successful.
-    :rtype: State
+def is_files_pattern(filepath: str) -> bool:
+    """
+    Checks whether the path of a `CSVIngesterDefinition` is a directory or a glob pattern of many files.
+    """
+    return os.path.isdir(filepath) or any(character in filepath for character in '*?[')
 
-    :raises ValueError: If the CSV file format is invalid or if the ORM class instantiation fails.
-    :raises SQLAlchemyError: If there is an error merging the data into the database.
+
+def read_revenues_rows(definition: CSVIngesterDefinition,
+                       fingerprint: FileFingerprint | None = None) -> Iterator[tuple]:
+    """
+    Yields the rows of the revenues CSV file as tuples of strings (None for an empty value) in the order
+    of the `stg_revenues_per_day` columns. With the `fingerprint` of the file, the file is hashed while
+    it is parsed (see `FileFingerprint.open`).
+    """
+    columns = ('id', 'date', 'title', 'revenue', 'theaters', 'distributor')
+    binary = fingerprint.open() if fingerprint is not None else open(definition.filepath, 'rb')
+    with io.TextIOWrapper(binary, newline='') as file:
+        reader = csv.reader(file, delimiter=definition.separator, skipinitialspace=True)
+        if definition.is_header:
+            header = next(reader)
+            positions = tuple(header.index(column) for column in columns)
+        else:
+            positions = tuple(range(len(columns)))
+
+        for row in reader:
+            if not row:
+                continue
+            yield tuple(row[position] if row[position] != '' else None for position in positions)
+
+
+def revenues_upsert_sql(table_name: str, source: str) -> str:
+    return f"""
+        INSERT INTO {table_name} (
+            id
+            ,"date"
+            ,title
+            ,revenue
+            ,theaters
+            ,distributor
+            )
+        {source}
+        ON CONFLICT(id, "date")
+        DO UPDATE SET title = excluded.title
+            ,revenue = excluded.revenue
+            ,theaters = excluded.theaters
+            ,distributor = excluded.distributor
+            ,modified_date = CURRENT_TIMESTAMP
+        WHERE title != excluded.title
+            OR revenue != excluded.revenue
+            OR theaters != excluded.theaters
+            OR distributor != excluded.distributor;
     """
-    tmp_name = f"tmp_{definition.orm_class.__tablename__}"
 
-    df = pd.read_csv(filepath_or_buffer=definition.filepath,
-                     sep=definition.separator,
-                     header=0 if definition.is_header else None,
-                     skipinitialspace=True,
-                     skip_blank_lines=True,
-                     parse_dates=False)
 
-    print("CSV loaded to memory. Starting db merge")
+def _movies_upsert_sql(source: str) -> str:
+    return f"""
+        INSERT INTO {STGMovie.__tablename__} (
+            title
+            ,response
+            )
+        {source}
+        ON CONFLICT(title)
+        DO UPDATE SET response = excluded.response
+            ,modified_date = CURRENT_TIMESTAMP
+        WHERE response != excluded.response;
+    """
 
-    df.to_sql(tmp_name, engine, schema=None, if_exists='replace', index=False, index_label=None, chunksize=None,
-              dtype=None, method=None)
 
+def _merge_revenues_from_tmp(table_name: str, tmp_name: str, engine: Engine):
     with Session(engine) as session:
         try:
-            session.execute(text(f"""
-                INSERT INTO {definition.orm_class.__tablename__} (
-                    id
-                    ,"date"
-                    ,title
-                    ,revenue
-                    ,theaters
-                    ,distributor
-                    )
+            run_start = get_current_timestamp(session)
+            result = session.execute(text(revenues_upsert_sql(table_name, f"""
                 SELECT *
                 FROM (
                     SELECT id
@@ -246,16 +585,9 @@ def csv_ingester_revenues(definition: CSVIngesterDefinition,
                         ,distributor
                     FROM {tmp_name}
                     ) a
-                WHERE 1 ON CONFLICT(id, "date")
-                DO UPDATE SET title = excluded.title
-                    ,revenue = excluded.revenue
-                    ,theaters = excluded.theaters
-                    ,distributor = excluded.distributor
-                WHERE title != excluded.title
-                    OR revenue != excluded.revenue
-                    OR theaters != excluded.theaters
-                    OR distributor != excluded.distributor;
-            """))
+                WHERE 1""")))
+            count_rows(written=result.rowcount)
+            log_changes(session.connection().connection.dbapi_connection, table_name, run_start)
             session.commit()
         except Exception:
             session.rollback()
@@ -263,9 +595,143 @@ def csv_ingester_revenues(definition: CSVIngesterDefinition,
         finally:
             session.close()
 
+
+def _fetch_to_stg(definition: OMDBAPIFetchDefinition,
+                  api_key: str,
+                  engine: Engine,
+                  lookups: Mapping[Hashable, Iterable[Title]],
+                  call: Callable[['OMDBClient', Hashable], dict | None],
+                  process: Callable[[Hashable, dict | None], tuple[list[dict] | None, bool, str | None]],
+                  limit_calls: int | None) -> tuple[int, list[str]]:
+    """
+    Calls the API for every key of `lookups` (titles or imdbIDs) and merges the processed results to
+    `stg_movies_details` with the checkpoints of the key's titles, see `fetch_movies_details`.
+
+    :return: The number of fetched entries and the messages to print.
+    :rtype: tuple[int, list[str]]
+    """
+    from tqdm import tqdm
+    from pipeline.omdb import OMDBClient, OMDBQuotaExceeded
+
+    movie_details: list[dict] = []
+    checkpoints: list[dict] = []
+    fetched_number: int = 0
+    faulty_counter: int = 0
+    msgs: list[str] = []
+
+    in_flight_limit: int = max(definition.max_in_flight, 1)
+    flush_every: int = max(definition.flush_every, 1)
+    keys_iter = iter(lookups)
+    pending: dict[Future, Hashable] = {}
+    exhausted: bool = False
+    limit_reached: bool = False
+
+    with OMDBClient.from_definition(definition, api_key) as client, \
+            ThreadPoolExecutor(max_workers=in_flight_limit) as executor, \
+            tqdm(total=len(lookups)) as progress:
+        try:
+            while True:
+                while not exhausted and not limit_reached and len(pending) < in_flight_limit:
+                    if faulty_counter > definition.allowed_failed_attempts:
+                        msgs.append(f"The number of faulty API responses exceeded the allowance. Finishing calling API")
+                        exhausted = True
+                        break
+                    key = next(keys_iter, None)
+                    if key is None:
+                        exhausted = True
+                        break
+                    pending[executor.submit(call, client, key)] = key
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = pending.pop(future)
+                    progress.update()
+                    if limit_reached:
+                        continue
+                    try:
+                        details, is_faulty, msg = process(key, future.result())
+                        faulty_counter += is_faulty
+                        if msg:
+                            msgs.append(msg)
+                        state = FETCHED if details is not None else FAILED if is_faulty else NOT_FOUND
+                        checkpoints.extend(dict(title=title, state=state, message=msg) for title in lookups[key])
+                        if details is None:
+                            continue
+
+                        movie_details.extend(details)
+
+                        fetched_number += 1
+                        if limit_calls and fetched_number >= limit_calls:
+                            limit_reached = True
+
+                    except OMDBQuotaExceeded as e:
+                        # not attempted, the title is left for the next run
+                        if not exhausted:
+                            msgs.append(f"{e}. Finishing calling API")
+                        exhausted = True
+
+                    except Exception as e:
+                        msgs.append(f"Error processing {key}: {e}")
+                        checkpoints.extend(dict(title=title, state=FAILED, message=str(e)) for title in lookups[key])
+
+                if len(checkpoints) >= flush_every:
+                    _flush_movies_details(engine, movie_details, checkpoints, definition.native_loader)
+                    for msg in msgs:
+                        progress.write(msg)
+                    movie_details, checkpoints, msgs = [], [], []
+        finally:
+            # also on errors and interruptions, the titles attempted so far are not called again
+            _flush_movies_details(engine, movie_details, checkpoints, definition.native_loader)
+
+        if client.cache:
+            msgs.append(f"OMDb cache hits: {client.cache.hits}, misses: {client.cache.misses}")
+
+    return fetched_number, msgs
+
+
+def _flush_movies_details(engine: Engine, movie_details: list[dict], checkpoints: list[dict], native_loader: bool):
+    if not checkpoints:
+        return
+
+    tmp_name = f"tmp_{STGMovie.__tablename__}"
+    if movie_details and not native_loader:
+        import pandas as pd
+
+        df = pd.DataFrame.from_dict(movie_details)
+        df.to_sql(tmp_name, engine, schema=None, if_exists='replace', index=False, index_label=None, chunksize=None,
+                  dtype=None, method=None)
+
     with Session(engine) as session:
         try:
-            session.execute(text(f"DROP TABLE {tmp_name}"))
+            run_start = get_current_timestamp(session)
+            if movie_details and native_loader:
+                result = session.execute(text(_movies_upsert_sql("VALUES (:title, :response)")), movie_details)
+                count_rows(written=result.rowcount)
+            elif movie_details:
+                result = session.execute(text(_movies_upsert_sql(f"""
+                    SELECT *
+                    FROM (
+                        SELECT title
+                            ,response
+                        FROM {tmp_name}
+                        ) a
+                    WHERE 1""")))
+                count_rows(written=result.rowcount)
+                session.execute(text(f"DROP TABLE {tmp_name}"))
+            if movie_details:
+                log_changes(session.connection().connection.dbapi_connection, STGMovie.__tablename__, run_start)
+            session.execute(text(f"""
+                INSERT INTO {METAFetchCheckpoint.__tablename__} (title, state, message)
+                VALUES (:title, :state, :message)
+                ON CONFLICT(title)
+                DO UPDATE SET state = excluded.state
+                    ,message = excluded.message
+                    ,attempts = attempts + 1
+                    ,modified_date = CURRENT_TIMESTAMP;
+            """), checkpoints)
             session.commit()
         except Exception:
             session.rollback()
@@ -273,8 +739,6 @@ def csv_ingester_revenues(definition: CSVIngesterDefinition,
         finally:
             session.close()
 
-    return State.SUCCESS
-
 
 def _get_distinct_titles(engine: Engine) -> tuple[Title, ...]:
     with Session(engine) as session:
@@ -283,25 +747,99 @@ def _get_distinct_titles(engine: Engine) -> tuple[Title, ...]:
         return results
 
 
-def _get_distinct_not_present_titles(engine: Engine) -> tuple[Title, ...]:
+def get_not_present_titles_statement(retry_failed: bool = False, not_found_after_s: float | None = None) -> Select:
+    """
+    Titles of the revenues neither in `stg_movies_details`, nor mapped to a movie by hand (`MANUAL` in
+    `dwh_map__titles`), nor attempted already by a fetch. Failed attempts are
+    skipped unless `retry_failed`, and titles not found are searched again once their checkpoint is
+    older than `not_found_after_s` (the `negative_cache_ttl_s` of the fetch).
+    """
+    checkpoint_condition = STGDayRevenue.title == METAFetchCheckpoint.title
+    if retry_failed:
+        checkpoint_condition &= METAFetchCheckpoint.state != FAILED
+    if not_found_after_s is not None:
+        checkpoint_condition &= or_(METAFetchCheckpoint.state != NOT_FOUND,
+                                    METAFetchCheckpoint.modified_date >= func.datetime(
+                                        'now', f"-{int(not_found_after_s)} seconds"))
+    return (
+        select(STGDayRevenue.title)
+        .distinct()
+        .outerjoin(STGMovie, STGDayRevenue.title == STGMovie.title)
+        .outerjoin(DWHTitleMap, (STGDayRevenue.title == DWHTitleMap.title)
+                   & (DWHTitleMap.method == TitleMatch.MANUAL.value))
+        .outerjoin(METAFetchCheckpoint, checkpoint_condition)
+        .where(is_(STGMovie.title, None))
+        .where(is_(DWHTitleMap.title, None))
+        .where(is_(METAFetchCheckpoint.title, None))
+    )
+
+
+def _get_distinct_not_present_titles(engine: Engine,
+                                     retry_failed: bool = False,
+                                     not_found_after_s: float | None = None) -> tuple[Title, ...]:
     with Session(engine) as session:
-        statement = (
-            select(STGDayRevenue.title)
-            .distinct()
-            .outerjoin(STGMovie, STGDayRevenue.title == STGMovie.title)
-            .where(is_(STGMovie.title, None))
-        )
-        results = tuple(session.execute(statement).scalars().all())
+        results = tuple(session.execute(get_not_present_titles_statement(retry_failed,
+                                                                         not_found_after_s)).scalars().all())
         return results
 
 
-def _get_omdb_data(omdb_address: str, api_key: str, movie_title: Title) -> Response | None:
-    url = furl(omdb_address).add(dict(apikey=api_key, t=movie_title)).url
-    try:
-        return requests.get(url)
-    except Exception as e:
-        print(e)
-        return None
+def _get_movies_due_for_refresh(engine: Engine, refresh_after_s: float) -> dict[IMDbId, dict[Title, str]]:
+    """
+    Titles of the movies in `dwh_dim__movies` fetched or checked (not failed) more than `refresh_after_s`
+    seconds ago, with the hashes of their stored payloads, by imdbID. The movies with the most recent
+    revenue date come first, then the ones checked the longest time ago.
+    """
+    due: dict[IMDbId, dict[Title, str]] = {}
+    with Session(engine) as session:
+        rows = session.execute(text(f"""
+            SELECT imdb_id
+                ,title
+                ,response
+            FROM (
+                SELECT movies.imdb_id
+                    ,details.title
+                    ,details.response
+                    ,revenues.last_revenue_date
+                    ,MAX(details.modified_date, COALESCE(checkpoints.modified_date, '')) AS checked_date
+                FROM {DWHMovie.__tablename__} movies
+                JOIN {STGMovie.__tablename__} details ON movies.imdb_id = details.imdb_id
+                LEFT JOIN {METAFetchCheckpoint.__tablename__} checkpoints ON details.title = checkpoints.title
+                    AND checkpoints.state != '{FAILED}'
+                LEFT JOIN (
+                    SELECT facts.movie_id
+                        ,MAX(dates.value) AS last_revenue_date
+                    FROM {DWHDayRevenue.__tablename__} facts
+                    JOIN {DWHDate.__tablename__} dates ON facts.date_id = dates.id
+                    GROUP BY facts.movie_id
+                    ) revenues ON movies.id = revenues.movie_id
+                ) a
+            WHERE checked_date < datetime('now', :age)
+            ORDER BY last_revenue_date DESC NULLS LAST
+                ,checked_date;
+        """), dict(age=f"-{int(refresh_after_s)} seconds"))
+        for imdb_id, title, response in rows:
+            due.setdefault(imdb_id, {})[title] = _payload_hash(json.loads(response))
+    return due
+
+
+def _process_omdb_response(title: Title, response_json: dict | None) -> tuple[dict | None, bool, str | None]:
+    if not isinstance(response_json, dict):
+        return None, True, f"Faulty API response for {title}."
+
+    if not eval(response_json.get('Response', 'None')):
+        is_faulty = not response_json.get('Error', '') == 'Movie not found!'
+        return None, is_faulty, f"Faulty API response for {title}. {response_json.get('Error', 'Error not known')}"
+
+    return dict(title=title, response=json.dumps(response_json)), False, None
+
+
+def _process_title_response(title: Title, response_json: dict | None) -> tuple[list[dict] | None, bool, str | None]:
+    details, is_faulty, msg = _process_omdb_response(title, response_json)
+    return [details] if details else None, is_faulty, msg
+
+
+def _payload_hash(response_json: dict) -> str:
+    return hashlib.sha256(json.dumps(response_json, sort_keys=True).encode()).hexdigest()
 
 
 def _check_attribute(model: Type[SQLModel], attr_name: str):
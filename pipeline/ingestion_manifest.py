@@ -0,0 +1,263 @@
+import hashlib
+import io
+import os
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable
+
+from sqlalchemy import Engine, text
+from sqlalchemy.orm import Session
+
+from models.schemas.meta.ingestion_manifest import METAIngestedFile, METAIngestedPartition
+
+_READ_SIZE = 1024 * 1024
+_HASH_BITS = 128
+_UPSERT_PARTITION_SQL = f"""
+    INSERT INTO {METAIngestedPartition.__tablename__} (table_name, partition_key, content_hash, rows_number)
+    VALUES (:table_name, :partition_key, :content_hash, :rows_number)
+    ON CONFLICT(table_name, partition_key) DO UPDATE
+    SET content_hash = excluded.content_hash
+        ,rows_number = excluded.rows_number
+        ,modified_date = CURRENT_TIMESTAMP;
+"""
+
+
+@dataclass
+class FileFingerprint:
+    filepath: str
+    size: int
+    mtime_ns: int
+    file_hash: str | None = None
+
+    @classmethod
+    def of(cls, filepath: str) -> 'FileFingerprint':
+        stat = os.stat(filepath)
+        return cls(filepath=os.path.abspath(filepath), size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    def get_file_hash(self) -> str:
+        if self.file_hash is None:
+            digest = hashlib.sha256()
+            with open(self.filepath, 'rb') as file:
+                for block in iter(lambda: file.read(_READ_SIZE), b''):
+                    digest.update(block)
+            self.file_hash = digest.hexdigest()
+        return self.file_hash
+
+    def open(self) -> BinaryIO:
+        """
+        Opens the file for reading in binary mode. The file is hashed from the bytes read and `file_hash`
+        is set once its end is read, so a file parsed to its end is not read again by `get_file_hash`.
+        """
+        return io.BufferedReader(_HashingReader(self), buffer_size=_READ_SIZE)
+
+
+class _HashingReader(io.RawIOBase):
+    def __init__(self, fingerprint: FileFingerprint):
+        self._fingerprint = fingerprint
+        self._file = open(fingerprint.filepath, 'rb', buffering=0)
+        self._digest = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = self._file.readinto(buffer)
+        if size:
+            self._digest.update(memoryview(buffer)[:size])
+        elif self._digest is not None:
+            self._fingerprint.file_hash = self._digest.hexdigest()
+            self._digest = None
+        return size
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def is_file_unchanged(engine: Engine, table_name: str, fingerprint: FileFingerprint) -> bool:
+    """
+    Checks whether the file has the same content as the last file ingested to the table.
+
+    The same path, size and modification time are trusted without reading the file. A file of the same
+    size is hashed and compared (e.g. a copy of the last file). Only the last file is compared, because
+    the partitions of an older one may have been overwritten since.
+
+    :param engine: A SQLAlchemy engine used to connect to the database.
+    :type engine: Engine
+    :param table_name: The name of the ingested table.
+    :type table_name: str
+    :param fingerprint: The fingerprint of the file to ingest.
+    :type fingerprint: FileFingerprint
+
+    :return: True if the file does not have to be ingested.
+    :rtype: bool
+    """
+    return is_same_file(get_last_ingested_file(engine, table_name), fingerprint)
+
+
+def get_last_ingested_file(engine: Engine, table_name: str) -> FileFingerprint | None:
+    """
+    Returns the fingerprint of the last file ingested to the table, the only one trusted to be unchanged
+    in the table (see `is_same_file`).
+    """
+    with Session(engine) as session:
+        last = session.execute(text(f"""
+            SELECT filepath
+                ,size
+                ,mtime_ns
+                ,file_hash
+            FROM {METAIngestedFile.__tablename__}
+            WHERE table_name = :table_name
+            ORDER BY ingestion_no DESC
+            LIMIT 1;
+        """), {"table_name": table_name}).fetchone()
+    if last is None:
+        return None
+    return FileFingerprint(filepath=last.filepath, size=last.size, mtime_ns=last.mtime_ns, file_hash=last.file_hash)
+
+
+def is_same_file(recorded: FileFingerprint | None, fingerprint: FileFingerprint) -> bool:
+    """
+    Checks whether the file has the same content as the recorded one (e.g. by `get_last_ingested_file`).
+    The same path, size and modification time are trusted, a file of the same size is hashed.
+    """
+    if recorded is None or recorded.size != fingerprint.size:
+        return False
+    if recorded.filepath == fingerprint.filepath and recorded.mtime_ns == fingerprint.mtime_ns:
+        fingerprint.file_hash = recorded.file_hash
+        return True
+    return fingerprint.get_file_hash() == recorded.file_hash
+
+
+def hash_partitions(rows: Iterable[tuple], partition_position: int) -> dict[str, tuple[str, int]]:
+    """
+    Computes the content hash of every partition of the rows, e.g. of every date of the revenues.
+
+    The hash of a partition is the sum of the hashes of its rows (modulo 2^128), so it does not depend on
+    the order of the rows in the file.
+
+    :param rows: The rows as read from the file (tuples of strings or None).
+    :type rows: Iterable[tuple]
+    :param partition_position: The position of the partition key in the row.
+    :type partition_position: int
+
+    :return: The content hash and the number of rows by the partition key.
+    :rtype: dict[str, tuple[str, int]]
+    """
+    sums: dict[str, int] = {}
+    counts: dict[str, int] = {}
+    mask = (1 << _HASH_BITS) - 1
+    for row in rows:
+        digest = hashlib.blake2b('\x1f'.join(value or '' for value in row).encode(),
+                                 digest_size=_HASH_BITS // 8).digest()
+        key = row[partition_position] or ''
+        sums[key] = (sums.get(key, 0) + int.from_bytes(digest, 'big')) & mask
+        counts[key] = counts.get(key, 0) + 1
+    return {key: (f"{sums[key]:0{_HASH_BITS // 4}x}", counts[key]) for key in sums}
+
+
+def get_changed_partitions(engine: Engine, table_name: str, hashes: dict[str, tuple[str, int]]) -> set[str]:
+    """
+    Returns the partitions keys whose content hash differs from the one recorded by their last ingestion
+    (or which have never been ingested).
+    """
+    recorded = get_partition_hashes(engine, table_name)
+    return {key for key, (content_hash, _) in hashes.items() if recorded.get(key) != content_hash}
+
+
+def get_partition_hashes(engine: Engine, table_name: str) -> dict[str, str]:
+    """
+    Returns the content hashes recorded by the last ingestion of every partition by the partition key.
+    """
+    with Session(engine) as session:
+        return dict(session.execute(text(f"""
+            SELECT partition_key
+                ,content_hash
+            FROM {METAIngestedPartition.__tablename__}
+            WHERE table_name = :table_name;
+        """), {"table_name": table_name}).fetchall())
+
+
+def record_partitions(connection, table_name: str, hashes: dict[str, tuple[str, int]]):
+    """
+    Records the content hashes of the partitions in the transaction writing their rows, so they are
+    committed or rolled back together with the rows (see `pipeline.multi_file_ingestion`).
+
+    :param connection: A DBAPI connection or cursor of the SQLite database, in the writing transaction.
+    """
+    connection.executemany(_UPSERT_PARTITION_SQL,
+                           [dict(table_name=table_name, partition_key=key, content_hash=content_hash,
+                                 rows_number=rows_number)
+                            for key, (content_hash, rows_number) in hashes.items()])
+
+
+def forget_partitions(engine: Engine, table_name: str, keys: Iterable[str] | None = None):
+    """
+    Deletes the content hashes of the partitions (all the partitions of the table without `keys`) before
+    they are overwritten, so a load interrupted before `record_ingestion` or a load which does not hash
+    its rows never leaves the hash of an older content: the next ingestion writes these partitions again.
+
+    :raises SQLAlchemyError: If there is an error executing the SQL statements.
+    """
+    with Session(engine) as session:
+        try:
+            if keys is None:
+                session.execute(text(f"""
+                    DELETE FROM {METAIngestedPartition.__tablename__}
+                    WHERE table_name = :table_name;
+                """), {"table_name": table_name})
+            else:
+                session.execute(text(f"""
+                    DELETE FROM {METAIngestedPartition.__tablename__}
+                    WHERE table_name = :table_name
+                        AND partition_key = :partition_key;
+                """), [dict(table_name=table_name, partition_key=key) for key in keys])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+def record_ingestion(engine: Engine,
+                     table_name: str,
+                     fingerprint: FileFingerprint,
+                     hashes: dict[str, tuple[str, int]]):
+    """
+    Records the file as the last one ingested to the table and the content hashes of the partitions
+    written from it. It is called after the rows are committed, so an interrupted ingestion is repeated.
+
+    :raises SQLAlchemyError: If there is an error executing the SQL statements.
+    """
+    with Session(engine) as session:
+        try:
+            session.execute(text(f"""
+                INSERT INTO {METAIngestedFile.__tablename__} (table_name, filepath, size, mtime_ns, file_hash,
+                                                             ingestion_no)
+                SELECT :table_name
+                    ,:filepath
+                    ,:size
+                    ,:mtime_ns
+                    ,:file_hash
+                    ,COALESCE(MAX(ingestion_no), 0) + 1
+                FROM {METAIngestedFile.__tablename__}
+                WHERE 1
+                ON CONFLICT(table_name, filepath) DO UPDATE
+                SET size = excluded.size
+                    ,mtime_ns = excluded.mtime_ns
+                    ,file_hash = excluded.file_hash
+                    ,ingestion_no = excluded.ingestion_no
+                    ,modified_date = CURRENT_TIMESTAMP;
+            """), dict(table_name=table_name, filepath=fingerprint.filepath, size=fingerprint.size,
+                       mtime_ns=fingerprint.mtime_ns, file_hash=fingerprint.get_file_hash()))
+            if hashes:
+                session.execute(text(_UPSERT_PARTITION_SQL),
+                                [dict(table_name=table_name, partition_key=key, content_hash=content_hash,
+                                      rows_number=rows_number)
+                                 for key, (content_hash, rows_number) in hashes.items()])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
@@ -0,0 +1,250 @@
+import cProfile
+import json
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Iterator
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from pipeline import State
+
+LATENCY_BOUNDS_S = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+_lock = threading.Lock()
+_local = threading.local()
+_active_report: 'RunReport | None' = None
+
+
+@dataclass
+class StepMetrics:
+    name: str
+    started_at: str
+    wall_time_s: float = 0.0
+    state: str = str(State.SUCCESS)
+    error: str | None = None
+    rows_read: int | None = None
+    rows_written: int | None = None
+    query_plans: dict[str, list[str]] = field(default_factory=dict)
+    profile_path: str | None = None
+
+    def add_rows(self, read: int | None = None, written: int | None = None):
+        # rowcount is -1 for statements which don't report it
+        if read is not None and read >= 0:
+            self.rows_read = (self.rows_read or 0) + read
+        if written is not None and written >= 0:
+            self.rows_written = (self.rows_written or 0) + written
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with fixed bucket bounds (`LATENCY_BOUNDS_S`, in seconds).
+    """
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BOUNDS_S)
+        self.count = 0
+        self.sum_s = 0.0
+        self.min_s = math.inf
+        self.max_s = 0.0
+
+    def observe(self, value_s: float):
+        for i, bound in enumerate(LATENCY_BOUNDS_S):
+            if value_s <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum_s += value_s
+        self.min_s = min(self.min_s, value_s)
+        self.max_s = max(self.max_s, value_s)
+
+    def quantile(self, q: float) -> float | None:
+        """
+        Upper bound of the bucket holding the `q` quantile (the max for the last bucket).
+        """
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(LATENCY_BOUNDS_S, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_s)
+        return self.max_s
+
+    def to_dict(self) -> dict:
+        return dict(count=self.count,
+                    sum_s=round(self.sum_s, 6),
+                    min_s=round(self.min_s, 6) if self.count else None,
+                    max_s=round(self.max_s, 6) if self.count else None,
+                    p50_s=self.quantile(0.5),
+                    p95_s=self.quantile(0.95),
+                    p99_s=self.quantile(0.99),
+                    buckets={('+Inf' if math.isinf(bound) else f'le_{bound}'): count
+                             for bound, count in zip(LATENCY_BOUNDS_S, self.counts)})
+
+
+class RunReport:
+    """
+    Metrics of one pipeline run: a `StepMetrics` per instrumented step and the API latency histograms.
+
+    With `explain` the SQL steps capture SQLite `EXPLAIN QUERY PLAN` of their statements. With
+    `profile_dir` every top level step is run under cProfile and its stats are dumped to
+    `{profile_dir}/{step name}.prof`.
+    """
+
+    def __init__(self, explain: bool = True, profile_dir: str | None = None):
+        self.explain = explain
+        self.profile_dir = profile_dir
+        self.started_at = _now()
+        self.wall_time_s: float | None = None
+        self._start = time.perf_counter()
+        self.steps: list[StepMetrics] = []
+        self.api_latency: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def finish(self):
+        self.wall_time_s = time.perf_counter() - self._start
+
+    def add_step(self, metrics: StepMetrics):
+        with self._lock:
+            self.steps.append(metrics)
+
+    def observe_api_call(self, name: str, latency_s: float):
+        with self._lock:
+            self.api_latency.setdefault(name, LatencyHistogram()).observe(latency_s)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return dict(started_at=self.started_at,
+                        wall_time_s=round(self.wall_time_s or time.perf_counter() - self._start, 6),
+                        steps=[asdict(step) for step in self.steps],
+                        api_latency={name: histogram.to_dict() for name, histogram in self.api_latency.items()})
+
+    def write_json(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+
+@contextmanager
+def instrumented_run(report_path: str | None = None,
+                     explain: bool = True,
+                     profile_dir: str | None = None) -> Iterator[RunReport]:
+    """
+    Activates a `RunReport` for the pipeline steps executed inside the block (in any thread).
+
+    :param report_path: Where to write the JSON report when the block exits (also on error).
+    :type report_path: str | None
+    :param explain: Capture `EXPLAIN QUERY PLAN` of the SQL steps.
+    :type explain: bool
+    :param profile_dir: Directory for per-step cProfile dumps. Profiling is off if not set.
+    :type profile_dir: str | None
+
+    :return: The active report.
+    :rtype: RunReport
+    """
+    global _active_report
+    report = RunReport(explain=explain, profile_dir=profile_dir)
+    with _lock:
+        previous, _active_report = _active_report, report
+    try:
+        yield report
+    finally:
+        with _lock:
+            _active_report = previous
+        report.finish()
+        if report_path:
+            report.write_json(report_path)
+            print(f"Run report written to {report_path}")
+
+
+def active_report() -> RunReport | None:
+    return _active_report
+
+
+def current_step() -> StepMetrics | None:
+    stack = getattr(_local, 'steps', None)
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def step(name: str) -> Iterator[StepMetrics]:
+    """
+    Measures the wall time of the block as a step of the active report. Rows and query plans are
+    added to the yielded metrics (or to `current_step()` from the called helpers). Without an active
+    report the metrics are collected but not recorded anywhere.
+    """
+    report = _active_report
+    metrics = StepMetrics(name=name, started_at=_now())
+    stack = _local.__dict__.setdefault('steps', [])
+    profiler = cProfile.Profile() if report and report.profile_dir and not stack else None
+
+    stack.append(metrics)
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield metrics
+    except BaseException as e:
+        metrics.state = str(State.FAIL)
+        metrics.error = repr(e)
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+            os.makedirs(report.profile_dir, exist_ok=True)
+            filename = re.sub(r'[^\w.-]+', '_', name).strip('_')
+            metrics.profile_path = os.path.join(report.profile_dir, f"{filename}.prof")
+            profiler.dump_stats(metrics.profile_path)
+        metrics.wall_time_s = round(time.perf_counter() - start, 6)
+        stack.pop()
+        if report:
+            report.add_step(metrics)
+
+
+def instrumented(function: Callable) -> Callable:
+    """
+    Decorator measuring every call of `function` as a step named after it.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with step(function.__name__):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def count_rows(read: int | None = None, written: int | None = None):
+    metrics = current_step()
+    if metrics:
+        metrics.add_rows(read=read, written=written)
+
+
+def record_api_call(name: str, latency_s: float):
+    report = _active_report
+    if report:
+        report.observe_api_call(name, latency_s)
+
+
+def explain_query_plan(session: Session, label: str, statement: str, params: dict | None = None):
+    """
+    Adds the SQLite `EXPLAIN QUERY PLAN` of `statement` to the current step, if the active report
+    asks for it. It must be called before the statement is executed (e.g. before it creates a table).
+    """
+    report, metrics = _active_report, current_step()
+    if not (report and report.explain and metrics):
+        return
+    rows = session.execute(text(f"EXPLAIN QUERY PLAN {statement}"), params or {}).fetchall()
+    metrics.query_plans[label] = [row[-1] for row in rows]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
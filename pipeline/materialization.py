@@ -0,0 +1,72 @@
+from sqlalchemy import text, Engine
+from sqlalchemy.orm import Session
+
+from models.schemas.dwh.rankings import DWHRanking
+from pipeline import State
+from pipeline.change_tracking import get_changes_params, log_changes, prune_changelog
+from pipeline.data_version import bump_data_version
+from pipeline.instrumentation import count_rows, explain_query_plan, step
+from pipeline.transformation import _split_statements
+from pipeline.watermarks import INITIAL_WATERMARK, get_current_timestamp, get_watermark, set_watermark
+
+RANKINGS = ('per_month', 'genres', 'actors', 'countries', 'directors', 'movies', 'rating', 'per_year', 'writers')
+
+
+def materialize_rankings(engine: Engine, incremental: bool = True) -> State:
+    """
+    Refreshes the materialized dashboard rankings.
+
+    The per-movie revenue summary (`dwh_agg__movies_revenues`) is recomputed only for movies with
+    facts in the change log since the last refresh (or for all movies if not `incremental`), including
+    the movies of the deleted facts, whose summary is deleted with their last fact. It is executed
+    from `./pipeline/materialization/dwh_agg__movies_revenues.sql`. Then every ranking from
+    `./pipeline/materialization/rankings/` is rebuilt in `dwh_agg__rankings` from that summary,
+    which is one row per movie instead of one row per movie and day. All is done in one transaction.
+
+    :param engine: A SQLAlchemy engine used to connect to the database.
+    :type engine: Engine
+    :param incremental: Refresh the summary only for movies whose facts changed since the last refresh.
+    :type incremental: bool
+
+    :return: Returns `State.SUCCESS` if the refresh and transaction commit are successful.
+    :rtype: State
+
+    :raises FileNotFoundError: If any of the SQL files cannot be found or opened.
+    :raises SQLAlchemyError: If there is an error executing the SQL queries.
+    """
+
+    directory = "./pipeline/materialization"
+    target = "dwh_agg__movies_revenues"
+    with open(f'{directory}/{target}.sql', 'r') as file:
+        summary_query = file.read()
+    rankings_queries: dict[str, str] = {}
+    for ranking in RANKINGS:
+        with open(f'{directory}/rankings/{ranking}.sql', 'r') as file:
+            rankings_queries[ranking] = file.read()
+
+    with step("materialize_rankings"), Session(engine) as session:
+        try:
+            since = get_watermark(session, target) if incremental else INITIAL_WATERMARK
+            params = get_changes_params(since)
+            run_start = get_current_timestamp(session)
+            for statement_no, statement in enumerate(_split_statements(summary_query), start=1):
+                explain_query_plan(session, f"{target}#{statement_no}", statement, params)
+                count_rows(written=session.execute(text(statement), params).rowcount)
+            log_changes(session.connection().connection.dbapi_connection, target, run_start)
+            for ranking, query in rankings_queries.items():
+                session.execute(text(f"DELETE FROM {DWHRanking.__tablename__} WHERE ranking = :ranking;"),
+                                {"ranking": ranking})
+                explain_query_plan(session, ranking, query, {"ranking": ranking})
+                count_rows(written=session.execute(text(query), {"ranking": ranking}).rowcount)
+            set_watermark(session, target, run_start)
+            prune_changelog(session)
+            bump_data_version(session)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    print(f"Rankings materialized ({'incremental' if incremental else 'full'} refresh since {since})")
+    return State.SUCCESS
@@ -0,0 +1,59 @@
+-- the summaries of the movies without facts anymore
+DELETE
+FROM dwh_agg__movies_revenues
+WHERE movie_id IN (
+		SELECT movie_id
+		FROM dwh_agg__movies_revenues
+		WHERE :full_refresh
+		UNION
+		SELECT row_key
+		FROM meta_changelog
+		WHERE NOT :full_refresh
+			AND table_name = 'dwh_fact__revenues:deleted'
+			AND changed_date >= :since
+		)
+	AND movie_id NOT IN (
+		SELECT movie_id
+		FROM dwh_fact__revenues
+		);
+
+INSERT INTO dwh_agg__movies_revenues (
+	movie_id
+	,total_revenue
+	,revenue_days
+	)
+SELECT *
+FROM (
+	SELECT r.movie_id
+		,SUM(r.revenue) AS total_revenue
+		,COUNT(*) AS revenue_days
+	FROM dwh_fact__revenues r
+	WHERE r.movie_id IN (
+			SELECT movie_id
+			FROM dwh_fact__revenues
+			WHERE :full_refresh
+			UNION
+			-- the changed facts looked up by their primary key
+			SELECT changed.movie_id
+			FROM meta_changelog c
+			JOIN dwh_fact__revenues changed ON changed.id = c.row_key
+			WHERE NOT :full_refresh
+				AND c.table_name = 'dwh_fact__revenues'
+				AND c.changed_date >= :since
+			UNION
+			-- the movies of the deleted facts
+			SELECT row_key
+			FROM meta_changelog
+			WHERE NOT :full_refresh
+				AND table_name = 'dwh_fact__revenues:deleted'
+				AND changed_date >= :since
+			)
+	GROUP BY r.movie_id
+	) a
+WHERE 1
+ON CONFLICT(movie_id) DO UPDATE
+SET total_revenue = excluded.total_revenue
+	,revenue_days = excluded.revenue_days
+	,modified_date = CURRENT_TIMESTAMP
+WHERE total_revenue != excluded.total_revenue
+	OR revenue_days != excluded.revenue_days;
@@ -0,0 +1,12 @@
+INSERT INTO dwh_agg__rankings (
+	ranking
+	,label
+	,total_revenue
+	)
+SELECT :ranking
+	,x.name AS country
+	,SUM(s.total_revenue) AS total_revenue
+FROM dwh_bridge__movies_countries b
+JOIN dwh_agg__movies_revenues s ON b.movie_id = s.movie_id
+JOIN dwh_dim__countries x ON b.country_id = x.id
+GROUP BY x.id;
@@ -0,0 +1,13 @@
+INSERT INTO dwh_agg__rankings (
+	ranking
+	,label
+	,total_revenue
+	)
+SELECT :ranking
+	,p.name AS director
+	,SUM(s.total_revenue) AS total_revenue
+FROM dwh_bridge__movies_people mp
+JOIN dwh_agg__movies_revenues s ON mp.movie_id = s.movie_id
+JOIN dwh_dim__people p ON mp.person_id = p.id
+WHERE mp.role = 'DIRECTOR'
+GROUP BY p.id;
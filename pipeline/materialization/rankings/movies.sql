@@ -0,0 +1,11 @@
+INSERT INTO dwh_agg__rankings (
+	ranking
+	,label
+	,total_revenue
+	)
+SELECT :ranking
+	,m.title
+	,SUM(s.total_revenue) AS total_revenue
+FROM dwh_dim__movies m
+JOIN dwh_agg__movies_revenues s ON m.id = s.movie_id
+GROUP BY m.title;
@@ -0,0 +1,12 @@
+INSERT INTO dwh_agg__rankings (
+	ranking
+	,label
+	,total_revenue
+	)
+SELECT :ranking
+	,printf('%04d', d.year) AS release_year
+	,CAST(SUM(s.total_revenue) * 1.0 / SUM(s.revenue_days) AS INT) AS total_revenue
+FROM dwh_dim__movies m
+JOIN dwh_agg__movies_revenues s ON m.id = s.movie_id
+JOIN dwh_dim__dates d ON m.release_date_id = d.id
+GROUP BY d.year;
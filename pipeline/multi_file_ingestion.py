@@ -0,0 +1,238 @@
+import glob
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, replace
+
+from sqlalchemy import Engine
+
+from pipeline import State
+from pipeline.change_tracking import log_changes
+from pipeline.ingestion import CSVIngesterDefinition, read_revenues_rows, revenues_upsert_sql, tune_for_bulk_writes
+from pipeline.ingestion_manifest import FileFingerprint, get_last_ingested_file, get_partition_hashes, \
+    hash_partitions, is_same_file, record_ingestion, record_partitions
+from pipeline.instrumentation import count_rows, step
+
+
+@dataclass
+class FileIngestionResult:
+    filepath: str
+    state: State
+    rows_number: int = 0
+    partitions_number: int = 0
+    changed_partitions_number: int = 0
+    parse_s: float = 0.0
+    write_s: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class _ParsedFile:
+    filepath: str
+    rows: list[tuple] | None = None
+    hashes: dict[str, tuple[str, int]] | None = None
+    file_hash: str | None = None
+    parse_s: float = 0.0
+    error: str | None = None
+
+
+def ingest_revenues_files(definition: CSVIngesterDefinition, engine: Engine) -> list[FileIngestionResult]:
+    """
+    Ingests all the revenues CSV files of a directory (`*.csv` in it) or of a glob pattern, e.g. the
+    per day or per distributor feeds, into the table of `definition.orm_class`.
+
+    The files are parsed (and hashed by date for the manifest) by `definition.max_workers` processes, a
+    few files ahead of the writer. This process is the only writer: it UPSERTs the files in the order of
+    their paths on one connection tuned for bulk writes (see `bulk_upsert_sqlite`), every file in its
+    own transaction together with its changes in the change log and the content hashes of its dates in
+    `meta_ingested_partitions`, and then records it in `meta_ingested_files`.
+
+    With `definition.skip_unchanged` the rules of a single file apply. Only the last ingested file is
+    trusted and skipped without parsing it, if it is the last of the files too and no file before it
+    had to be written (it is parsed and checked at the end otherwise, so the files are still applied
+    in the order of their paths). Of the other files only the dates whose content hash differs from
+    the recorded one are written, a file without such dates is reported as skipped. A date shared by
+    several files has the hash of the last one, so it is written again by every run (the UPSERT does
+    not change its unchanged rows).
+
+    A file which cannot be parsed or written is rolled back and reported as failed, the other files
+    are still ingested. The result of every file is printed when it is written, and the summary with
+    the throughput at the end.
+
+    :param definition: The CSV files pattern (`filepath`), the parsing options, the ORM of the staging
+                       table and the number of parsing processes.
+    :type definition: CSVIngesterDefinition
+    :param engine: A SQLAlchemy engine connected to a SQLite database.
+    :type engine: Engine
+
+    :return: The results of the files, in the order of their paths.
+    :rtype: list[FileIngestionResult]
+
+    :raises FileNotFoundError: If no file matches the pattern.
+    """
+    filepaths = _list_files(definition.filepath)
+    if not filepaths:
+        raise FileNotFoundError(f"No CSV files match {definition.filepath}")
+
+    table_name = definition.orm_class.__tablename__
+    last = get_last_ingested_file(engine, table_name) if definition.skip_unchanged else None
+    partition_hashes = get_partition_hashes(engine, table_name) if definition.skip_unchanged else {}
+    fingerprints = [FileFingerprint.of(filepath) for filepath in filepaths]
+    trusted = fingerprints[-1] if is_same_file(last, fingerprints[-1]) else None
+    to_ingest = fingerprints[:-1] if trusted else fingerprints
+    print(f"{len(to_ingest)} of {len(fingerprints)} files to parse, {len(fingerprints) - len(to_ingest)} "
+          f"unchanged skipped")
+    results: dict[str, FileIngestionResult] = {}
+
+    def parsed_files():
+        yield from _parse_files(definition, to_ingest)
+        if trusted and any(result.state == State.SUCCESS for result in results.values()):
+            print(f"{trusted.filepath} is checked again, the files before it were written")
+            yield from _parse_files(definition, [trusted])
+
+    start = time.perf_counter()
+    with step(f"ingest_revenues_files({definition.filepath})"):
+        statement = revenues_upsert_sql(table_name, "VALUES (?, ?, ?, CAST(? AS INT), CAST(? AS INT), ?)")
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            try:
+                tune_for_bulk_writes(cursor)
+                for done_number, (fingerprint, parsed) in enumerate(parsed_files(), start=1):
+                    result = _write_file(cursor, connection, statement, table_name, parsed, partition_hashes)
+                    if result.state != State.FAIL:
+                        # its date hashes are committed with its rows, the file becomes the last ingested one
+                        fingerprint.file_hash = parsed.file_hash
+                        record_ingestion(engine, table_name, fingerprint, {})
+                    results[fingerprint.filepath] = result
+                    print(_format_result(result, f"{done_number}/{len(fingerprints)}"))
+            finally:
+                cursor.close()
+        finally:
+            connection.close()
+
+    ordered = [results.get(fingerprint.filepath, FileIngestionResult(filepath=fingerprint.filepath,
+                                                                     state=State.SKIPPED))
+               for fingerprint in fingerprints]
+    _print_summary(ordered, time.perf_counter() - start, min(definition.max_workers, len(to_ingest)))
+    return ordered
+
+
+def _parse_files(definition: CSVIngesterDefinition, fingerprints: list[FileFingerprint]):
+    """
+    Yields the fingerprints with their parsed files in the order of the fingerprints. With more than one
+    worker and file the files are parsed in worker processes, at most `2 * max_workers` files ahead of
+    the consumer, so the parsed rows don't pile up in memory.
+    """
+    definitions = [replace(definition, filepath=fingerprint.filepath) for fingerprint in fingerprints]
+    max_workers = min(definition.max_workers, len(definitions))
+    if max_workers <= 1:
+        for fingerprint, file_definition in zip(fingerprints, definitions):
+            yield fingerprint, _parse_file(file_definition)
+        return
+
+    # spawned, not forked: the flow runs the tasks in threads and a forked worker could inherit a held lock
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        definitions_iter = iter(zip(fingerprints, definitions))
+        pending: deque[tuple[FileFingerprint, Future]] = deque()
+        try:
+            while True:
+                while len(pending) < 2 * max_workers:
+                    fingerprint, file_definition = next(definitions_iter, (None, None))
+                    if fingerprint is None:
+                        break
+                    pending.append((fingerprint, executor.submit(_parse_file, file_definition)))
+                if not pending:
+                    break
+                fingerprint, future = pending.popleft()
+                yield fingerprint, future.result()
+        except BaseException:
+            executor.shutdown(cancel_futures=True)
+            raise
+
+
+def _parse_file(definition: CSVIngesterDefinition) -> _ParsedFile:
+    start = time.perf_counter()
+    try:
+        # the file is hashed while it is parsed
+        fingerprint = FileFingerprint.of(definition.filepath)
+        rows = list(read_revenues_rows(definition, fingerprint))
+        hashes = hash_partitions(rows, partition_position=1)
+        file_hash = fingerprint.get_file_hash()
+    except Exception as e:
+        return _ParsedFile(filepath=definition.filepath, parse_s=time.perf_counter() - start, error=repr(e))
+    return _ParsedFile(filepath=definition.filepath, rows=rows, hashes=hashes, file_hash=file_hash,
+                       parse_s=time.perf_counter() - start)
+
+
+def _write_file(cursor,
+                connection,
+                statement: str,
+                table_name: str,
+                parsed: _ParsedFile,
+                partition_hashes: dict[str, str]) -> FileIngestionResult:
+    """
+    Writes the dates of the parsed file whose content hash is not the one in `partition_hashes` (all of
+    them without skipping, as `partition_hashes` is empty) and updates `partition_hashes` on commit.
+    """
+    if parsed.error:
+        return FileIngestionResult(filepath=parsed.filepath, state=State.FAIL, parse_s=parsed.parse_s,
+                                   error=parsed.error)
+
+    changed = {key: hashes for key, hashes in parsed.hashes.items() if partition_hashes.get(key) != hashes[0]}
+    if not changed:
+        return FileIngestionResult(filepath=parsed.filepath, state=State.SKIPPED,
+                                   partitions_number=len(parsed.hashes), parse_s=parsed.parse_s)
+    rows = parsed.rows if len(changed) == len(parsed.hashes) else [row for row in parsed.rows
+                                                                   if (row[1] or '') in changed]
+
+    start = time.perf_counter()
+    try:
+        cursor.execute("BEGIN;")
+        run_start = cursor.execute("SELECT CURRENT_TIMESTAMP;").fetchone()[0]
+        cursor.executemany(statement, rows)
+        count_rows(read=len(rows), written=cursor.rowcount)
+        record_partitions(cursor, table_name, changed)
+        log_changes(cursor, table_name, run_start)
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        return FileIngestionResult(filepath=parsed.filepath, state=State.FAIL, parse_s=parsed.parse_s,
+                                   write_s=time.perf_counter() - start, error=repr(e))
+    partition_hashes.update((key, content_hash) for key, (content_hash, _) in changed.items())
+    return FileIngestionResult(filepath=parsed.filepath, state=State.SUCCESS, rows_number=len(rows),
+                               partitions_number=len(parsed.hashes), changed_partitions_number=len(changed),
+                               parse_s=parsed.parse_s, write_s=time.perf_counter() - start)
+
+
+def _list_files(filepath: str) -> list[str]:
+    pattern = os.path.join(filepath, '*.csv') if os.path.isdir(filepath) else filepath
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def _format_result(result: FileIngestionResult, position: str) -> str:
+    name = os.path.basename(result.filepath)
+    if result.state == State.FAIL:
+        return f"[{position}] {name}: {result.state} {result.error}"
+    if result.state == State.SKIPPED:
+        return (f"[{position}] {name}: none of {result.partitions_number} date partitions new or changed, "
+                f"parsed in {result.parse_s:.2f}s")
+    return (f"[{position}] {name}: {result.changed_partitions_number} of {result.partitions_number} date "
+            f"partitions, {result.rows_number} rows, parsed in {result.parse_s:.2f}s, written in "
+            f"{result.write_s:.2f}s ({result.rows_number / max(result.write_s, 1e-9):.0f} rows/s)")
+
+
+def _print_summary(results: list[FileIngestionResult], elapsed_s: float, workers_number: int):
+    ingested = [result for result in results if result.state == State.SUCCESS]
+    failed = [result for result in results if result.state == State.FAIL]
+    rows_number = sum(result.rows_number for result in ingested)
+    print(f"{len(ingested)} of {len(results)} files ingested, {len(results) - len(ingested) - len(failed)} "
+          f"unchanged skipped, {len(failed)} failed: {rows_number} rows in {elapsed_s:.2f}s "
+          f"({rows_number / max(elapsed_s, 1e-9):.0f} rows/s). Parsing "
+          f"{sum(result.parse_s for result in results):.2f}s "
+          f"{f'in {workers_number} processes' if workers_number > 1 else 'in this process'}, writing "
+          f"{sum(result.write_s for result in results):.2f}s")
+    for result in failed:
+        print(f"Failed: {result.filepath}: {result.error}")
@@ -0,0 +1,200 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from models.definitions.objects import IMDbId, Title
+from pipeline.instrumentation import record_api_call
+from pipeline.omdb_cache import OMDBResponseCache, get_utc_day
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+QUOTA_ERROR = 'Request limit reached!'
+
+
+class OMDBQuotaExceeded(Exception):
+    pass
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket. `rate` tokens are added every second up to `capacity`.
+    It starts with `tokens` (full by default).
+    """
+
+    def __init__(self, rate: float, capacity: float, tokens: float | None = None):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity if tokens is None else min(capacity, max(tokens, 0))
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            wait_s = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait_s:
+            time.sleep(wait_s)
+
+
+class OMDBClient:
+    """
+    Reusable OMDb API client.
+
+    All calls share one `requests.Session`, so connections are kept alive and pooled
+    (`pool_size` should match the number of concurrent callers). Calls are paced by two token
+    buckets: the per-second one blocks until a call is allowed, the daily one raises
+    `OMDBQuotaExceeded` once the key's quota is spent. Connection errors, timeouts, 429 and 5xx
+    responses are retried with jittered exponential backoff before the call is given up.
+    With a `cache` the responses found there are returned without calling the API at all, and the
+    calls are counted in it by day: the daily bucket starts with the quota left today, so the quota
+    holds across restarts and resumed fetches (without a cache it is enforced per client only).
+    The latency of every HTTP call is recorded in the active run report by the response status.
+    """
+
+    def __init__(self,
+                 omdb_address: str,
+                 api_key: str,
+                 pool_size: int = 1,
+                 requests_per_second: float | None = None,
+                 daily_quota: int | None = None,
+                 max_retries: int = 3,
+                 backoff_base_s: float = 0.5,
+                 backoff_max_s: float = 30.0,
+                 timeout_s: float = 10.0,
+                 cache: OMDBResponseCache | None = None):
+        self.omdb_address = omdb_address
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.timeout_s = timeout_s
+        self.cache = cache
+
+        self._per_second = TokenBucket(requests_per_second, requests_per_second) if requests_per_second else None
+        self._daily = None
+        if daily_quota:
+            # the calls already made today by the previous runs sharing the cache are spent
+            spent = cache.get_daily_calls(get_utc_day()) if cache else 0
+            self._daily = TokenBucket(daily_quota / 86400, daily_quota, daily_quota - spent)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def from_definition(cls, definition, api_key: str) -> 'OMDBClient':
+        return cls(omdb_address=definition.omdb_address,
+                   api_key=api_key,
+                   pool_size=definition.max_in_flight,
+                   requests_per_second=definition.requests_per_second,
+                   daily_quota=definition.daily_quota,
+                   max_retries=definition.max_retries,
+                   backoff_base_s=definition.backoff_base_s,
+                   timeout_s=definition.timeout_s,
+                   cache=OMDBResponseCache(path=definition.cache_path,
+                                           ttl_s=definition.cache_ttl_s,
+                                           negative_ttl_s=definition.negative_cache_ttl_s,
+                                           max_entries=definition.cache_max_entries)
+                   if definition.cache_path else None)
+
+    def get_by_title(self, title: Title) -> dict | None:
+        return self.get(t=title)
+
+    def get_by_imdb_id(self, imdb_id: IMDbId, read_cache: bool = True) -> dict | None:
+        return self.get(read_cache=read_cache, i=imdb_id)
+
+    def get(self, read_cache: bool = True, **params) -> dict | None:
+        """
+        Calls the API with the given query parameters.
+        Without `read_cache` the API is called even if the response is cached (the cache is updated).
+
+        :return: The decoded JSON response or None if the call failed after all retries.
+        :rtype: dict | None
+
+        :raises OMDBQuotaExceeded: If the daily quota is spent (locally or reported by the API).
+        :raises ValueError: If the response body is not a valid JSON.
+        """
+        if self.cache and read_cache:
+            cached = self.cache.get(params)
+            if cached is not None:
+                return cached
+
+        for attempt in range(self.max_retries + 1):
+            if self._daily and not self._daily.try_acquire():
+                raise OMDBQuotaExceeded(f"Daily quota of {int(self._daily.capacity)} calls reached")
+            if self._daily and self.cache:
+                self.cache.count_daily_call(get_utc_day())
+            if self._per_second:
+                self._per_second.acquire()
+
+            call_start = time.perf_counter()
+            try:
+                response = self.session.get(self.omdb_address,
+                                            params=dict(apikey=self.api_key, **params),
+                                            timeout=self.timeout_s)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                record_api_call('omdb_failed', time.perf_counter() - call_start)
+                if attempt == self.max_retries:
+                    print(e)
+                    return None
+                self._backoff(attempt)
+                continue
+            record_api_call(f'omdb_{response.status_code}', time.perf_counter() - call_start)
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                self._backoff(attempt, response.headers.get('Retry-After'))
+                continue
+
+            if response.status_code == 401 and _is_quota_error(response):
+                raise OMDBQuotaExceeded(QUOTA_ERROR)
+
+            if response.status_code in RETRY_STATUSES:
+                return None
+
+            response_json = response.json()
+            if self.cache and isinstance(response_json, dict):
+                self.cache.put(params, response_json)
+            return response_json
+
+        return None
+
+    def _backoff(self, attempt: int, retry_after: str | None = None):
+        delay_s = random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt))
+        if retry_after and retry_after.isdigit():
+            delay_s = max(delay_s, float(retry_after))
+        time.sleep(delay_s)
+
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _is_quota_error(response: requests.Response) -> bool:
+    try:
+        return response.json().get('Error') == QUOTA_ERROR
+    except ValueError:
+        return False
@@ -0,0 +1,144 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+NOT_FOUND_ERROR = 'Movie not found!'
+
+
+class OMDBResponseCache:
+    """
+    Persistent OMDb responses cache stored in a local SQLite file.
+
+    Entries are keyed by the normalized request parameters (the title is case and whitespace
+    insensitive) and expire after `ttl_s` seconds. `Movie not found!` answers are cached as well,
+    with their own `negative_ttl_s`. When the cache grows over `max_entries` the least recently
+    used entries are evicted.
+
+    The number of API calls made on every (UTC) day is stored as well, so the daily quota of the key is
+    enforced across the processes and the resumed fetches sharing the cache (see `OMDBClient`).
+    """
+
+    def __init__(self,
+                 path: str,
+                 ttl_s: float = 30 * 24 * 3600,
+                 negative_ttl_s: float = 7 * 24 * 3600,
+                 max_entries: int | None = 100_000):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode = WAL;")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS omdb_responses (
+                key TEXT PRIMARY KEY
+                ,response TEXT NOT NULL
+                ,is_negative INTEGER NOT NULL
+                ,expires_at REAL NOT NULL
+                ,last_access REAL NOT NULL
+            );
+        """)
+        self._connection.execute("""
+            CREATE INDEX IF NOT EXISTS ix_omdb_responses_last_access ON omdb_responses (last_access);
+        """)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS omdb_daily_calls (
+                day TEXT PRIMARY KEY
+                ,calls INTEGER NOT NULL
+            );
+        """)
+
+    @staticmethod
+    def make_key(params: dict) -> str:
+        normalized = {name: ' '.join(str(value).split()).casefold() if name == 't' else str(value).strip()
+                      for name, value in params.items()
+                      if name != 'apikey'}
+        return json.dumps(normalized, sort_keys=True)
+
+    def get(self, params: dict) -> dict | None:
+        key = self.make_key(params)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute("""
+                SELECT response FROM omdb_responses WHERE key = ? AND expires_at > ?;
+            """, (key, now)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE omdb_responses SET last_access = ? WHERE key = ?;", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, params: dict, response_json: dict):
+        """
+        Stores a successful or `Movie not found!` response. Any other error is not cached.
+        """
+        is_negative = response_json.get('Response') == 'False'
+        if is_negative and response_json.get('Error') != NOT_FOUND_ERROR:
+            return
+
+        now = time.time()
+        expires_at = now + (self.negative_ttl_s if is_negative else self.ttl_s)
+        with self._lock:
+            self._connection.execute("""
+                INSERT INTO omdb_responses (key, response, is_negative, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET response = excluded.response
+                    ,is_negative = excluded.is_negative
+                    ,expires_at = excluded.expires_at
+                    ,last_access = excluded.last_access;
+            """, (self.make_key(params), json.dumps(response_json), int(is_negative), expires_at, now))
+
+    def get_daily_calls(self, day: str) -> int:
+        with self._lock:
+            row = self._connection.execute("SELECT calls FROM omdb_daily_calls WHERE day = ?;", (day,)).fetchone()
+        return row[0] if row else 0
+
+    def count_daily_call(self, day: str):
+        with self._lock:
+            self._connection.execute("""
+                INSERT INTO omdb_daily_calls (day, calls)
+                VALUES (?, 1)
+                ON CONFLICT(day) DO UPDATE SET calls = calls + 1;
+            """, (day,))
+
+    def evict(self) -> int:
+        """
+        Removes expired entries and the least recently used ones above `max_entries`, and the calls
+        counts of the past days.
+
+        :return: Number of removed entries.
+        :rtype: int
+        """
+        with self._lock:
+            removed = self._connection.execute("DELETE FROM omdb_responses WHERE expires_at <= ?;",
+                                               (time.time(),)).rowcount
+            if self.max_entries is not None:
+                removed += self._connection.execute("""
+                    DELETE FROM omdb_responses
+                    WHERE key IN (
+                        SELECT key
+                        FROM omdb_responses
+                        ORDER BY last_access DESC
+                        LIMIT -1 OFFSET ?
+                        );
+                """, (self.max_entries,)).rowcount
+            self._connection.execute("DELETE FROM omdb_daily_calls WHERE day < ?;", (get_utc_day(),))
+        return removed
+
+    def close(self):
+        self.evict()
+        with self._lock:
+            self._connection.close()
+
+
+def get_utc_day() -> str:
+    return time.strftime('%Y-%m-%d', time.gmtime())
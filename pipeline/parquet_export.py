@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Engine
+
+from pipeline import State
+from pipeline.instrumentation import count_rows, step
+
+PARQUET_DIRECTORY = './db/parquet'
+FACT_TABLE = 'dwh_fact__revenues'
+DIMENSIONS_TABLES = ('dwh_dim__movies', 'dwh_dim__dates', 'dwh_dim__distributors', 'dwh_dim__people',
+                     'dwh_dim__genres', 'dwh_dim__countries', 'dwh_bridge__movies_people',
+                     'dwh_bridge__movies_genres', 'dwh_bridge__movies_countries')
+PARTITION_COLUMNS = ['year', 'month']
+# fixed, so a chunk with only NULL distributors is not written with other types than the rest
+FACT_SCHEMA = pa.schema([('id', pa.int64()),
+                         ('movie_id', pa.int64()),
+                         ('distributor_id', pa.int64()),
+                         ('date_id', pa.int64()),
+                         ('revenue', pa.int64()),
+                         ('theaters_number', pa.int64()),
+                         ('year', pa.int32()),
+                         ('month', pa.int32())])
+MANIFEST_FILENAME = 'export.json'
+
+
+def export_parquet(engine: Engine, directory: str = PARQUET_DIRECTORY, chunksize: int = 500_000) -> State:
+    """
+    Exports the star schema to Parquet files.
+
+    The fact table is written as a dataset partitioned by the year and month of the revenue date
+    (`{directory}/dwh_fact__revenues/year=2022/month=1/...`), read from
+    `./pipeline/parquet_export/dwh_fact__revenues.sql` in chunks of `chunksize` rows. Every dimension
+    and bridge table is written to one file `{directory}/{table}.parquet`. The export is written next
+    to `directory` and swapped in only when complete, with `export.json` holding the rows numbers.
+
+    :param engine: A SQLAlchemy engine used to connect to the database.
+    :type engine: Engine
+    :param directory: Directory of the export, replaced as a whole.
+    :type directory: str
+    :param chunksize: Number of fact rows read and written at once.
+    :type chunksize: int
+
+    :return: Returns `State.SUCCESS` if the export is successful.
+    :rtype: State
+
+    :raises FileNotFoundError: If the SQL file cannot be found or opened.
+    :raises SQLAlchemyError: If there is an error executing the SQL queries.
+    """
+    with open(f'./pipeline/parquet_export/{FACT_TABLE}.sql', 'r') as file:
+        fact_query = file.read()
+
+    tmp_directory = f"{directory.rstrip('/')}.tmp"
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+    rows_numbers: dict[str, int] = {}
+
+    with step("export_parquet"):
+        for table_name in DIMENSIONS_TABLES:
+            df = pd.read_sql_query(f"SELECT * FROM {table_name}", engine)
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False),
+                           os.path.join(tmp_directory, f"{table_name}.parquet"))
+            rows_numbers[table_name] = len(df)
+            count_rows(read=len(df), written=len(df))
+
+        rows_numbers[FACT_TABLE] = 0
+        os.makedirs(os.path.join(tmp_directory, FACT_TABLE))
+        for chunk_no, df in enumerate(pd.read_sql_query(fact_query, engine, chunksize=chunksize), start=1):
+            pq.write_to_dataset(pa.Table.from_pandas(df, schema=FACT_SCHEMA, preserve_index=False),
+                                root_path=os.path.join(tmp_directory, FACT_TABLE),
+                                partition_cols=PARTITION_COLUMNS,
+                                basename_template=f"part-{chunk_no}-{{i}}.parquet")
+            rows_numbers[FACT_TABLE] += len(df)
+            count_rows(read=len(df), written=len(df))
+
+        with open(os.path.join(tmp_directory, MANIFEST_FILENAME), 'w') as file:
+            json.dump(dict(exported_at=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                           rows_numbers=rows_numbers),
+                      file, indent=2)
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_directory, directory)
+
+    print(f"Star schema exported to {directory} ({rows_numbers[FACT_TABLE]} fact rows)")
+    return State.SUCCESS
@@ -0,0 +1,11 @@
+SELECT f.id
+	,f.movie_id
+	,f.distributor_id
+	,f.date_id
+	,f.revenue
+	,f.theaters_number
+	,d.year
+	,d.month
+FROM dwh_fact__revenues f
+JOIN dwh_dim__dates d ON f.date_id = d.id
+ORDER BY f.date_id;
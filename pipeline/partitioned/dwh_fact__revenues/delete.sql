@@ -0,0 +1,76 @@
+-- the facts without a source row anymore (their title is mapped to another movie, or it is changed
+-- in the staging table) are deleted, and their movies are logged for the revenue summaries first
+INSERT OR IGNORE INTO meta_changelog (
+	table_name
+	,changed_date
+	,row_key
+	)
+SELECT DISTINCT 'dwh_fact__revenues:deleted'
+	,CURRENT_TIMESTAMP
+	,facts.movie_id
+FROM dwh_fact__revenues facts
+WHERE facts.date_id IN (
+		SELECT id
+		FROM dwh_dim__dates
+		WHERE :full_refresh
+		UNION
+		SELECT CAST(strftime('%Y%m%d', json_extract(row_key, '$[0]')) AS INTEGER)
+		FROM meta_changelog
+		WHERE NOT :full_refresh
+			AND table_name = 'stg_revenues_per_day'
+			AND changed_date >= :since
+		UNION
+		-- every date of the titles mapped again
+		SELECT CAST(strftime('%Y%m%d', stg_revenues.DATE) AS INTEGER)
+		FROM meta_changelog c
+		JOIN dwh_map__titles titles ON titles.id = c.row_key
+		JOIN stg_revenues_per_day stg_revenues ON stg_revenues.title = titles.title
+		WHERE NOT :full_refresh
+			AND c.table_name = 'dwh_map__titles'
+			AND c.changed_date >= :since
+		)
+	AND facts.date_id >= CAST(strftime('%Y%m%d', :partition_start) AS INTEGER)
+	AND facts.date_id < CAST(strftime('%Y%m%d', :partition_end) AS INTEGER)
+	AND NOT EXISTS (
+		SELECT 1
+		FROM dwh_dim__movies dim_movies
+		JOIN dwh_map__titles titles ON titles.imdb_id = dim_movies.imdb_id
+		JOIN dwh_dim__dates dates ON dates.id = facts.date_id
+		JOIN stg_revenues_per_day stg_revenues ON stg_revenues.DATE = dates.value
+			AND stg_revenues.title = titles.title
+		WHERE dim_movies.id = facts.movie_id
+		);
+
+DELETE
+FROM dwh_fact__revenues
+WHERE dwh_fact__revenues.date_id IN (
+		SELECT id
+		FROM dwh_dim__dates
+		WHERE :full_refresh
+		UNION
+		SELECT CAST(strftime('%Y%m%d', json_extract(row_key, '$[0]')) AS INTEGER)
+		FROM meta_changelog
+		WHERE NOT :full_refresh
+			AND table_name = 'stg_revenues_per_day'
+			AND changed_date >= :since
+		UNION
+		-- every date of the titles mapped again
+		SELECT CAST(strftime('%Y%m%d', stg_revenues.DATE) AS INTEGER)
+		FROM meta_changelog c
+		JOIN dwh_map__titles titles ON titles.id = c.row_key
+		JOIN stg_revenues_per_day stg_revenues ON stg_revenues.title = titles.title
+		WHERE NOT :full_refresh
+			AND c.table_name = 'dwh_map__titles'
+			AND c.changed_date >= :since
+		)
+	AND dwh_fact__revenues.date_id >= CAST(strftime('%Y%m%d', :partition_start) AS INTEGER)
+	AND dwh_fact__revenues.date_id < CAST(strftime('%Y%m%d', :partition_end) AS INTEGER)
+	AND NOT EXISTS (
+		SELECT 1
+		FROM dwh_dim__movies dim_movies
+		JOIN dwh_map__titles titles ON titles.imdb_id = dim_movies.imdb_id
+		JOIN dwh_dim__dates dates ON dates.id = dwh_fact__revenues.date_id
+		JOIN stg_revenues_per_day stg_revenues ON stg_revenues.DATE = dates.value
+			AND stg_revenues.title = titles.title
+		WHERE dim_movies.id = dwh_fact__revenues.movie_id
+		);
@@ -0,0 +1,29 @@
+SELECT DISTINCT substr(stg_revenues.DATE, 1, :key_length) AS partition_key
+FROM stg_revenues_per_day stg_revenues
+LEFT JOIN dwh_map__titles titles ON stg_revenues.title = titles.title
+LEFT JOIN dwh_dim__movies dim_movies ON titles.imdb_id = dim_movies.imdb_id
+-- the dates not in the YYYY-MM-DD format have no partition (nor facts)
+WHERE date(stg_revenues.DATE) IS NOT NULL
+	AND (
+		:full_refresh
+		OR (stg_revenues.DATE, stg_revenues.title) IN (
+			SELECT json_extract(row_key, '$[0]')
+				,json_extract(row_key, '$[1]')
+			FROM meta_changelog
+			WHERE table_name = 'stg_revenues_per_day'
+				AND changed_date >= :since
+			)
+		OR titles.id IN (
+			SELECT row_key
+			FROM meta_changelog
+			WHERE table_name = 'dwh_map__titles'
+				AND changed_date >= :since
+			)
+		OR dim_movies.id IN (
+			SELECT row_key
+			FROM meta_changelog
+			WHERE table_name = 'dwh_dim__movies'
+				AND changed_date >= :since
+			)
+		)
+ORDER BY partition_key;
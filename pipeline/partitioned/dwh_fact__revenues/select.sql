@@ -0,0 +1,36 @@
+SELECT dim_movies.id AS movie_id
+	,distributors.id AS distributor_id
+	,dates.id AS date_id
+	,revenue
+	,theaters AS theaters_number
+FROM stg_revenues_per_day stg_revenues
+LEFT JOIN dwh_map__titles titles ON stg_revenues.title = titles.title
+LEFT JOIN dwh_dim__movies dim_movies ON titles.imdb_id = dim_movies.imdb_id
+LEFT JOIN dwh_dim__dates dates ON dates.id = CAST(strftime('%Y%m%d', stg_revenues.DATE) AS INTEGER)
+LEFT JOIN dwh_dim__distributors distributors ON stg_revenues.distributor = distributors.NAME
+WHERE stg_revenues.DATE >= :partition_start
+	AND stg_revenues.DATE < :partition_end
+	AND dim_movies.id IS NOT NULL
+	AND dates.id IS NOT NULL
+	AND (
+		:full_refresh
+		OR (stg_revenues.DATE, stg_revenues.title) IN (
+			SELECT json_extract(row_key, '$[0]')
+				,json_extract(row_key, '$[1]')
+			FROM meta_changelog
+			WHERE table_name = 'stg_revenues_per_day'
+				AND changed_date >= :since
+			)
+		OR titles.id IN (
+			SELECT row_key
+			FROM meta_changelog
+			WHERE table_name = 'dwh_map__titles'
+				AND changed_date >= :since
+			)
+		OR dim_movies.id IN (
+			SELECT row_key
+			FROM meta_changelog
+			WHERE table_name = 'dwh_dim__movies'
+				AND changed_date >= :since
+			)
+		);
@@ -0,0 +1,21 @@
+INSERT INTO dwh_fact__revenues (
+	movie_id
+	,distributor_id
+	,date_id
+	,revenue
+	,theaters_number
+	)
+VALUES (
+	:movie_id
+	,:distributor_id
+	,:date_id
+	,:revenue
+	,:theaters_number
+	)
+ON CONFLICT(movie_id, date_id) DO UPDATE
+SET distributor_id = excluded.distributor_id
+	,revenue = excluded.revenue
+	,theaters_number = excluded.theaters_number
+	,modified_date = CURRENT_TIMESTAMP
+WHERE revenue != excluded.revenue
+	OR theaters_number != excluded.theaters_number;
@@ -0,0 +1,228 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+from sqlalchemy import text, Engine
+from sqlalchemy.orm import Session
+from sqlmodel import create_engine
+
+from models.schemas.meta.partitions import METAPartition
+from pipeline import State
+from pipeline.change_tracking import get_changes_params, log_changes, prune_changelog
+from pipeline.data_version import bump_data_version
+from pipeline.instrumentation import count_rows, step
+from pipeline.transformation import _split_statements
+from pipeline.watermarks import INITIAL_WATERMARK, get_current_timestamp, get_watermark, set_watermark
+
+PARTITION_KEY_LENGTHS = {'month': 7, 'year': 4}
+PENDING = 'PENDING'
+DONE = 'DONE'
+
+_worker_engine: Engine | None = None
+
+
+def populate_partitioned(target: str,
+                         engine: Engine,
+                         incremental: bool = False,
+                         granularity: str = 'month',
+                         max_workers: int = 4,
+                         busy_timeout_s: float = 600) -> State:
+    """
+    Populates a DWH table partition by partition of the source date (month or year).
+
+    The SQL files are located in `./pipeline/partitioned/{target}/`: `partitions.sql` lists the
+    partition keys with changed rows, `select.sql` computes the rows of one partition (between
+    `:partition_start` and `:partition_end`), `delete.sql` deletes its rows without a source row anymore
+    and `upsert.sql` writes them. The partitions are computed in
+    parallel by `max_workers` worker processes, each with its own read-only connection. Every partition
+    is written in its own transaction, together with its `DONE` state in `meta_partitions`, so the
+    writer lock is held only for one partition at a time and progress is printed per partition.
+
+    If a run fails, the next run of the target resumes it: the partitions already written are skipped,
+    and the `:since` of the failed run is reused. The high-water mark (like in `populate_using_sql`) is
+    set and the changed rows of all the partitions are appended to the change log only when all the
+    partitions are written.
+
+    :param target: The name of the target table and of the SQL files directory, e.g. `dwh_fact__revenues`.
+    :type target: str
+    :param engine: A SQLAlchemy engine connected to a SQLite database file.
+    :type engine: Engine
+    :param incremental: Process only staging rows modified since the last successful run.
+    :type incremental: bool
+    :param granularity: `month` or `year`.
+    :type granularity: str
+    :param max_workers: Number of worker processes computing the partitions.
+    :type max_workers: int
+    :param busy_timeout_s: Seconds the workers wait for the SQLite lock.
+    :type busy_timeout_s: float
+
+    :return: Returns `State.SUCCESS` if all the partitions are written.
+    :rtype: State
+
+    :raises ValueError: If the granularity is not known or the database is in memory.
+    :raises FileNotFoundError: If any of the SQL files cannot be found or opened.
+    :raises SQLAlchemyError: If there is an error executing the SQL queries. The partitions written
+     before the error are kept.
+    """
+    if granularity not in PARTITION_KEY_LENGTHS:
+        raise ValueError(f"Granularity '{granularity}' not known, use one of {tuple(PARTITION_KEY_LENGTHS)}")
+    if not engine.url.database or engine.url.database == ':memory:':
+        raise ValueError("Partitioned load needs a database file shared with the worker processes")
+
+    directory = f"./pipeline/partitioned/{target}"
+    queries: dict[str, str] = {}
+    for name in ('partitions', 'select', 'delete', 'upsert'):
+        with open(f'{directory}/{name}.sql', 'r') as file:
+            queries[name] = file.read()
+
+    with step(f"populate_partitioned({target})"):
+        since, run_start, partitions = _start_or_resume(target, engine, incremental, granularity, queries['partitions'])
+        print(f"[{target}] {len(partitions)} partitions by {granularity} to load (since {since})")
+
+        done_number = 0
+        partitions_iter = iter(partitions)
+        pending: dict[Future, tuple[str, float]] = {}
+        # spawned, not forked: the flow runs the tasks in threads and a forked worker could inherit a held lock
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker,
+                                 initargs=(engine.url.render_as_string(hide_password=False), busy_timeout_s)) as executor:
+            while True:
+                # a few partitions ahead of the writer, so the computed rows don't pile up in memory
+                while len(pending) < 2 * max_workers:
+                    partition_key = next(partitions_iter, None)
+                    if partition_key is None:
+                        break
+                    start, end = _partition_range(partition_key, granularity)
+                    params = dict(get_changes_params(since), partition_start=start, partition_end=end)
+                    pending[executor.submit(_compute_partition, queries['select'], params)] = \
+                        (partition_key, params, time.perf_counter())
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                try:
+                    for future in done:
+                        partition_key, params, partition_start = pending.pop(future)
+                        rows = future.result()
+                        written = _write_partition(target, engine, queries, partition_key, params, rows)
+                        count_rows(read=len(rows), written=written)
+                        done_number += 1
+                        print(f"[{target}] partition {partition_key}: {len(rows)} rows in "
+                              f"{time.perf_counter() - partition_start:.2f}s ({done_number}/{len(partitions)})")
+                except Exception:
+                    # the written partitions are kept for the resume, the not started ones are dropped
+                    executor.shutdown(cancel_futures=True)
+                    raise
+
+        _finish(target, engine, run_start)
+
+    return State.SUCCESS
+
+
+def _start_or_resume(target: str,
+                     engine: Engine,
+                     incremental: bool,
+                     granularity: str,
+                     partitions_query: str) -> tuple[str, str, list[str]]:
+    with Session(engine) as session:
+        try:
+            resumed = session.execute(text(f"""
+                SELECT partition_key, since, run_start, state
+                FROM {METAPartition.__tablename__}
+                WHERE target = :target
+                ORDER BY partition_key;
+            """), {"target": target}).fetchall()
+            if resumed:
+                since, run_start = resumed[0].since, resumed[0].run_start
+                partitions = [row.partition_key for row in resumed if row.state != DONE]
+                print(f"[{target}] resuming the run started at {run_start}, "
+                      f"{len(resumed) - len(partitions)} partitions already done")
+                return since, run_start, partitions
+
+            since = get_watermark(session, target) if incremental else INITIAL_WATERMARK
+            run_start = get_current_timestamp(session)
+            partitions = list(session.execute(text(partitions_query),
+                                              dict(get_changes_params(since),
+                                                   key_length=PARTITION_KEY_LENGTHS[granularity])).scalars())
+            if partitions:
+                session.execute(text(f"""
+                    INSERT INTO {METAPartition.__tablename__} (target, partition_key, since, run_start, state)
+                    VALUES (:target, :partition_key, :since, :run_start, :state);
+                """), [dict(target=target, partition_key=partition_key, since=since, run_start=run_start,
+                            state=PENDING)
+                       for partition_key in partitions])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    return since, run_start, partitions
+
+
+def _write_partition(target: str,
+                     engine: Engine,
+                     queries: dict[str, str],
+                     partition_key: str,
+                     params: dict,
+                     rows: list[dict]) -> int:
+    with Session(engine) as session:
+        try:
+            session.execute(text("PRAGMA foreign_keys = ON;"))
+            written = sum(session.execute(text(statement), params).rowcount
+                          for statement in _split_statements(queries['delete']))
+            written += session.execute(text(queries['upsert']), rows).rowcount if rows else 0
+            session.execute(text(f"""
+                UPDATE {METAPartition.__tablename__}
+                SET state = :state
+                    ,rows_number = :rows_number
+                    ,modified_date = CURRENT_TIMESTAMP
+                WHERE target = :target AND partition_key = :partition_key;
+            """), dict(state=DONE, rows_number=len(rows), target=target, partition_key=partition_key))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    return written
+
+
+def _finish(target: str, engine: Engine, run_start: str):
+    with Session(engine) as session:
+        try:
+            log_changes(session.connection().connection.dbapi_connection, target, run_start)
+            set_watermark(session, target, run_start)
+            prune_changelog(session)
+            session.execute(text(f"DELETE FROM {METAPartition.__tablename__} WHERE target = :target;"),
+                            {"target": target})
+            bump_data_version(session)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+def _partition_range(partition_key: str, granularity: str) -> tuple[str, str]:
+    if granularity == 'year':
+        return f"{partition_key}-01-01", f"{int(partition_key) + 1}-01-01"
+    year, month = map(int, partition_key.split('-'))
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{partition_key}-01", f"{year:04d}-{month:02d}-01"
+
+
+def _init_worker(database_url: str, busy_timeout_s: float):
+    global _worker_engine
+    _worker_engine = create_engine(database_url, echo=False, connect_args=dict(timeout=busy_timeout_s))
+
+
+def _compute_partition(select_query: str, params: dict) -> list[dict]:
+    with Session(_worker_engine) as session:
+        try:
+            return [dict(row) for row in session.execute(text(select_query), params).mappings()]
+        finally:
+            session.close()
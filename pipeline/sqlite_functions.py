@@ -0,0 +1,115 @@
+import re
+import sqlite3
+import unicodedata
+from datetime import date, timedelta
+from functools import lru_cache
+
+MONTHS = dict(Jan='01', Feb='02', Mar='03', Apr='04', May='05', Jun='06',
+              Jul='07', Aug='08', Sep='09', Oct='10', Nov='11', Dec='12')
+_ISO_DATE = re.compile(r'[0-9]{4}-[0-9]{2}-(0[1-9]|[12][0-9]|3[01])')
+_NOT_ALPHANUMERIC = re.compile(r'[^0-9a-z]+')
+# letters which don't decompose into a base letter and a diacritic
+_LETTERS = str.maketrans({'ł': 'l', 'đ': 'd', 'ø': 'o', 'ß': 'ss', 'æ': 'ae', 'œ': 'oe'})
+_ARTICLES = frozenset({'the', 'a', 'an'})
+
+
+@lru_cache(maxsize=None)
+def omdb_date(value: str | None) -> str | None:
+    """
+    Converts an OMDb date (`DD MMM YYYY`, e.g. `07 Jul 2006`) into `YYYY-MM-DD`.
+
+    Returns the same results as the former `strftime('%Y-%m-%d', ...)` over the CASE-month ladder,
+    i.e. None for `N/A` and any other value which doesn't form a valid date. Each distinct value is
+    parsed only once per process.
+    """
+    if not isinstance(value, str):
+        return None
+    month = MONTHS.get(value[3:6])
+    if month is None:
+        return None
+    candidate = f"{value[7:11]}-{month}-{value[0:2]}"
+    return candidate if _ISO_DATE.fullmatch(candidate) else None
+
+
+@lru_cache(maxsize=None)
+def normalize_title(value: str | None) -> str | None:
+    """
+    Title matching key: case folded, without diacritics, punctuation and a leading article, `&` as `and`,
+    e.g. `The Lord of the Rings: The Two Towers` -> `lord of the rings the two towers`.
+    """
+    if not isinstance(value, str):
+        return None
+    value = ''.join(char for char in unicodedata.normalize('NFKD', value.casefold())
+                    if not unicodedata.combining(char))
+    words = _NOT_ALPHANUMERIC.sub(' ', value.translate(_LETTERS).replace('&', ' and ')).split()
+    if len(words) > 1 and words[0] in _ARTICLES:
+        words = words[1:]
+    return ' '.join(words)
+
+
+@lru_cache(maxsize=100_000)
+def trigrams(normalized_title: str) -> frozenset[str]:
+    padded = f"  {normalized_title} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def title_similarity(first: str | None, second: str | None) -> float | None:
+    """
+    Dice coefficient of the trigrams of the normalized titles, from 0 (nothing in common) to 1 (same key).
+    """
+    first, second = normalize_title(first), normalize_title(second)
+    if first is None or second is None:
+        return None
+    if first == second:
+        return 1.0
+    first_trigrams, second_trigrams = trigrams(first), trigrams(second)
+    return 2 * len(first_trigrams & second_trigrams) / (len(first_trigrams) + len(second_trigrams))
+
+
+@lru_cache(maxsize=None)
+def holidays(year: int) -> frozenset[str]:
+    """
+    The US federal holidays of the year (`YYYY-MM-DD`), the box office calendar of the revenues, by the
+    current rules (Martin Luther King Jr. Day since 1986, Juneteenth since 2021). Not the observed days.
+    """
+    def weekday_of_month(month: int, weekday: int, number: int) -> date:
+        # the `number`th (from 1, or -1 for the last) `weekday` (0 is Monday) of the month
+        if number > 0:
+            first = date(year, month, 1)
+            return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (number - 1))
+        last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+        return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+    days = [date(year, 1, 1),
+            weekday_of_month(2, 0, 3),  # Washington's Birthday
+            weekday_of_month(5, 0, -1),  # Memorial Day
+            date(year, 7, 4),
+            weekday_of_month(9, 0, 1),  # Labor Day
+            weekday_of_month(10, 0, 2),  # Columbus Day
+            date(year, 11, 11),
+            weekday_of_month(11, 3, 4),  # Thanksgiving Day
+            date(year, 12, 25)]
+    if year >= 1986:
+        days.append(weekday_of_month(1, 0, 3))  # Martin Luther King Jr. Day
+    if year >= 2021:
+        days.append(date(year, 6, 19))
+    return frozenset(day.isoformat() for day in days)
+
+
+def is_holiday(value: str | None) -> int | None:
+    """
+    1 if the `YYYY-MM-DD` date is a holiday (see `holidays`), 0 if not, None for NULL.
+    """
+    if not isinstance(value, str):
+        return None
+    return int(value[:10] in holidays(int(value[:4])))
+
+
+def register_sqlite_functions(dbapi_connection: sqlite3.Connection):
+    """
+    Registers the pipeline's functions on a raw SQLite connection, so they can be used in the SQL files.
+    """
+    dbapi_connection.create_function('omdb_date', 1, omdb_date, deterministic=True)
+    dbapi_connection.create_function('normalize_title', 1, normalize_title, deterministic=True)
+    dbapi_connection.create_function('title_similarity', 2, title_similarity, deterministic=True)
+    dbapi_connection.create_function('is_holiday', 1, is_holiday, deterministic=True)
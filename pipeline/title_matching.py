@@ -0,0 +1,186 @@
+import math
+import re
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy import text, Engine
+from sqlalchemy.orm import Session
+
+from models.definitions.objects import IMDbId, Title, TitleMatch
+from models.schemas.dwh.titles_map import DWHTitleMap
+from models.schemas.meta.fetch_checkpoints import METAFetchCheckpoint
+from pipeline import State
+from pipeline.change_tracking import log_changes
+from pipeline.data_version import bump_data_version
+from pipeline.instrumentation import count_rows, step
+from pipeline.sqlite_functions import normalize_title, trigrams
+from pipeline.transformation import populate_using_sql
+from pipeline.watermarks import get_current_timestamp
+
+_NUMBERS = re.compile(r'\b(?:[0-9]+|i{1,3}|iv|vi{0,3}|ix|x)\b')
+
+
+class TrigramIndex:
+    """
+    Inverted index of the trigrams of normalized titles, for approximate title lookups.
+
+    `best_match` scores only the entries sharing one of the rarest trigrams of the searched title, by
+    the Dice coefficient of the trigram sets (the same measure as the `title_similarity` SQL function).
+    """
+
+    def __init__(self, entries: Iterable[tuple[str, IMDbId]]):
+        self._keys: list[tuple[str, IMDbId]] = []
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        for normalized_title, imdb_id in dict.fromkeys(entries):
+            position = len(self._keys)
+            self._keys.append((normalized_title, imdb_id))
+            for trigram in trigrams(normalized_title):
+                self._postings[trigram].append(position)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def best_match(self, normalized_title: str, min_similarity: float, min_margin: float = 0.05) \
+            -> tuple[IMDbId, float] | None:
+        """
+        :return: The movie of the most similar entry and the similarity, or None if no entry reaches
+         `min_similarity`, if another movie is within `min_margin` of the best one, or if the numbers
+         in the titles (e.g. of sequels) differ.
+        :rtype: tuple[IMDbId, float] | None
+        """
+        threshold = max(min_similarity - min_margin, 0.0)
+        searched = trigrams(normalized_title)
+        # an entry with a Dice coefficient >= threshold shares at least this many trigrams with the searched
+        # title, so it shares one of the rarest `len - min_shared + 1` of them (prefix filtering)
+        min_shared = math.ceil(threshold * len(searched) / (2 - threshold))
+        rarest = sorted(searched, key=lambda trigram: len(self._postings.get(trigram, ())))
+        candidates = {position
+                      for trigram in rarest[:len(rarest) - min_shared + 1]
+                      for position in self._postings.get(trigram, ())}
+
+        scores: dict[IMDbId, float] = {}
+        numbers = _NUMBERS.findall(normalized_title)
+        for position in candidates:
+            candidate, imdb_id = self._keys[position]
+            candidate_trigrams = trigrams(candidate)
+            similarity = 2 * len(searched & candidate_trigrams) / (len(searched) + len(candidate_trigrams))
+            if similarity >= threshold and _NUMBERS.findall(candidate) == numbers:
+                scores[imdb_id] = max(similarity, scores.get(imdb_id, 0.0))
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] < min_similarity:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < min_margin:
+            return None
+        return ranked[0]
+
+
+def _report_titles_without_movie(session: Session) -> None:
+    """
+    Prints the mapped titles whose movie details were never fetched, e.g. a `MANUAL` row pointing to
+    an imdbID no fetched title returned (the titles mapped by hand are not searched). Their revenues are
+    not loaded into `dwh_fact__revenues` until the movie is in `dwh_dim__movies`.
+    """
+    titles = session.execute(text(f"""
+        SELECT m.title
+        FROM {DWHTitleMap.__tablename__} m
+        LEFT JOIN stg_movies_details d ON m.imdb_id = d.imdb_id
+        WHERE d.imdb_id IS NULL
+        ORDER BY m.title;
+    """)).scalars().all()
+    if titles:
+        print(f"Titles skipped: {len(titles)} mapped titles have no fetched movie details, "
+              f"their revenues are not loaded (e.g. {', '.join(titles[:5])})")
+
+
+def resolve_titles(engine: Engine, incremental: bool = False, min_similarity: float = 0.85) -> State:
+    """
+    Maps the revenues CSV titles to OMDb movies (`dwh_map__titles`), which the fact table is joined through.
+
+    The titles are resolved in passes, each only for the titles not mapped yet:
+
+    - `EXACT` / `API`: the movie the API returned for the title, `EXACT` if both titles have the same
+      normalized key (`normalize_title`), `API` with their similarity otherwise.
+    - `NORMALIZED`: a title with the same normalized key as a known movie title or a mapped title
+      (e.g. `Sarnie Żniwo` and `Sarnie zniwo`), if the key belongs to one movie only.
+    - `FUZZY`: the most similar known title by the trigram index, with at least `min_similarity` and
+      the same numbers in both titles.
+
+    The first two are executed from `./pipeline/transformation/dwh_map__titles.sql` by `populate_using_sql`.
+    The last two map only the titles the API did not find (a `NOT_FOUND` checkpoint), as the key drops
+    a leading article and punctuation: `The Batman` is never merged with a known `Batman` before the API
+    is asked for it. They do not stop `fetch_movies_details` from searching the title again once its
+    checkpoint expires, and an API answer then replaces them. Rows with the `MANUAL` method
+    (corrections inserted by hand) are never overwritten. The `NORMALIZED` rows and the `API` and `FUZZY`
+    rows with the lowest similarity are the ones to review.
+
+    :param engine: A SQLAlchemy engine used to connect to the database.
+    :type engine: Engine
+    :param incremental: Map the titles of the movies fetched since the last successful run only.
+    :type incremental: bool
+    :param min_similarity: The lowest similarity of a `FUZZY` match.
+    :type min_similarity: float
+
+    :return: Returns `State.SUCCESS` if the mapping is successful.
+    :rtype: State
+
+    :raises FileNotFoundError: If the SQL file cannot be found or opened.
+    :raises SQLAlchemyError: If there is an error executing the SQL queries.
+    """
+    populate_using_sql(f"{DWHTitleMap.__tablename__}.sql", engine, incremental=incremental)
+
+    with step("resolve_titles_fuzzy"), Session(engine) as session:
+        try:
+            run_start = get_current_timestamp(session)
+            unresolved: list[Title] = list(session.execute(text(f"""
+                SELECT DISTINCT r.title
+                FROM stg_revenues_per_day r
+                JOIN {METAFetchCheckpoint.__tablename__} c ON r.title = c.title
+                    AND c.state = 'NOT_FOUND'
+                LEFT JOIN {DWHTitleMap.__tablename__} m ON r.title = m.title
+                WHERE m.title IS NULL;
+            """)).scalars())
+            count_rows(read=len(unresolved))
+            if not unresolved:
+                _report_titles_without_movie(session)
+                return State.SUCCESS
+
+            known = session.execute(text(f"""
+                SELECT omdb_title
+                    ,imdb_id
+                FROM stg_movies_details
+                WHERE imdb_id IS NOT NULL
+                UNION
+                SELECT title
+                    ,imdb_id
+                FROM {DWHTitleMap.__tablename__}
+                WHERE method IN ('{TitleMatch.EXACT.value}', '{TitleMatch.API.value}', '{TitleMatch.MANUAL.value}');
+            """)).fetchall()
+            index = TrigramIndex((normalize_title(title), imdb_id) for title, imdb_id in known if title)
+
+            matches = []
+            for title in unresolved:
+                match = index.best_match(normalize_title(title), min_similarity) if title else None
+                if match:
+                    matches.append(dict(title=title, normalized_title=normalize_title(title), imdb_id=match[0],
+                                        method=TitleMatch.FUZZY.value, similarity=round(match[1], 4)))
+            if matches:
+                session.execute(text(f"""
+                    INSERT INTO {DWHTitleMap.__tablename__} (title, normalized_title, imdb_id, method, similarity)
+                    VALUES (:title, :normalized_title, :imdb_id, :method, :similarity)
+                    ON CONFLICT(title) DO NOTHING;
+                """), matches)
+                count_rows(written=len(matches))
+                log_changes(session.connection().connection.dbapi_connection, DWHTitleMap.__tablename__, run_start)
+                bump_data_version(session)
+            session.commit()
+            _report_titles_without_movie(session)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    print(f"Titles resolved: {len(matches)} of {len(unresolved)} unmatched titles by trigram similarity "
+          f"against {len(index)} known titles")
+    return State.SUCCESS
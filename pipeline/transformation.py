@@ -1,25 +1,45 @@
+import sqlite3
+
 from sqlalchemy import text, Engine
 from sqlalchemy.orm import Session
 
 from pipeline import State
+from pipeline.change_tracking import get_changes_params, log_changes, prune_changelog
+from pipeline.data_version import bump_data_version
+from pipeline.instrumentation import count_rows, explain_query_plan, step
+from pipeline.sqlite_functions import register_sqlite_functions
+from pipeline.watermarks import INITIAL_WATERMARK, get_current_timestamp, get_watermark, set_watermark
 
 
 class SQLFilename(str):
     pass
 
 
-def populate_using_sql(filename: SQLFilename, engine: Engine) -> State:
+def populate_using_sql(filename: SQLFilename, engine: Engine, incremental: bool = False) -> State:
     """
     Executes an SQL query from a file and applies the changes to a database.
 
     This function reads an SQL query from a file located in the
     `./pipeline/transformation/` directory, executes the query within a session
     using the provided SQLAlchemy engine, and ensures that foreign key constraints
-    are enforced during the execution. If the query is successful, it commits
+    are enforced during the execution. The functions from `pipeline.sqlite_functions`
+    (e.g. `omdb_date`) are registered on the connection before the execution. If the query is successful, it commits
     the transaction, otherwise it rolls back any changes and raises the exception.
+    The data version is bumped in the same transaction, which invalidates the cached dashboard results.
+
+    Every statement takes the `:since` and `:full_refresh` parameters and processes only the source
+    rows whose keys are in the change log since `:since` (see `pipeline.change_tracking`). In
+    incremental mode `:since` is the high-water mark recorded for the file by its last successful run,
+    otherwise (or on the first run) `:full_refresh` is true and all rows are processed. Each successful
+    run records its start time as the new high-water mark (`meta_watermarks` table), appends the keys
+    of the rows it changed to the change log of the target table and prunes the entries no target reads.
+    A file may hold several statements (e.g. a bridge table refresh that deletes and inserts), they
+    are executed in order.
 
     :param filename: The name of the SQL file (excluding the path) that contains the SQL query.
     :type filename: SQLFilename
+    :param incremental: Process only staging rows modified since the last successful run.
+    :type incremental: bool
     :param engine: A SQLAlchemy engine used to connect to the database.
     :type engine: Engine
 
@@ -38,10 +58,23 @@ def populate_using_sql(filename: SQLFilename, engine: Engine) -> State:
     except FileNotFoundError:
         raise
 
-    with Session(engine) as session:
+    target = filename.removesuffix('.sql')
+
+    with step(f"populate_using_sql({filename})"), Session(engine) as session:
         try:
             session.execute(text("PRAGMA foreign_keys = ON;"))
-            session.execute(text(sql_query))
+            dbapi_connection = session.connection().connection.dbapi_connection
+            register_sqlite_functions(dbapi_connection)
+            since = get_watermark(session, target) if incremental else INITIAL_WATERMARK
+            params = get_changes_params(since)
+            run_start = get_current_timestamp(session)
+            for statement_no, statement in enumerate(_split_statements(sql_query), start=1):
+                explain_query_plan(session, f"{filename}#{statement_no}", statement, params)
+                count_rows(written=session.execute(text(statement), params).rowcount)
+            log_changes(dbapi_connection, target, run_start)
+            set_watermark(session, target, run_start)
+            prune_changelog(session)
+            bump_data_version(session)
             session.commit()
         except Exception:
             session.rollback()
@@ -50,3 +83,21 @@ def populate_using_sql(filename: SQLFilename, engine: Engine) -> State:
             session.close()
 
     return State.SUCCESS
+
+
+def _split_statements(sql_query: str) -> list[str]:
+    """
+    Splits the file content into complete SQL statements (semicolons in literals are respected).
+    """
+    statements, statement = [], ''
+    for part in sql_query.split(';'):
+        statement += part + ';'
+        if sqlite3.complete_statement(statement):
+            if _has_code(statement):
+                statements.append(statement.strip())
+            statement = ''
+    return statements
+
+
+def _has_code(statement: str) -> bool:
+    return any(line.strip(' \t;') and not line.strip().startswith('--') for line in statement.splitlines())
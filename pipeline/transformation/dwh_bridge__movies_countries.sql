@@ -0,0 +1,26 @@
+DELETE
+FROM dwh_bridge__movies_countries
+WHERE :full_refresh
+	OR movie_id IN (
+		SELECT row_key
+		FROM meta_changelog
+		WHERE table_name = 'dwh_dim__movies'
+			AND changed_date >= :since
+		);
+
+INSERT INTO dwh_bridge__movies_countries (
+	movie_id
+	,country_id
+	)
+SELECT DISTINCT m.id AS movie_id
+	,c.id AS country_id
+FROM dwh_dim__movies m
+	,json_each(m.countries)
+JOIN dwh_dim__countries c ON json_each.value = c.name
+WHERE :full_refresh
+	OR m.id IN (
+		SELECT row_key
+		FROM meta_changelog
+		WHERE table_name = 'dwh_dim__movies'
+			AND changed_date >= :since
+		) ON CONFLICT(movie_id, country_id) DO NOTHING;
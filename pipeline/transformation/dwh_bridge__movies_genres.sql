@@ -0,0 +1,26 @@
+DELETE
+FROM dwh_bridge__movies_genres
+WHERE :full_refresh
+	OR movie_id IN (
+		SELECT row_key
+		FROM meta_changelog
+		WHERE table_name = 'dwh_dim__movies'
+			AND changed_date >= :since
+		);
+
+INSERT INTO dwh_bridge__movies_genres (
+	movie_id
+	,genre_id
+	)
+SELECT DISTINCT m.id AS movie_id
+	,g.id AS genre_id
+FROM dwh_dim__movies m
+	,json_each(m.genre)
+JOIN dwh_dim__genres g ON json_each.value = g.name
+WHERE :full_refresh
+	OR m.id IN (
+		SELECT row_key
+		FROM meta_changelog
+		WHERE table_name = 'dwh_dim__movies'
+			AND changed_date >= :since
+		) ON CONFLICT(movie_id, genre_id) DO NOTHING;
@@ -0,0 +1,50 @@
+DELETE
+FROM dwh_bridge__movies_people
+WHERE :full_refresh
+	OR movie_id IN (
+		SELECT row_key
+		FROM meta_changelog
+		WHERE table_name = 'dwh_dim__movies'
+			AND changed_date >= :since
+		);
+
+WITH changed_movies AS (
+	SELECT *
+	FROM dwh_dim__movies
+	WHERE :full_refresh
+		OR id IN (
+			SELECT row_key
+			FROM meta_changelog
+			WHERE table_name = 'dwh_dim__movies'
+				AND changed_date >= :since
+			)
+	)
+INSERT INTO dwh_bridge__movies_people (
+	movie_id
+	,person_id
+	,role
+	)
+SELECT a.movie_id
+	,p.id AS person_id
+	,a.role
+FROM (
+	SELECT m.id AS movie_id
+		,json_each.value AS name
+		,'DIRECTOR' AS role
+	FROM changed_movies m
+		,json_each(m.directors)
+	UNION
+	SELECT m.id AS movie_id
+		,json_each.value AS name
+		,'WRITER' AS role
+	FROM changed_movies m
+		,json_each(m.writers)
+	UNION
+	SELECT m.id AS movie_id
+		,json_each.value AS name
+		,'ACTOR' AS role
+	FROM changed_movies m
+		,json_each(m.actors)
+	) a
+JOIN dwh_dim__people p ON a.name = p.name
+WHERE 1 ON CONFLICT(movie_id, person_id, role) DO NOTHING;
@@ -1,79 +1,91 @@
-INSERT INTO dwh_dim__dates (value)
-SELECT a.value
-FROM (
-	SELECT DISTINCT "date" AS value
-	FROM stg_revenues_per_day
-	UNION
-	SELECT DISTINCT strftime('%Y-%m-%d', substr(json_extract(response, '$.Released'), 8, 4) || '-' || CASE substr(json_extract(response, '$.Released'), 4, 3)
-				WHEN 'Jan'
-					THEN '01'
-				WHEN 'Feb'
-					THEN '02'
-				WHEN 'Mar'
-					THEN '03'
-				WHEN 'Apr'
-					THEN '04'
-				WHEN 'May'
-					THEN '05'
-				WHEN 'Jun'
-					THEN '06'
-				WHEN 'Jul'
-					THEN '07'
-				WHEN 'Aug'
-					THEN '08'
-				WHEN 'Sep'
-					THEN '09'
-				WHEN 'Oct'
-					THEN '10'
-				WHEN 'Nov'
-					THEN '11'
-				WHEN 'Dec'
-					THEN '12'
-				END || '-' || substr(json_extract(response, '$.Released'), 1, 2)) AS value
-	FROM stg_movies_details
-	UNION
-	SELECT strftime('%Y-%m-%d', substr(json_extract(response, '$.DVD'), 8, 4) || '-' || CASE substr(json_extract(response, '$.DVD'), 4, 3)
-				WHEN 'Jan'
-					THEN '01'
-				WHEN 'Feb'
-					THEN '02'
-				WHEN 'Mar'
-					THEN '03'
-				WHEN 'Apr'
-					THEN '04'
-				WHEN 'May'
-					THEN '05'
-				WHEN 'Jun'
-					THEN '06'
-				WHEN 'Jul'
-					THEN '07'
-				WHEN 'Aug'
-					THEN '08'
-				WHEN 'Sep'
-					THEN '09'
-				WHEN 'Oct'
-					THEN '10'
-				WHEN 'Nov'
-					THEN '11'
-				WHEN 'Dec'
-					THEN '12'
-				END || '-' || substr(json_extract(response, '$.DVD'), 1, 2)) AS value
+WITH RECURSIVE changed_movies_details AS (
+	SELECT *
 	FROM stg_movies_details
-    UNION
-    SELECT
-        CASE
-            WHEN substr(json_extract(response, '$.Year'), 1, 4)
-                THEN substr(json_extract(response, '$.Year'), 1, 4) || '-01-01'
-            ELSE NULL
-            END AS value
-	FROM stg_movies_details
-    UNION
-    SELECT
-        CASE
-            WHEN substr(json_extract(response, '$.Year'), 6, 4)
-                THEN substr(json_extract(response, '$.Year'), 6, 4) || '-01-01'
-            ELSE NULL
-            END value
-    FROM stg_movies_details
-	) a
-WHERE value IS NOT NULL ON CONFLICT(value) DO NOTHING;
+	WHERE :full_refresh
+		OR title IN (
+			SELECT row_key
+			FROM meta_changelog
+			WHERE table_name = 'stg_movies_details'
+				AND changed_date >= :since
+			)
+	)
+	,source_dates AS (
+	SELECT MIN("date") AS first_value
+		,MAX("date") AS last_value
+	FROM stg_revenues_per_day
+	WHERE :full_refresh
+		AND date("date") IS NOT NULL
+	UNION ALL
+	-- the changed rows looked up by their primary key
+	SELECT MIN(stg_revenues."date")
+		,MAX(stg_revenues."date")
+	FROM stg_revenues_per_day stg_revenues
+	WHERE NOT :full_refresh
+		AND (stg_revenues.DATE, stg_revenues.title) IN (
+			SELECT json_extract(row_key, '$[0]')
+				,json_extract(row_key, '$[1]')
+			FROM meta_changelog
+			WHERE table_name = 'stg_revenues_per_day'
+				AND changed_date >= :since
+			)
+		AND date(stg_revenues."date") IS NOT NULL
+	UNION ALL
+	SELECT MIN(value)
+		,MAX(value)
+	FROM (
+		SELECT omdb_date(released) AS value
+		FROM changed_movies_details
+		UNION ALL
+		SELECT omdb_date(dvd)
+		FROM changed_movies_details
+		UNION ALL
+		SELECT substr(year, 1, 4) || '-01-01'
+		FROM changed_movies_details
+		WHERE substr(year, 1, 4)
+		UNION ALL
+		SELECT substr(year, 6, 4) || '-01-01'
+		FROM changed_movies_details
+		WHERE substr(year, 6, 4)
+		) a
+	WHERE date(value) IS NOT NULL
+	UNION ALL
+	SELECT MIN(value)
+		,MAX(value)
+	FROM dwh_dim__dates
+	)
+	,calendar(value, last_value) AS (
+	SELECT date(substr(MIN(first_value), 1, 4) || '-01-01')
+		,date(substr(MAX(last_value), 1, 4) || '-12-31')
+	FROM source_dates
+	HAVING COUNT(first_value) > 0
+	UNION ALL
+	SELECT date(value, '+1 day')
+		,last_value
+	FROM calendar
+	WHERE value < last_value
+	)
+INSERT INTO dwh_dim__dates (
+	id
+	,value
+	,year
+	,quarter
+	,month
+	,iso_year
+	,iso_week
+	,weekday
+	,is_weekend
+	,is_holiday
+	)
+SELECT CAST(strftime('%Y%m%d', value) AS INTEGER) AS id
+	,value
+	,CAST(strftime('%Y', value) AS INTEGER) AS year
+	,(CAST(strftime('%m', value) AS INTEGER) + 2) / 3 AS quarter
+	,CAST(strftime('%m', value) AS INTEGER) AS month
+	-- the ISO week is the week of its Thursday
+	,CAST(strftime('%Y', date(value, '-3 days', 'weekday 4')) AS INTEGER) AS iso_year
+	,(CAST(strftime('%j', date(value, '-3 days', 'weekday 4')) AS INTEGER) - 1) / 7 + 1 AS iso_week
+	,(CAST(strftime('%w', value) AS INTEGER) + 6) % 7 + 1 AS weekday
+	,strftime('%w', value) IN ('0', '6') AS is_weekend
+	,is_holiday(value) AS is_holiday
+FROM calendar
+WHERE 1 ON CONFLICT(id) DO NOTHING;
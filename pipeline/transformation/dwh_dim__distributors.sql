@@ -1,9 +1,21 @@
 INSERT INTO dwh_dim__distributors (name)
-SELECT a.name
+SELECT DISTINCT a.name
 FROM (
-	SELECT DISTINCT distributor AS name
+	SELECT distributor AS name
 	FROM stg_revenues_per_day
-	WHERE distributor IS NOT '-'
-	AND distributor IS NOT NULL
+	WHERE :full_refresh
+	UNION ALL
+	-- the changed rows looked up by their primary key
+	SELECT stg_revenues.distributor
+	FROM stg_revenues_per_day stg_revenues
+	WHERE NOT :full_refresh
+		AND (stg_revenues.DATE, stg_revenues.title) IN (
+			SELECT json_extract(row_key, '$[0]')
+				,json_extract(row_key, '$[1]')
+			FROM meta_changelog
+			WHERE table_name = 'stg_revenues_per_day'
+				AND changed_date >= :since
+			)
 	) a
-WHERE 1 ON CONFLICT(name) DO NOTHING;
+WHERE a.name IS NOT '-'
+	AND a.name IS NOT NULL ON CONFLICT(name) DO NOTHING;
@@ -0,0 +1,11 @@
+INSERT INTO dwh_dim__genres (name)
+SELECT DISTINCT json_each.value AS name
+FROM dwh_dim__movies m
+	,json_each(m.genre)
+WHERE :full_refresh
+	OR m.id IN (
+		SELECT row_key
+		FROM meta_changelog
+		WHERE table_name = 'dwh_dim__movies'
+			AND changed_date >= :since
+		) ON CONFLICT(name) DO NOTHING;
@@ -73,91 +73,48 @@ FROM (
 			ELSE production
 			END AS production
 	FROM (
-		SELECT json_extract(response, '$.Title') title
+		SELECT omdb_title title
 		    ,CASE
-                WHEN substr(json_extract(response, '$.Year'), 1, 4)
-                    THEN substr(json_extract(response, '$.Year'), 1, 4) || '-01-01'
+                WHEN substr(year, 1, 4)
+                    THEN substr(year, 1, 4) || '-01-01'
                 ELSE NULL
                 END start_year_date
             ,CASE
-                WHEN substr(json_extract(response, '$.Year'), 6, 4)
-                    THEN substr(json_extract(response, '$.Year'), 6, 4) || '-01-01'
+                WHEN substr(year, 6, 4)
+                    THEN substr(year, 6, 4) || '-01-01'
                 ELSE NULL
                 END end_year_date
-			,json_extract(response, '$.Rated') rated
-			,strftime('%Y-%m-%d', substr(json_extract(response, '$.Released'), 8, 4) || '-' || CASE substr(json_extract(response, '$.Released'), 4, 3)
-					WHEN 'Jan'
-						THEN '01'
-					WHEN 'Feb'
-						THEN '02'
-					WHEN 'Mar'
-						THEN '03'
-					WHEN 'Apr'
-						THEN '04'
-					WHEN 'May'
-						THEN '05'
-					WHEN 'Jun'
-						THEN '06'
-					WHEN 'Jul'
-						THEN '07'
-					WHEN 'Aug'
-						THEN '08'
-					WHEN 'Sep'
-						THEN '09'
-					WHEN 'Oct'
-						THEN '10'
-					WHEN 'Nov'
-						THEN '11'
-					WHEN 'Dec'
-						THEN '12'
-					END || '-' || substr(json_extract(response, '$.Released'), 1, 2)) AS release_date
-			,json_extract(response, '$.Runtime') runtime
-			,json_extract(response, '$.Genre') genre
-			,json_extract(response, '$.Director') directors
-			,json_extract(response, '$.Writer') writers
-			,json_extract(response, '$.Actors') actors
-			,json_extract(response, '$.Plot') plot
-			,json_extract(response, '$.Language') languages
-			,json_extract(response, '$.Country') countries
-			,json_extract(response, '$.Awards') awards
-			,json_extract(response, '$.Poster') poster
-			,json_extract(response, '$.imdbVotes') imdb_votes
-			,json_extract(response, '$.imdbID') imdb_id
-			,json_extract(response, '$.Type') type_
-			,strftime('%Y-%m-%d', substr(json_extract(response, '$.DVD'), 8, 4) || '-' || CASE substr(json_extract(response, '$.DVD'), 4, 3)
-					WHEN 'Jan'
-						THEN '01'
-					WHEN 'Feb'
-						THEN '02'
-					WHEN 'Mar'
-						THEN '03'
-					WHEN 'Apr'
-						THEN '04'
-					WHEN 'May'
-						THEN '05'
-					WHEN 'Jun'
-						THEN '06'
-					WHEN 'Jul'
-						THEN '07'
-					WHEN 'Aug'
-						THEN '08'
-					WHEN 'Sep'
-						THEN '09'
-					WHEN 'Oct'
-						THEN '10'
-					WHEN 'Nov'
-						THEN '11'
-					WHEN 'Dec'
-						THEN '12'
-					END || '-' || substr(json_extract(response, '$.DVD'), 1, 2)) AS dvd_release_date
-			,json_extract(response, '$.BoxOffice') boxoffice
-			,json_extract(response, '$.Production') production
+			,rated
+			,omdb_date(released) AS release_date
+			,runtime
+			,genre
+			,director directors
+			,writer writers
+			,actors
+			,plot
+			,language languages
+			,country countries
+			,awards
+			,poster
+			,imdb_votes
+			,imdb_id
+			,type type_
+			,omdb_date(dvd) AS dvd_release_date
+			,box_office AS boxoffice
+			,production
 		FROM stg_movies_details
+		WHERE :full_refresh
+			OR title IN (
+				SELECT row_key
+				FROM meta_changelog
+				WHERE table_name = 'stg_movies_details'
+					AND changed_date >= :since
+				)
 		) a
-	LEFT JOIN dwh_dim__dates dates1 ON a.release_date = dates1.value
-	LEFT JOIN dwh_dim__dates dates2 ON a.dvd_release_date = dates2.value
-	LEFT JOIN dwh_dim__dates dates3 ON a.start_year_date = dates3.value
-	LEFT JOIN dwh_dim__dates dates4 ON a.end_year_date = dates4.value
+	LEFT JOIN dwh_dim__dates dates1 ON dates1.id = CAST(strftime('%Y%m%d', a.release_date) AS INTEGER)
+	LEFT JOIN dwh_dim__dates dates2 ON dates2.id = CAST(strftime('%Y%m%d', a.dvd_release_date) AS INTEGER)
+	LEFT JOIN dwh_dim__dates dates3 ON dates3.id = CAST(strftime('%Y%m%d', a.start_year_date) AS INTEGER)
+	LEFT JOIN dwh_dim__dates dates4 ON dates4.id = CAST(strftime('%Y%m%d', a.end_year_date) AS INTEGER)
 	) b
 WHERE 1 ON CONFLICT(imdb_id) DO UPDATE
 SET title = excluded.title
@@ -180,6 +137,7 @@ SET title = excluded.title
 	,dvd_release_date_id = excluded.dvd_release_date_id
 	,boxoffice = excluded.boxoffice
 	,production = excluded.production
+	,modified_date = CURRENT_TIMESTAMP
 WHERE title != excluded.title
 	OR start_year_date_id != excluded.start_year_date_id
 	OR end_year_date_id != excluded.end_year_date_id
@@ -4,6 +4,13 @@ FROM (
 	SELECT DISTINCT json_extract(value, '$.Source') AS name
 	FROM stg_movies_details
 		,json_each(stg_movies_details.response, '$.Ratings')
+	WHERE :full_refresh
+		OR stg_movies_details.title IN (
+			SELECT row_key
+			FROM meta_changelog
+			WHERE table_name = 'stg_movies_details'
+				AND changed_date >= :since
+			)
 	UNION ALL
 	SELECT 'IMDb'
 	) a
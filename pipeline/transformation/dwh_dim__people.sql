@@ -0,0 +1,27 @@
+WITH changed_movies AS (
+	SELECT *
+	FROM dwh_dim__movies
+	WHERE :full_refresh
+		OR id IN (
+			SELECT row_key
+			FROM meta_changelog
+			WHERE table_name = 'dwh_dim__movies'
+				AND changed_date >= :since
+			)
+	)
+INSERT INTO dwh_dim__people (name)
+SELECT a.name
+FROM (
+	SELECT json_each.value AS name
+	FROM changed_movies m
+		,json_each(m.directors)
+	UNION
+	SELECT json_each.value AS name
+	FROM changed_movies m
+		,json_each(m.writers)
+	UNION
+	SELECT json_each.value AS name
+	FROM changed_movies m
+		,json_each(m.actors)
+	) a
+WHERE 1 ON CONFLICT(name) DO NOTHING;
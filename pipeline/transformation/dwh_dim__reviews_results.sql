@@ -22,22 +22,41 @@ FROM (
 			,dim_reviewers.id reviewer_id
 		FROM stg_movies_details stg_md
 			,json_each(stg_md.response, '$.Ratings')
-		LEFT JOIN dwh_dim__movies dim_movies ON json_extract(stg_md.response, '$.Title') = dim_movies.title
+		LEFT JOIN dwh_dim__movies dim_movies ON stg_md.omdb_title = dim_movies.title
 		LEFT JOIN dwh_dim__movies_reviewers dim_reviewers ON json_extract(value, '$.Source') = dim_reviewers.NAME
 		WHERE dim_movies.id IS NOT NULL
 			AND dim_reviewers.id IS NOT NULL
+			AND (
+				:full_refresh
+				OR stg_md.title IN (
+					SELECT row_key
+					FROM meta_changelog
+					WHERE table_name = 'stg_movies_details'
+						AND changed_date >= :since
+					)
+				)
 		) a
 	UNION ALL
 	SELECT dim_movies.id AS movie_id
 		,dim_reviewers.id AS reviewer_id
-		,json_extract(stg_md.response, '$.imdbRating') * 10 AS score_percent
+		,stg_md.imdb_rating * 10 AS score_percent
 	FROM stg_movies_details stg_md
-	LEFT JOIN dwh_dim__movies dim_movies ON json_extract(stg_md.response, '$.Title') = dim_movies.title
+	LEFT JOIN dwh_dim__movies dim_movies ON stg_md.omdb_title = dim_movies.title
 	LEFT JOIN dwh_dim__movies_reviewers dim_reviewers ON 'IMDb' = dim_reviewers.NAME
 	WHERE dim_movies.id IS NOT NULL
 		AND dim_reviewers.id IS NOT NULL
+		AND (
+			:full_refresh
+			OR stg_md.title IN (
+				SELECT row_key
+				FROM meta_changelog
+				WHERE table_name = 'stg_movies_details'
+					AND changed_date >= :since
+				)
+			)
 	) b
 WHERE 1
 ON CONFLICT(movie_id, reviewer_id) DO UPDATE
 SET score_percent = excluded.score_percent
+	,modified_date = CURRENT_TIMESTAMP
 WHERE score_percent != excluded.score_percent;
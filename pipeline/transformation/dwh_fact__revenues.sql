@@ -1,3 +1,76 @@
+-- the facts without a source row anymore (their title is mapped to another movie, or it is changed
+-- in the staging table) are deleted, and their movies are logged for the revenue summaries first
+INSERT OR IGNORE INTO meta_changelog (
+	table_name
+	,changed_date
+	,row_key
+	)
+SELECT DISTINCT 'dwh_fact__revenues:deleted'
+	,CURRENT_TIMESTAMP
+	,facts.movie_id
+FROM dwh_fact__revenues facts
+WHERE facts.date_id IN (
+		SELECT id
+		FROM dwh_dim__dates
+		WHERE :full_refresh
+		UNION
+		SELECT CAST(strftime('%Y%m%d', json_extract(row_key, '$[0]')) AS INTEGER)
+		FROM meta_changelog
+		WHERE NOT :full_refresh
+			AND table_name = 'stg_revenues_per_day'
+			AND changed_date >= :since
+		UNION
+		-- every date of the titles mapped again
+		SELECT CAST(strftime('%Y%m%d', stg_revenues.DATE) AS INTEGER)
+		FROM meta_changelog c
+		JOIN dwh_map__titles titles ON titles.id = c.row_key
+		JOIN stg_revenues_per_day stg_revenues ON stg_revenues.title = titles.title
+		WHERE NOT :full_refresh
+			AND c.table_name = 'dwh_map__titles'
+			AND c.changed_date >= :since
+		)
+	AND NOT EXISTS (
+		SELECT 1
+		FROM dwh_dim__movies dim_movies
+		JOIN dwh_map__titles titles ON titles.imdb_id = dim_movies.imdb_id
+		JOIN dwh_dim__dates dates ON dates.id = facts.date_id
+		JOIN stg_revenues_per_day stg_revenues ON stg_revenues.DATE = dates.value
+			AND stg_revenues.title = titles.title
+		WHERE dim_movies.id = facts.movie_id
+		);
+
+DELETE
+FROM dwh_fact__revenues
+WHERE dwh_fact__revenues.date_id IN (
+		SELECT id
+		FROM dwh_dim__dates
+		WHERE :full_refresh
+		UNION
+		SELECT CAST(strftime('%Y%m%d', json_extract(row_key, '$[0]')) AS INTEGER)
+		FROM meta_changelog
+		WHERE NOT :full_refresh
+			AND table_name = 'stg_revenues_per_day'
+			AND changed_date >= :since
+		UNION
+		-- every date of the titles mapped again
+		SELECT CAST(strftime('%Y%m%d', stg_revenues.DATE) AS INTEGER)
+		FROM meta_changelog c
+		JOIN dwh_map__titles titles ON titles.id = c.row_key
+		JOIN stg_revenues_per_day stg_revenues ON stg_revenues.title = titles.title
+		WHERE NOT :full_refresh
+			AND c.table_name = 'dwh_map__titles'
+			AND c.changed_date >= :since
+		)
+	AND NOT EXISTS (
+		SELECT 1
+		FROM dwh_dim__movies dim_movies
+		JOIN dwh_map__titles titles ON titles.imdb_id = dim_movies.imdb_id
+		JOIN dwh_dim__dates dates ON dates.id = dwh_fact__revenues.date_id
+		JOIN stg_revenues_per_day stg_revenues ON stg_revenues.DATE = dates.value
+			AND stg_revenues.title = titles.title
+		WHERE dim_movies.id = dwh_fact__revenues.movie_id
+		);
+
 INSERT INTO dwh_fact__revenues (
 	movie_id
 	,distributor_id
@@ -13,16 +86,40 @@ FROM (
 		,revenue
 		,theaters AS theaters_number
 	FROM stg_revenues_per_day stg_revenues
-	LEFT JOIN stg_movies_details stg_movies ON stg_revenues.title = stg_movies.title
-	LEFT JOIN dwh_dim__movies dim_movies ON json_extract(stg_movies.response, '$.Title') = dim_movies.title
-	LEFT JOIN dwh_dim__dates dates ON stg_revenues.DATE = dates.value
+	LEFT JOIN dwh_map__titles titles ON stg_revenues.title = titles.title
+	LEFT JOIN dwh_dim__movies dim_movies ON titles.imdb_id = dim_movies.imdb_id
+	LEFT JOIN dwh_dim__dates dates ON dates.id = CAST(strftime('%Y%m%d', stg_revenues.DATE) AS INTEGER)
 	LEFT JOIN dwh_dim__distributors distributors ON stg_revenues.distributor = distributors.NAME
-	WHERE stg_movies.title IS NOT NULL
+	WHERE dim_movies.id IS NOT NULL
+		AND dates.id IS NOT NULL
+		AND (
+			:full_refresh
+			OR (stg_revenues.DATE, stg_revenues.title) IN (
+				SELECT json_extract(row_key, '$[0]')
+					,json_extract(row_key, '$[1]')
+				FROM meta_changelog
+				WHERE table_name = 'stg_revenues_per_day'
+					AND changed_date >= :since
+				)
+			OR titles.id IN (
+				SELECT row_key
+				FROM meta_changelog
+				WHERE table_name = 'dwh_map__titles'
+					AND changed_date >= :since
+				)
+			OR dim_movies.id IN (
+				SELECT row_key
+				FROM meta_changelog
+				WHERE table_name = 'dwh_dim__movies'
+					AND changed_date >= :since
+				)
+			)
 	) a
 WHERE 1
 ON CONFLICT(movie_id, date_id) DO UPDATE
 SET distributor_id = excluded.distributor_id
 	,revenue = excluded.revenue
 	,theaters_number = excluded.theaters_number
+	,modified_date = CURRENT_TIMESTAMP
 WHERE revenue != excluded.revenue
 	OR theaters_number != excluded.theaters_number;
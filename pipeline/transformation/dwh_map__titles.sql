@@ -0,0 +1,87 @@
+INSERT INTO dwh_map__titles (
+	title
+	,normalized_title
+	,imdb_id
+	,method
+	,similarity
+	)
+SELECT *
+FROM (
+	SELECT title
+		,normalize_title(title) AS normalized_title
+		,imdb_id
+		,CASE
+			WHEN normalize_title(title) = normalize_title(omdb_title)
+				THEN 'EXACT'
+			ELSE 'API'
+			END AS method
+		,title_similarity(title, omdb_title) AS similarity
+	FROM stg_movies_details
+	WHERE imdb_id IS NOT NULL
+		AND (
+			:full_refresh
+			OR title IN (
+				SELECT row_key
+				FROM meta_changelog
+				WHERE table_name = 'stg_movies_details'
+					AND changed_date >= :since
+				)
+			)
+	) a
+WHERE 1 ON CONFLICT(title) DO UPDATE
+SET normalized_title = excluded.normalized_title
+	,imdb_id = excluded.imdb_id
+	,method = excluded.method
+	,similarity = excluded.similarity
+	,modified_date = CURRENT_TIMESTAMP
+WHERE method != 'MANUAL'
+	AND (
+		imdb_id != excluded.imdb_id
+		OR method != excluded.method
+		OR normalized_title != excluded.normalized_title
+		);
+
+INSERT INTO dwh_map__titles (
+	title
+	,normalized_title
+	,imdb_id
+	,method
+	,similarity
+	)
+SELECT revenues.title
+	,revenues.normalized_title
+	,known.imdb_id
+	,'NORMALIZED'
+	,1.0
+FROM (
+	SELECT title
+		,normalize_title(title) AS normalized_title
+	FROM (
+		SELECT DISTINCT r.title
+		FROM stg_revenues_per_day r
+		-- only the titles the API did not find, a title the API knows is not merged with another movie
+		JOIN meta_fetch_checkpoints c ON r.title = c.title
+			AND c.state = 'NOT_FOUND'
+		LEFT JOIN dwh_map__titles m ON r.title = m.title
+		WHERE m.title IS NULL
+		)
+	) revenues
+JOIN (
+	SELECT normalized_title
+		,MIN(imdb_id) AS imdb_id
+	FROM (
+		SELECT normalize_title(omdb_title) AS normalized_title
+			,imdb_id
+		FROM stg_movies_details
+		WHERE imdb_id IS NOT NULL
+		UNION
+		SELECT normalized_title
+			,imdb_id
+		FROM dwh_map__titles
+		WHERE method IN ('EXACT', 'API', 'MANUAL')
+		)
+	GROUP BY normalized_title
+	-- a key of several movies is left to the API
+	HAVING COUNT(DISTINCT imdb_id) = 1
+	) known ON revenues.normalized_title = known.normalized_title
+WHERE 1 ON CONFLICT(title) DO NOTHING;
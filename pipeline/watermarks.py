@@ -0,0 +1,30 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from models.schemas.meta.watermarks import METAWatermark
+
+INITIAL_WATERMARK = '1970-01-01 00:00:00'
+
+
+def get_watermark(session: Session, target: str) -> str:
+    """
+    Returns the high-water mark (`modified_date` of the source rows) recorded for the target
+    by its last successful run or `INITIAL_WATERMARK` if the target has never been run.
+    """
+    value = session.execute(text(f"""
+        SELECT value FROM {METAWatermark.__tablename__} WHERE target = :target;
+    """), {"target": target}).scalar_one_or_none()
+    return value or INITIAL_WATERMARK
+
+
+def set_watermark(session: Session, target: str, value: str):
+    session.execute(text(f"""
+        INSERT INTO {METAWatermark.__tablename__} (target, value)
+        VALUES (:target, :value)
+        ON CONFLICT(target) DO UPDATE SET value = excluded.value
+            ,modified_date = CURRENT_TIMESTAMP;
+    """), {"target": target, "value": value})
+
+
+def get_current_timestamp(session: Session) -> str:
+    return session.execute(text("SELECT CURRENT_TIMESTAMP;")).scalar_one()